@@ -1,19 +1,24 @@
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from fastapi.middleware.cors import CORSMiddleware
 from logging.config import dictConfig
 from fastapi import FastAPI
 import uvicorn
+import asyncio
 import logging
 
 from src.core.config.settings import settings
 from src.core.dependencies.db_helper import db_helper
 from src.core.config.logger import LOG_CONFIG
+from src.core.services.crypto.exchange.registry import market_registry
+from src.core.services.tasks.trade_partitions import run_trade_partition_rollover
+from src.core.services.upstream.client import upstream
 
 from src.api.v1.endpoints.healthcheck import router as health_router
 from src.api.v1.endpoints.markets import router as markets_router
 from src.api.v1.endpoints.orders import router as orders_router
 from src.api.v1.endpoints.users import router as users_router
 from src.api.v1.endpoints.wallets import router as wallets_router
+from src.api.v1.endpoints.positions import router as positions_router
 from src.api.v1.auth.authentication import router as auth_router
 from src.api.v1.endpoints.index import router as index_router
 from src.api.v1.endpoints.general_work import router as general_router
@@ -27,9 +32,20 @@ async def lifespan(app: FastAPI):
     logger = logging.getLogger(__name__)
     logger.info(settings)
     logger.info(await db_helper.health_check())
+    await upstream.start()
+    await market_registry.load_local_markets()
+    # One worker is enough to maintain the shared trades table
+    rollover = asyncio.create_task(run_trade_partition_rollover()) if settings.engine.worker_id == 0 else None
     
     yield  # FastAPI handles requests here
 
+    if rollover is not None:
+        # Wait for it, a rollover mid-transaction must not race the pool dispose below
+        rollover.cancel()
+        with suppress(asyncio.CancelledError):
+            await rollover
+    await market_registry.stop()
+    await upstream.stop()
     try:
         await db_helper.dispose()
         logger.info("✅ Connection pool closed cleanly")
@@ -53,6 +69,7 @@ app.include_router(markets_router)
 app.include_router(orders_router)
 app.include_router(users_router)
 app.include_router(wallets_router)
+app.include_router(positions_router)
 app.include_router(index_router)
 app.include_router(general_router)
 
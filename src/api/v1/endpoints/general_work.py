@@ -1,27 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-import requests
 
-from src.core.config.settings import settings
 from src.core.dependencies.auth_deps import GET_CURRENT_ACTIVE_USER
+from src.core.services.cache.redis.market_data import market_data
+from src.core.services.upstream.client import UpstreamError
+from src.core.services.upstream.coinmarketcap import coinmarketcap
 
 
 router = APIRouter()
 
 @router.get("/get_price/{SYMB}")
 async def get_crypto_price(user:GET_CURRENT_ACTIVE_USER, SYMB="BTC"):
-    url = "https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/latest"
-    params = {"symbol": SYMB, "convert": "USD"}
-    headers = {"X-CMC_PRO_API_KEY": settings.Con.api.get_secret_value()}  # Get from CoinMarketCap
-    response = requests.get(url, headers=headers, params=params)
-    return response.json()
+    symbol = SYMB.upper()
+    # Cached per symbol, concurrent misses share one upstream call
+    try:
+        quote = await market_data.get_quote(symbol, lambda: coinmarketcap.get_quote(symbol))
+    except UpstreamError as err:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(err))
+    if quote is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No quote for {symbol}")
+    return {"data": {symbol: quote}}
 
 @router.get('/get_all_tokens')
 async def get_all_tokens(user:GET_CURRENT_ACTIVE_USER):
-    url = "https://pro-api.coinmarketcap.com/v1/cryptocurrency/map"
-    headers = {
-        "Accepts": "application/json",
-        "X-CMC_PRO_API_KEY": settings.Con.api.get_secret_value(),
-    }
-    response = requests.get(url, headers=headers)
-    print(response.json())
-    return 200
\ No newline at end of file
+    try:
+        tokens = await coinmarketcap.get_map()
+    except UpstreamError as err:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(err))
+    return tokens
@@ -1,8 +1,12 @@
 from fastapi import APIRouter
+from dataclasses import asdict
 import logging
 
 from src.core.dependencies.db_helper import DBDI
 from src.core.config.settings import settings
+from src.core.services.crypto.exchange.persistence import order_writer
+from src.core.services.crypto.exchange.depth_feed import depth_feeds
+from src.core.services.crypto.exchange.registry import market_registry
 
 
 router = APIRouter()
@@ -13,4 +17,21 @@ async def some_func(db:DBDI):
     logger.info(f'{db.is_active=}')
     logger.info(f'{settings}')
     logger.info('Everything is fine.')
-    return 'pong'
\ No newline at end of file
+    return 'pong'
+
+@router.get('/metrics/persistence')
+async def persistence_metrics():
+    """Write-behind order persistence backlog and flush stats"""
+    return order_writer.get_metrics()
+
+
+@router.get('/metrics/broadcast')
+async def broadcast_metrics():
+    """Websocket depth fan-out per market: clients, messages, conflated slow clients"""
+    return {symbol: asdict(feed.hub.metrics) for symbol, feed in depth_feeds.feeds.items()}
+
+
+@router.get('/metrics/halted')
+async def halted_markets():
+    """Markets halted after a failed journal commit, they recover on restart"""
+    return market_registry.halted
@@ -1,24 +1,140 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-import asyncio
+from fastapi import APIRouter, HTTPException, Query, Response, WebSocket, WebSocketDisconnect, status
+from datetime import datetime, timezone
+from typing import Literal, Optional
 
-from src.core.services.crypto.exchange.trade import OrderBook
+from src.core.dependencies.db_helper import DBDI
+from src.core.pydantic_schemas.trading_schema import CandleItem, TradeHistoryItem, TradeHistoryPage
+from src.core.services.crypto.exchange.market import get_market_config
+from src.core.services.crypto.exchange.registry import market_registry, MarketNotOwnedError
+from src.core.services.crypto.exchange.depth_feed import depth_feeds
+from src.core.services.crypto.exchange.candles import candle_aggregator
+from src.core.services.cache.redis.market_data import market_data
+from src.core.services.crypto.exchange.ticker import ticker_service
+from src.core.services.database.orm.trade import select_trades
 
 
 router = APIRouter()
 
+# Deeper reads walk that many levels per request, the full book is what the websocket feed is for
+MAX_DEPTH = 1000
+
+@router.get("/markets/{market}/depth")
+async def get_market_depth(market: str, depth: int = Query(default=10, ge=1, le=MAX_DEPTH)):
+    try:
+        return market_registry.get_market_depth(market, depth)
+    except MarketNotOwnedError as err:
+        raise HTTPException(status_code=status.HTTP_421_MISDIRECTED_REQUEST, detail=str(err))
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(err))
+
+@router.get("/markets/tickers")
+async def get_tickers():
+    """Ticker and rolling 24h stats of every market, one shared serialized document"""
+    return Response(content=await ticker_service.get_tickers(), media_type="application/json")
+
+@router.get("/markets/{market}/ticker")
+async def get_ticker(market: str):
+    """Last price, 24h stats and top of book from the market data cache"""
+    try:
+        symbol = get_market_config(market).symbol
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(err))
+    ticker = await market_data.get(symbol)
+    if ticker is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No market data for {symbol} yet")
+    return ticker
+
+@router.get("/markets/{market}/trades")
+async def get_trade_history(
+    market: str,
+    db: DBDI,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=1000)
+) -> TradeHistoryPage:
+    """Trade history, newest first, keyset paginated by ``cursor``"""
+    try:
+        symbol = get_market_config(market).symbol
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(err))
+    after = None
+    if cursor is not None:
+        try:
+            timestamp, trade_id = cursor.rsplit('_', 1)
+            after = (datetime.fromisoformat(timestamp), int(trade_id))
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    trades = await select_trades(db, symbol, start, end, after, limit)
+    next_cursor = None
+    if len(trades) == limit:
+        last = trades[-1]
+        next_cursor = f"{last.timestamp.isoformat()}_{last.id}"
+    return TradeHistoryPage(
+        trades=[TradeHistoryItem.model_validate(trade, from_attributes=True) for trade in trades],
+        next_cursor=next_cursor
+        )
+
+def _unix(value: Optional[datetime]) -> Optional[int]:
+    """Unix seconds, naive datetimes are UTC like the trades table"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+@router.get("/markets/{market}/candles")
+async def get_candles(
+    market: str,
+    resolution: Literal['1s', '1m', '5m', '1h', '1d'] = '1m',
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(default=500, ge=1, le=1000)
+) -> list[CandleItem]:
+    """
+    OHLCV candles starting in [start, end), oldest first, at most the newest
+    ``limit``. Recent candles of local markets come from memory, older ranges
+    from the trades table.
+    """
+    try:
+        return await candle_aggregator.get_candles(
+            market,
+            resolution,
+            _unix(start),
+            _unix(end),
+            limit
+            )
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(err))
+
 @router.websocket("/ws/orderbook/{market}")
 async def websocket_orderbook(websocket: WebSocket, market: str):
+    """
+    One depth snapshot with its ``seq``, then level diffs ([price, amount],
+    amount "0" removes the level) coalesced per tick, as binary frames of
+    UTF-8 JSON shared by all subscribers. A client that falls behind gets
+    a fresh snapshot instead of the backlog; any other message whose
+    ``prev_seq`` is not the last ``seq`` received means a gap: reconnect.
+    """
     await websocket.accept()
-    order_book = OrderBook(market)
-    
     try:
-        while True:
-            # Send initial snapshot
-            snapshot = order_book.get_snapshot()
-            await websocket.send_json(snapshot)
-            
-            # Subscribe to updates
-            # This would use a PubSub system in production
-            await asyncio.sleep(1)
+        symbol = get_market_config(market).symbol
+    except ValueError:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if market_registry.events is None or (not market_registry.owns(symbol) and market_registry.bridge is None):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    feed = depth_feeds.get_feed(symbol)
+    client = await feed.join()
+    try:
+        while (message := await client.get()) is not None:
+            await websocket.send_bytes(message)
+        # Feed went away, the client reconnects
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
     except WebSocketDisconnect:
-        pass
\ No newline at end of file
+        pass
+    finally:
+        feed.leave(client)
@@ -1,10 +1,23 @@
-from fastapi import APIRouter, Depends, Security
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, status
 from fastapi.security import APIKeyHeader
+from datetime import datetime
+from typing import Literal, Optional
 
 from src.core.dependencies.db_helper import DBDI
-from src.core.pydantic_schemas.trading_schema import OrderCreate
+from src.core.pydantic_schemas.trading_schema import (
+    OrderCreate, 
+    OrderBatchCreate, 
+    OrderBatchResult, 
+    OrderAmend, 
+    OrderResponse,
+    OrderPage
+    )
 from src.core.dependencies.auth_deps import GET_CURRENT_ACTIVE_USER
-from src.core.services.crypto.exchange.trade import OrderBook
+from src.core.services.crypto.exchange.market import get_market_config
+from src.core.services.crypto.exchange.registry import market_registry, MarketNotOwnedError
+from src.core.services.crypto.exchange.sequencer import MarketHaltedError
+from src.core.services.database.orm.order import select_open_orders, select_order_history
+from src.core.services.database.models.order import OrderModel
 
 
 api_key_header = APIKeyHeader(name="X-TRADING-API-KEY")
@@ -16,6 +29,169 @@ async def create_order(
     order: OrderCreate,
     user: GET_CURRENT_ACTIVE_USER,
     db: DBDI
+) -> OrderResponse:
+    try:
+        result = await market_registry.create_order(
+            order.market,
+            user.id, 
+            order.side, 
+            order.type, 
+            order.price, 
+            order.amount,
+            order.time_in_force
+            )
+    except MarketNotOwnedError as err:
+        raise HTTPException(status_code=status.HTTP_421_MISDIRECTED_REQUEST, detail=str(err))
+    except MarketHaltedError as err:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(err))
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
+    
+    order_book = market_registry.get_book(order.market)
+    return OrderResponse(
+        **order_book.serialize_order(result.value),
+        fills=[order_book.serialize_trade(trade) for trade in result.trades]
+        )
+
+@router.post("/batch", dependencies=[Security(api_key_header)])
+async def create_orders_batch(
+    batch: OrderBatchCreate,
+    user: GET_CURRENT_ACTIVE_USER
+) -> list[OrderBatchResult]:
+    orders = [
+        {
+            "side": item.side, 
+            "order_type": item.type, 
+            "price": item.price, 
+            "amount": item.amount,
+            "time_in_force": item.time_in_force
+        }
+        for item in batch.orders
+        ]
+    try:
+        result = await market_registry.create_orders_batch(batch.market, user.id, orders)
+    except MarketNotOwnedError as err:
+        raise HTTPException(status_code=status.HTTP_421_MISDIRECTED_REQUEST, detail=str(err))
+    except MarketHaltedError as err:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(err))
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
+    
+    order_book = market_registry.get_book(batch.market)
+    return [
+        OrderBatchResult(error=str(item)) if isinstance(item, ValueError)
+        else OrderBatchResult(order=OrderResponse(**order_book.serialize_order(item)))
+        for item in result.value
+        ]
+
+@router.patch("/{market}/{order_id}", dependencies=[Security(api_key_header)])
+async def amend_order(
+    market: str,
+    order_id: int,
+    amendment: OrderAmend,
+    user: GET_CURRENT_ACTIVE_USER
+) -> OrderResponse:
+    try:
+        result = await market_registry.amend_order(
+            market,
+            order_id,
+            price=amendment.price,
+            amount=amendment.amount,
+            user_id=user.id
+            )
+    except MarketNotOwnedError as err:
+        raise HTTPException(status_code=status.HTTP_421_MISDIRECTED_REQUEST, detail=str(err))
+    except MarketHaltedError as err:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(err))
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
+    
+    order_book = market_registry.get_book(market)
+    return OrderResponse(**order_book.serialize_order(result.value))
+
+@router.delete("/{market}/{order_id}", dependencies=[Security(api_key_header)])
+async def cancel_order(
+    market: str,
+    order_id: int,
+    user: GET_CURRENT_ACTIVE_USER
 ):
-    current_user = OrderBook()
-    return await current_user.create_order(user.id, order)
\ No newline at end of file
+    try:
+        result = await market_registry.cancel_order(market, order_id, user_id=user.id)
+    except MarketNotOwnedError as err:
+        raise HTTPException(status_code=status.HTTP_421_MISDIRECTED_REQUEST, detail=str(err))
+    except MarketHaltedError as err:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(err))
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
+    
+    if not result.value:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Open order not found")
+    return {"id": str(order_id), "status": "canceled"}
+
+
+def _parse_cursor(cursor: Optional[str]) -> Optional[tuple[datetime, int]]:
+    if cursor is None:
+        return None
+    try:
+        created_at, order_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(order_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def _market_symbol(market: Optional[str]) -> Optional[str]:
+    if market is None:
+        return None
+    try:
+        return get_market_config(market).symbol
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(err))
+
+def _order_page(orders: list[OrderModel], limit: int) -> OrderPage:
+    next_cursor = None
+    if len(orders) == limit:
+        last = orders[-1]
+        next_cursor = f"{last.created_at.isoformat()}_{last.id}"
+    return OrderPage(
+        orders=[
+            OrderResponse(
+                id=str(order.id),
+                user_id=order.user_id,
+                market=order.market,
+                side=order.side,
+                type=order.type,
+                time_in_force=order.time_in_force,
+                price=order.price,
+                amount=order.amount,
+                filled=order.filled,
+                status=order.status
+                )
+            for order in orders
+            ],
+        next_cursor=next_cursor
+        )
+
+@router.get("/open")
+async def get_open_orders(
+    user: GET_CURRENT_ACTIVE_USER,
+    db: DBDI,
+    market: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=1000)
+) -> OrderPage:
+    """Open orders, newest first, keyset paginated by ``cursor``"""
+    orders = await select_open_orders(db, user.id, _market_symbol(market), _parse_cursor(cursor), limit)
+    return _order_page(orders, limit)
+
+@router.get("/history")
+async def get_order_history(
+    user: GET_CURRENT_ACTIVE_USER,
+    db: DBDI,
+    market: Optional[str] = None,
+    order_status: Optional[Literal['open', 'filled', 'canceled']] = Query(default=None, alias="status"),
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=1000)
+) -> OrderPage:
+    """Orders in every (or one) status, newest first, keyset paginated by ``cursor``"""
+    statuses = (order_status,) if order_status is not None else ("open", "filled", "canceled")
+    orders = await select_order_history(db, user.id, _market_symbol(market), statuses, _parse_cursor(cursor), limit)
+    return _order_page(orders, limit)
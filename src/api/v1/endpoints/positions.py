@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, status
+
+from src.core.dependencies.auth_deps import GET_CURRENT_ACTIVE_USER
+from src.core.services.crypto.exchange.market import get_market_config
+from src.core.services.crypto.exchange.registry import market_registry
+
+router = APIRouter()
+
+def _positions():
+    if market_registry.positions is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Position tracking is disabled")
+    return market_registry.positions
+
+
+@router.get("/positions/me")
+async def get_my_positions(user: GET_CURRENT_ACTIVE_USER):
+    """Positions with average entry and PnL in every market of this worker, served from memory"""
+    return _positions().get_positions(user.id)
+
+
+@router.get("/positions/me/{market}")
+async def get_my_position(market: str, user: GET_CURRENT_ACTIVE_USER):
+    try:
+        symbol = get_market_config(market).symbol
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(err))
+    position = _positions().get_position(symbol, user.id)
+    if position is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No position in {symbol}")
+    return position
@@ -1,11 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-import requests
 
-from src.core.config.settings import BLOCKCHAIN_API_URL
+from src.core.config.settings import BLOCKCHAIN_API_URL, settings
+from src.core.dependencies.auth_deps import GET_CURRENT_ACTIVE_USER
+from src.core.dependencies.db_helper import DBDI
+from src.core.services.crypto.exchange.balances import balance_ledger
+from src.core.services.database.orm.balance import select_balances
+from src.core.services.upstream.client import UpstreamError, upstream
 
 router = APIRouter()
 
 @router.get("/balance/{wallet_address}")
 async def get_balance(wallet_address: str):
-    response = requests.get(f"{BLOCKCHAIN_API_URL}/balance?active={wallet_address}")
-    return response.json()
+    try:
+        return await upstream.get_json(f"{BLOCKCHAIN_API_URL}/balance", params={"active": wallet_address})
+    except UpstreamError as err:
+        if err.status is not None and err.status < 500:
+            raise HTTPException(status_code=err.status, detail=err.body)
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(err))
+
+
+@router.get("/wallets/me")
+async def get_my_balances(user: GET_CURRENT_ACTIVE_USER, db: DBDI):
+    """Exchange balances per currency (balance, locked by open orders, available)"""
+    if not settings.engine.check_balances:
+        # The ledger is not attached to the markets, its cache would never see a trade
+        return {
+            wallet.currency: {"balance": wallet.balance, "locked": wallet.locked, "available": wallet.balance - wallet.locked}
+            for wallet in await select_balances(db, [user.id])
+        }
+    await balance_ledger.ensure_loaded((user.id,))
+    return balance_ledger.get_balances(user.id)
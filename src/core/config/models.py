@@ -1,4 +1,5 @@
 from pydantic import BaseModel, field_validator, SecretStr
+from typing import Optional
 from datetime import timedelta
 
 
@@ -89,5 +90,91 @@ class BinanceService(BaseModel):
 class CorsSettings(BaseModel):
     CORS_ORIGINS:SecretStr
 
+class EngineConfig(BaseModel):
+    """
+    worker_id:int default - 0
+    worker_count:int default - 1
+    journal_dir:Optional[str] default - None (books are memory only)
+    snapshot_every:int default - 100000 journal records
+    persist_orders:bool default - True (write-behind to the orders table)
+    persist_batch:int default - 1000 rows per flush
+    persist_interval_ms:int default - 50
+    persist_max_pending:int default - 100000 rows before commands wait
+    trade_partitions_ahead:int default - 7 daily trade partitions kept ready
+    check_balances:bool default - True (orders lock wallet funds)
+    balance_ttl_ms:int default - 5000 (cached wallets are read again, deposits/withdrawals show up)
+    risk_checks:bool default - True (exchange/risk.py limits)
+    track_positions:bool default - True (in-memory positions and PnL)
+    position_checkpoint_ms:int default - 5000 (only without persist_orders, else positions go with its flushes)
+    track_candles:bool default - True (in-memory OHLCV candles of local markets)
+    market_events:bool default - True (fills/levels/orders on the event bus)
+    redis_events:bool default - False (share market events between workers over Redis Streams)
+    event_stream_maxlen:int default - 100000 entries kept per market stream
+    depth_tick_ms:int default - 100 (websocket depth diffs are coalesced per tick)
+    stream_snapshot_ms:int default - 1000 (full depth snapshot next to a market's event stream at most this often)
+    push_market_data:bool default - True (engine pushes tickers/top of book to the market data cache)
+    ticker_cache_ttl_ms:int default - 1000 (tickers of markets hosted by other workers)
+    quote_cache_ttl_ms:int default - 30000 (upstream quotes)
+    rolling_tickers:bool default - True (24h stats of local markets in the market data cache)
+    tickers_refresh_ms:int default - 250 (bulk /markets/tickers response is rebuilt at most this often)
+    trade_retention_days:Optional[int] default - None (keep all trade history)
+    Markets are sharded across worker processes by symbol hash,
+    each worker only hosts the order books it owns.
+    """
+    worker_id:int = 0
+    worker_count:int = 1
+    journal_dir:Optional[str] = None
+    snapshot_every:int = 100_000
+    persist_orders:bool = True
+    persist_batch:int = 1_000
+    persist_interval_ms:int = 50
+    persist_max_pending:int = 100_000
+    trade_partitions_ahead:int = 7
+    check_balances:bool = True
+    balance_ttl_ms:int = 5_000
+    risk_checks:bool = True
+    track_positions:bool = True
+    position_checkpoint_ms:int = 5_000
+    track_candles:bool = True
+    market_events:bool = True
+    redis_events:bool = False
+    event_stream_maxlen:int = 100_000
+    depth_tick_ms:int = 100
+    stream_snapshot_ms:int = 1_000
+    push_market_data:bool = True
+    ticker_cache_ttl_ms:int = 1_000
+    quote_cache_ttl_ms:int = 30_000
+    rolling_tickers:bool = True
+    tickers_refresh_ms:int = 250
+    trade_retention_days:Optional[int] = None
+
+    @field_validator('worker_count')
+    def validate_worker_count(cls, v):
+        if v < 1:
+            raise ValueError("worker_count must be positive")
+        return v
+
+class UpstreamConfig(BaseModel):
+    """
+    max_connections:int default - 100
+    max_keepalive:int default - 20 idle connections kept open
+    connect_timeout_ms:int default - 2000
+    timeout_ms:int default - 5000 (read/write/pool)
+    retries:int default - 3 (transport errors, 429 and 5xx)
+    retry_backoff_ms:int default - 100 (base of the jittered exponential backoff)
+    cache_ttl_ms:int default - 60000 (cached upstream responses, e.g. the token map)
+    quote_batch_ms:int default - 20 (quote lookups within this window share one upstream call)
+    quote_batch_max:int default - 100 symbols per quotes call
+    """
+    max_connections:int = 100
+    max_keepalive:int = 20
+    connect_timeout_ms:int = 2_000
+    timeout_ms:int = 5_000
+    retries:int = 3
+    retry_backoff_ms:int = 100
+    cache_ttl_ms:int = 60_000
+    quote_batch_ms:int = 20
+    quote_batch_max:int = 100
+
 class Coinmarketcap(BaseModel):
     api:SecretStr
\ No newline at end of file
@@ -12,6 +12,8 @@ from src.core.config.models import (
     BinanceService,
     CorsSettings,
     Coinmarketcap,
+    EngineConfig,
+    UpstreamConfig,
     field_validator
     )
 
@@ -41,8 +43,10 @@ class Settings(BaseSettings):
     db: DatabaseConfig
     redis: RedisSettings
     jwt:JwtConfig
+    engine:EngineConfig = EngineConfig()
 
     # Api Clients
+    upstream:UpstreamConfig = UpstreamConfig()
     Bin:BinanceService
     Con:Coinmarketcap
 
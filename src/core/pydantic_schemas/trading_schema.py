@@ -1,8 +1,78 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from decimal import Decimal
+from datetime import datetime
+from typing import Literal, Optional
 
 
 class TradeSignal(BaseModel):pass
 
-class OrderCreate(BaseModel):pass
+class OrderCreate(BaseModel):
+    market:str = 'BTC-USDT'
+    side:Literal['buy', 'sell']
+    type:Literal['limit', 'market'] = 'limit'
+    time_in_force:Literal['GTC', 'IOC', 'FOK'] = 'GTC'
+    price:Decimal = Field(default=Decimal(0), ge=0, description="Price in quote currency, multiple of market tick size, ignored for market orders")
+    amount:Decimal = Field(gt=0, description="Quantity in base currency, multiple of market lot size")
+
+class OrderBatchItem(BaseModel):
+    side:Literal['buy', 'sell']
+    type:Literal['limit', 'market'] = 'limit'
+    time_in_force:Literal['GTC', 'IOC', 'FOK'] = 'GTC'
+    price:Decimal = Field(default=Decimal(0), ge=0)
+    amount:Decimal = Field(gt=0)
+
+class OrderBatchCreate(BaseModel):
+    market:str = 'BTC-USDT'
+    orders:list[OrderBatchItem] = Field(min_length=1, max_length=1000)
+
+class OrderAmend(BaseModel):
+    price:Optional[Decimal] = Field(default=None, gt=0)
+    amount:Optional[Decimal] = Field(default=None, gt=0, description="New total quantity, reducing it keeps time priority")
+
+class FillResponse(BaseModel):
+    price:Decimal
+    amount:Decimal
+    taker_side:str
+    timestamp:float
     
-class OrderResponse(BaseModel):pass
\ No newline at end of file
+class OrderResponse(BaseModel):
+    id:str
+    user_id:int
+    market:str
+    side:str
+    type:str
+    time_in_force:str
+    price:Decimal
+    amount:Decimal
+    filled:Decimal
+    status:str
+    fills:list[FillResponse] = []
+
+class OrderBatchResult(BaseModel):
+    order:Optional[OrderResponse] = None
+    error:Optional[str] = None
+
+class TradeHistoryItem(BaseModel):
+    id:int
+    market:str
+    price:Decimal
+    amount:Decimal
+    taker_side:str
+    timestamp:datetime
+
+class TradeHistoryPage(BaseModel):
+    trades:list[TradeHistoryItem]
+    next_cursor:Optional[str] = Field(default=None, description="Pass as cursor to fetch the next (older) page")
+
+class OrderPage(BaseModel):
+    orders:list[OrderResponse]
+    next_cursor:Optional[str] = Field(default=None, description="Pass as cursor to fetch the next (older) page")
+
+class CandleItem(BaseModel):
+    start:int = Field(description="Bucket start, unix seconds")
+    open:Decimal
+    high:Decimal
+    low:Decimal
+    close:Decimal
+    volume:Decimal
+    trades:int
@@ -1,2 +1,212 @@
+from decimal import Decimal
+from typing import Awaitable, Callable, Optional
+import asyncio
+import json
+import logging
+import time
 
-class RedisMarketData():pass
\ No newline at end of file
+from redis.asyncio import Redis
+
+from src.core.config.settings import settings
+from src.core.services.cache.redis.redis_fastapi import redis
+from src.core.services.crypto.exchange.trade import OrderBook
+from src.core.services.crypto.exchange.sequencer import Command, CommandResult
+
+
+logger = logging.getLogger(__name__)
+
+# Ticker fields, kept as Decimal locally and as strings in the Redis hash
+DECIMAL_FIELDS = (
+    "last_price", "last_amount",
+    "best_bid", "best_bid_amount", "best_ask", "best_ask_amount",
+    "open_24h", "high_24h", "low_24h", "volume_24h", "quote_volume_24h", "vwap_24h", "change_24h", "change_pct_24h",
+)
+
+def encode_entry(entry: dict) -> dict[str, str]:
+    return {
+        name: ("" if value is None else json.dumps(value) if isinstance(value, (dict, list)) else str(value))
+        for name, value in entry.items()
+    }
+
+def decode_entry(fields: dict[bytes, bytes]) -> dict:
+    entry = {}
+    for name, value in fields.items():
+        name, value = name.decode(), value.decode()
+        if value == "":
+            entry[name] = None
+        elif name in DECIMAL_FIELDS:
+            entry[name] = Decimal(value)
+        elif name == "updated_at":
+            entry[name] = float(value)
+        elif name == "trades_24h":
+            entry[name] = int(value)
+        elif name == "quote":
+            entry[name] = json.loads(value)
+        else:
+            entry[name] = value
+    return entry
+
+
+class RedisMarketData:
+    """
+    Latest ticker, 24h stats and top of book per market, plus upstream quotes.
+
+    Two tiers: a dict in this process, read without awaiting, backed by a
+    Redis hash per symbol (``mdc:{symbol}``) shared by all workers. Markets
+    hosted here are pushed: ``record`` (a sequencer listener) updates the
+    local entry right away and changed entries go to Redis in one pipeline
+    per loop tick. Everything else is read through and kept ``ttl`` seconds
+    (``quote_ttl`` for upstream quotes). Concurrent misses of one key share
+    a single load, so a hot symbol costs one Redis read or upstream call
+    however many requests are waiting for it.
+    """
+    def __init__(self, redis_client: Redis, ttl: float = 1.0, quote_ttl: float = 30.0):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.quote_ttl = quote_ttl
+        self._local: dict[str, dict] = {}
+        self._expires: dict[str, float] = {}  # No expiry: pushed by this process
+        self._top: dict[str, tuple] = {}      # Last pushed top of book in ticks/lots
+        self._dirty: set[str] = set()
+        self._flusher: Optional[asyncio.Task] = None
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.upstream_fetches = 0
+
+    @staticmethod
+    def key(symbol: str) -> str:
+        return f"mdc:{symbol}"
+
+    def update(self, symbol: str, fields: dict) -> None:
+        """Push new values of a symbol's fields (engine or ingestion)"""
+        entry = self._local.get(symbol)
+        if entry is None or symbol in self._expires:
+            entry = self._local[symbol] = {"symbol": symbol}
+            self._expires.pop(symbol, None)
+        entry.update(fields)
+        entry["updated_at"] = time.time()
+        self._dirty.add(symbol)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._flush(), name="market-data-flush")
+
+    def attach(self, book: OrderBook) -> None:
+        self._push_top(book, force=True)
+
+    def record(self, book: OrderBook, command: Command, result: CommandResult) -> None:
+        """Sequencer listener: last fill and top of book after the command"""
+        if result.trades:
+            market = book.market
+            last = result.trades[-1]
+            self.update(market.symbol, {
+                "last_price": market.ticks_to_price(last.price),
+                "last_amount": market.lots_to_qty(last.amount),
+            })
+        self._push_top(book)
+
+    def _push_top(self, book: OrderBook, force: bool = False) -> None:
+        bid, ask = book.bids.best(), book.asks.best()
+        top = (
+            bid.price if bid else None, bid.total_remaining if bid else None,
+            ask.price if ask else None, ask.total_remaining if ask else None,
+        )
+        symbol = book.market.symbol
+        if not force and self._top.get(symbol) == top:
+            return
+        self._top[symbol] = top
+        market = book.market
+        self.update(symbol, {
+            "best_bid": market.ticks_to_price(bid.price) if bid else None,
+            "best_bid_amount": market.lots_to_qty(bid.total_remaining) if bid else None,
+            "best_ask": market.ticks_to_price(ask.price) if ask else None,
+            "best_ask_amount": market.lots_to_qty(ask.total_remaining) if ask else None,
+        })
+
+    async def _flush(self) -> None:
+        await asyncio.sleep(0)  # Let the rest of the group's updates land
+        while self._dirty:
+            symbols, self._dirty = self._dirty, set()
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for symbol in symbols:
+                        pipe.hset(self.key(symbol), mapping=encode_entry(self._local[symbol]))
+                    await pipe.execute()
+            except Exception:
+                # Readers elsewhere keep the previous values until the next push
+                logger.exception(f"Failed to push market data of {len(symbols)} symbols")
+
+    def get_local(self, symbol: str) -> Optional[dict]:
+        """Entry from the in-process tier if present and fresh"""
+        entry = self._local.get(symbol)
+        if entry is None:
+            return None
+        expires = self._expires.get(symbol)
+        if expires is not None and expires < time.monotonic():
+            return None
+        return entry
+
+    async def get(self, symbol: str) -> Optional[dict]:
+        """Ticker entry of a market, pushed here or read from Redis"""
+        entry = self.get_local(symbol)
+        if entry is not None:
+            return entry
+        return await self._single_flight(symbol, self._read, self.ttl)
+
+    async def get_quote(self, symbol: str, fetch: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        """
+        Upstream quote of ``symbol``, from either tier or, on a miss,
+        ``fetch()`` once for all concurrent callers. None results are not cached.
+        """
+        key = f"quote:{symbol}"
+        entry = self.get_local(key)
+        if entry is None:
+            entry = await self._single_flight(key, lambda key: self._fetch_quote(key, fetch), self.quote_ttl)
+        return entry["quote"] if entry is not None else None
+
+    async def _read(self, key: str) -> Optional[dict]:
+        fields = await self.redis.hgetall(self.key(key))
+        return decode_entry(fields) if fields else None
+
+    async def _fetch_quote(self, key: str, fetch: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        entry = await self._read(key)
+        if entry is not None:
+            return entry
+        self.upstream_fetches += 1
+        quote = await fetch()
+        if quote is None:
+            return None
+        entry = {"quote": quote, "updated_at": time.time()}
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.hset(self.key(key), mapping=encode_entry(entry))
+                pipe.expire(self.key(key), max(1, int(self.quote_ttl)))
+                await pipe.execute()
+        except Exception:
+            logger.exception(f"Failed to cache {key}")
+        return entry
+
+    async def _single_flight(self, key: str, load: Callable[[str], Awaitable[Optional[dict]]], ttl: float) -> Optional[dict]:
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.get_running_loop().create_task(self._load(key, load, ttl))
+        # Shielded: a caller giving up does not cancel the load for the others
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, load: Callable[[str], Awaitable[Optional[dict]]], ttl: float) -> Optional[dict]:
+        try:
+            entry = await load(key)
+            if entry is not None and (key not in self._local or key in self._expires):
+                self._local[key] = entry
+                self._expires[key] = time.monotonic() + ttl
+            return entry
+        finally:
+            self._inflight.pop(key, None)
+
+    async def stop(self) -> None:
+        if self._flusher is not None:
+            await asyncio.gather(self._flusher, return_exceptions=True)
+
+
+market_data = RedisMarketData(
+    redis,
+    ttl=settings.engine.ticker_cache_ttl_ms / 1000,
+    quote_ttl=settings.engine.quote_cache_ttl_ms / 1000
+)
@@ -0,0 +1,170 @@
+from decimal import Decimal
+from typing import Optional
+import asyncio
+import json
+import logging
+
+from redis.asyncio import Redis
+
+from src.core.config.settings import settings
+from src.core.services.cache.redis.redis_fastapi import redis
+from src.core.services.crypto.exchange.events import EventBus, MarketEvent, event_bus
+from src.core.services.crypto.exchange.trade import OrderBook
+
+
+logger = logging.getLogger(__name__)
+
+# Numeric payload fields, sent as strings so no precision is lost
+DECIMAL_FIELDS = ("price", "amount", "filled")
+
+def encode_event(event: MarketEvent) -> bytes:
+    return json.dumps({"seq": event.seq, "kind": event.kind, "data": event.data}, default=str).encode()
+
+def decode_event(market: str, payload: bytes) -> MarketEvent:
+    message = json.loads(payload)
+    data = message["data"]
+    for name in DECIMAL_FIELDS:
+        if name in data:
+            data[name] = Decimal(data[name])
+    return MarketEvent(market, message["seq"], message["kind"], data)
+
+
+class RedisStreamBridge:
+    """
+    Multi-process adapter for the EventBus on Redis Streams.
+
+    The worker owning a market appends its events to ``md:{market}``
+    (XADD, batched in one pipeline per loop tick, trimmed to ``maxlen``)
+    and, at most every ``snapshot_interval`` seconds, a full depth snapshot
+    with the sequence number and stream id of the last event it includes
+    next to it; ``read_after`` that id brings a snapshot up to date. Other
+    workers run a single XREAD follower per market they have subscribers
+    for and republish into their local bus, so websocket sessions always
+    subscribe locally whichever worker hosts the book.
+    """
+    def __init__(self, redis_client: Redis, bus: EventBus, maxlen: int = 100_000, snapshot_interval: float = 1.0):
+        self.redis = redis_client
+        self.bus = bus
+        self.maxlen = maxlen
+        self.snapshot_interval = snapshot_interval
+        self._books: dict[str, OrderBook] = {}
+        self._snapshot_at: dict[str, float] = {}  # market -> loop time of its last snapshot
+        self._outbox: list[MarketEvent] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._followers: dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def stream_key(market: str) -> str:
+        return f"md:{market}"
+
+    @staticmethod
+    def snapshot_key(market: str) -> str:
+        return f"md:{market}:snapshot"
+
+    def register(self, book: OrderBook) -> None:
+        """Publish events and snapshots of a locally hosted market"""
+        self._books[book.market.symbol] = book
+
+    def forward(self, event: MarketEvent) -> None:
+        """EventBus forwarder, queues a local event for the next pipeline"""
+        if event.market not in self._books:
+            return
+        self._outbox.append(event)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._flush(), name="event-stream-flush")
+
+    async def _flush(self) -> None:
+        await asyncio.sleep(0)  # Let the rest of the group's events queue up
+        # Events forwarded while a pipeline is in flight go out with the next one
+        loop = asyncio.get_running_loop()
+        while self._outbox:
+            events, self._outbox = self._outbox, []
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    markets = {}  # market -> (seq, pipeline index) of its last event
+                    for index, event in enumerate(events):
+                        pipe.xadd(self.stream_key(event.market), {"e": encode_event(event)}, maxlen=self.maxlen, approximate=True)
+                        markets[event.market] = (event.seq, index)
+                    # The book is at these events right now, once the pipeline is sent it moves on
+                    now = loop.time()
+                    snapshots = {}
+                    for market, (seq, index) in markets.items():
+                        if now - self._snapshot_at.get(market, -self.snapshot_interval) >= self.snapshot_interval:
+                            snapshot = self._books[market].get_market_depth(None)
+                            snapshot["seq"] = seq
+                            snapshots[market] = (snapshot, index)
+                    ids = await pipe.execute()
+                if snapshots:
+                    async with self.redis.pipeline(transaction=False) as pipe:
+                        for market, (snapshot, index) in snapshots.items():
+                            stream_id = ids[index]
+                            snapshot["stream_id"] = stream_id.decode() if isinstance(stream_id, bytes) else stream_id
+                            pipe.set(self.snapshot_key(market), json.dumps(snapshot, default=str))
+                        await pipe.execute()
+                    for market in snapshots:
+                        self._snapshot_at[market] = now
+            except Exception:
+                # Remote followers see a gap in seq and resync from the next snapshot, taken right away
+                logger.exception(f"Failed to stream {len(events)} market events")
+                self._snapshot_at.clear()
+
+    async def get_snapshot(self, market: str) -> Optional[dict]:
+        """Latest depth snapshot of a remote market, with the seq and stream id it includes"""
+        payload = await self.redis.get(self.snapshot_key(market))
+        if payload is None:
+            return None
+        snapshot = json.loads(payload)
+        for side in ("bids", "asks"):
+            for level in snapshot[side]:
+                level["price"] = Decimal(level["price"])
+                level["amount"] = Decimal(level["amount"])
+        return snapshot
+
+    async def read_after(self, market: str, stream_id: str) -> list[MarketEvent]:
+        """Events of a remote market streamed after ``stream_id``"""
+        entries = await self.redis.xrange(self.stream_key(market), min=f"({stream_id}", max="+")
+        return [decode_event(market, fields[b"e"]) for _, fields in entries]
+
+    def follow(self, market: str) -> None:
+        """Mirror a remote market's stream into the local bus while it has subscribers"""
+        task = self._followers.get(market)
+        if task is None or task.done():
+            self._followers[market] = asyncio.get_running_loop().create_task(
+                self._follow(market),
+                name=f"event-stream-{market}"
+                )
+
+    async def _follow(self, market: str) -> None:
+        key = self.stream_key(market)
+        last_id = "$"
+        while self.bus.subscriber_count(market):
+            try:
+                response = await self.redis.xread({key: last_id}, count=1000, block=1000)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Reading {key} failed")
+                await asyncio.sleep(1)
+                continue
+            for _, entries in response:
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    self.bus.publish(decode_event(market, fields[b"e"]))
+        self._followers.pop(market, None)
+
+    async def stop(self) -> None:
+        tasks = list(self._followers.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._followers.clear()
+        if self._flusher is not None:
+            await asyncio.gather(self._flusher, return_exceptions=True)
+
+
+stream_bridge = RedisStreamBridge(
+    redis,
+    event_bus,
+    maxlen=settings.engine.event_stream_maxlen,
+    snapshot_interval=settings.engine.stream_snapshot_ms / 1000
+)
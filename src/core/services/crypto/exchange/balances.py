@@ -0,0 +1,275 @@
+from decimal import Decimal
+from time import monotonic
+from typing import Iterable, Optional
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.config.settings import settings
+from src.core.dependencies.db_helper import db_helper
+from src.core.services.crypto.exchange.enums import Side, OrderType, OrderStatus
+from src.core.services.crypto.exchange.trade import Order, OrderBook, Trade
+from src.core.services.crypto.exchange.sequencer import Command, CommandResult
+from src.core.services.crypto.exchange.persistence import OrderWriter, order_writer
+from src.core.services.database.orm.balance import select_balances
+
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal(0)
+
+class BalanceLedger:
+    """
+    In-memory available-balance cache in front of the wallets table.
+
+    Pre-trade checks (``check``/``reserve``, an OrderBook check and its
+    accept) and accounting (``settle``, a sequencer hook) run synchronously on the market's single
+    writer, so each order sees the effect of every command before it.
+    Buy orders lock quote (limit price * remaining, or the sweep cost for
+    market orders), sell orders lock the remaining base amount. Every change
+    is also netted per market and (user, currency) and handed to the
+    OrderWriter once that market's command group is durable, which applies
+    it as one conditional upsert per wallet (see orm/balance.py).
+
+    Balances are cached per process and read again ``ttl`` seconds after
+    they were loaded (or right after ``invalidate``), so deposits and
+    withdrawals made in the table show up; changes not stored yet are
+    added back on top. With markets sharded over several workers the
+    conditional upsert, not this cache, is the final guard for wallets
+    shared between markets, a refused change halts the worker's markets.
+    """
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        writer: Optional[OrderWriter] = None,
+        ttl: float = 5.0
+    ):
+        self.session_factory = session_factory
+        self.writer = writer
+        self.ttl = ttl
+        self._balances: dict[tuple[int, str], list[Decimal]] = {}  # (user, currency) -> [balance, locked]
+        self._loaded: dict[int, float] = {}                        # UserID -> monotonic time of the read
+        self._order_locks: dict[int, Decimal] = {}                 # OrderID -> amount still reserved
+        # MarketID -> (user, currency) -> [balance delta, locked delta]
+        self._staged: dict[int, dict[tuple[int, str], list[Decimal]]] = {}
+        self._checked: Optional[tuple[Order, str, Decimal]] = None  # Reservation of the last passed check
+
+    async def ensure_loaded(self, user_ids: Iterable[int]) -> None:
+        """Read wallets of users not cached or cached too long, the only database access on the order path"""
+        now = monotonic()
+        missing = []
+        for user_id in set(user_ids):
+            loaded_at = self._loaded.get(user_id)
+            # Without a writer the table never sees trades, the first read is the only one
+            if loaded_at is None or (self.writer is not None and now - loaded_at >= self.ttl):
+                missing.append(user_id)
+        if not missing:
+            return
+        if self.writer is None:
+            self._fill(missing, await self._select(missing))
+            return
+        # No flush between the read and adding what is pending, it would be counted twice
+        async with self.writer.flush_lock:
+            self._fill(missing, await self._select(missing))
+
+    async def _select(self, user_ids: list[int]) -> list:
+        async with self.session_factory() as session:
+            return await select_balances(session, user_ids)
+
+    def _fill(self, user_ids: list[int], wallets: list) -> None:
+        """Cache table values plus the changes staged by markets or pending in the writer"""
+        users = set(user_ids)
+        fresh = {(wallet.user_id, wallet.currency): [wallet.balance, wallet.locked] for wallet in wallets}
+        unsaved = list(self._staged.values())
+        if self.writer is not None:
+            unsaved.append(self.writer.pending_balance_changes)
+        for changes in unsaved:
+            for key, (balance, locked) in changes.items():
+                if key[0] in users:
+                    entry = fresh.get(key)
+                    if entry is None:
+                        fresh[key] = [balance, locked]
+                    else:
+                        entry[0] += balance
+                        entry[1] += locked
+        for key in [key for key in self._balances if key[0] in users]:
+            del self._balances[key]
+        self._balances.update(fresh)
+        now = monotonic()
+        for user_id in users:
+            self._loaded[user_id] = now
+
+    def invalidate(self, user_id: int) -> None:
+        """Forget cached balances after an external change (deposit, withdrawal)"""
+        self._loaded.pop(user_id, None)
+        for key in [key for key in self._balances if key[0] == user_id]:
+            del self._balances[key]
+
+    def get_balances(self, user_id: int) -> dict[str, dict]:
+        return {
+            currency: {"balance": balance, "locked": locked, "available": balance - locked}
+            for (owner, currency), (balance, locked) in self._balances.items()
+            if owner == user_id
+        }
+
+    def available(self, user_id: int, currency: str) -> Decimal:
+        entry = self._balances.get((user_id, currency))
+        return entry[0] - entry[1] if entry else ZERO
+
+    @staticmethod
+    def required(book: OrderBook, order: Order, price: int, amount: int) -> tuple[str, Decimal]:
+        """Currency and amount an order must hold for its unfilled part at ``price``/``amount``"""
+        market = book.market
+        remaining = amount - order.filled
+        if order.side is Side.SELL:
+            return market.base, market.lots_to_qty(remaining)
+        if order.type is OrderType.LIMIT:
+            return market.quote, market.ticks_to_price(price) * market.lots_to_qty(remaining)
+        # Market buy: exact cost of the sweep it is about to do
+        cost = 0
+        for level in book.asks.levels():
+            take = min(remaining, level.total_remaining)
+            cost += level.price * take
+            remaining -= take
+            if not remaining:
+                break
+        return market.quote, cost * market.tick_size * market.lot_size
+
+    def check(self, book: OrderBook, order: Order, price: int, amount: int) -> None:
+        """Pre-trade check, funds for a new order or the increase of an amended one must be available"""
+        currency, needed = self.required(book, order, price, amount)
+        extra = needed - self._order_locks.get(order.id, ZERO)
+        if extra > 0 and self.available(order.user_id, currency) < extra:
+            raise ValueError(f"Insufficient {currency} balance")
+        self._checked = (order, currency, extra)
+
+    def reserve(self, book: OrderBook, order: Order, price: int, amount: int) -> None:
+        """Accept of ``check``: lock (or release) the difference it computed"""
+        checked, currency, extra = self._checked
+        self._checked = None
+        if checked is not order:
+            raise RuntimeError("BalanceLedger.reserve without a passed check")
+        if extra > 0:
+            self.lock_for_order(book, order, currency, extra)
+        elif extra < 0:
+            self.release(book, order, currency, -extra)
+
+    def lock_for_order(self, book: OrderBook, order: Order, currency: str, amount: Decimal) -> None:
+        self._order_locks[order.id] = self._order_locks.get(order.id, ZERO) + amount
+        self._change(book.market.market_id, order.user_id, currency, ZERO, amount)
+
+    def release(self, book: OrderBook, order: Order, currency: str, amount: Decimal) -> None:
+        self._order_locks[order.id] = self._order_locks.get(order.id, ZERO) - amount
+        self._change(book.market.market_id, order.user_id, currency, ZERO, -amount)
+
+    def settle_trade(self, book: OrderBook, trade: Trade) -> None:
+        """Move funds for one fill and consume both orders' reservations"""
+        market = book.market
+        market_id = market.market_id
+        quantity = market.lots_to_qty(trade.amount)
+        cost = market.ticks_to_price(trade.price) * quantity
+
+        buy_order = book.get_order(trade.buy_order_id)
+        # Limit buys reserved at their own price, the improvement is freed here
+        consumed = cost
+        if buy_order is not None and buy_order.type is OrderType.LIMIT:
+            consumed = market.ticks_to_price(buy_order.price) * quantity
+        self._order_locks[trade.buy_order_id] = self._order_locks.get(trade.buy_order_id, ZERO) - consumed
+        self._change(market_id, trade.buyer_id, market.quote, -cost, -consumed)
+        self._change(market_id, trade.buyer_id, market.base, quantity, ZERO)
+
+        self._order_locks[trade.sell_order_id] = self._order_locks.get(trade.sell_order_id, ZERO) - quantity
+        self._change(market_id, trade.seller_id, market.base, -quantity, -quantity)
+        self._change(market_id, trade.seller_id, market.quote, cost, ZERO)
+
+    def settle(self, book: OrderBook, command: Command, result: CommandResult) -> None:
+        """Sequencer hook: settle fills, release what finished orders still hold"""
+        touched: list[Order] = []
+        if command.kind in ('new', 'amend'):
+            touched.append(result.value)
+        elif command.kind == 'batch':
+            touched.extend(item for item in result.value if isinstance(item, Order))
+        elif command.kind == 'cancel' and result.value:
+            touched.append(book.get_order(command.kwargs['order_id']))
+
+        if command.replayed and command.kind in ('new', 'amend'):
+            self._reserve_replayed(book, result)
+        for trade in result.trades:
+            self.settle_trade(book, trade)
+            touched.append(book.get_order(trade.buy_order_id))
+            touched.append(book.get_order(trade.sell_order_id))
+
+        market = book.market
+        for order in touched:
+            if order is None or order.status is OrderStatus.OPEN:
+                continue
+            leftover = self._order_locks.pop(order.id, None)
+            if leftover:
+                currency = market.base if order.side is Side.SELL else market.quote
+                self._change(market.market_id, order.user_id, currency, ZERO, -leftover)
+
+    def _reserve_replayed(self, book: OrderBook, result: CommandResult) -> None:
+        """Lock what ``check`` locked when a replayed order (or amendment) first ran, before its fills"""
+        order: Order = result.value
+        market = book.market
+        remaining = order.amount - order.filled
+        sweep_cost = ZERO
+        for trade in result.trades:
+            if order.id in (trade.buy_order_id, trade.sell_order_id):
+                remaining += trade.amount
+                sweep_cost += market.ticks_to_price(trade.price) * market.lots_to_qty(trade.amount)
+        if order.side is Side.SELL:
+            currency, needed = market.base, market.lots_to_qty(remaining)
+        elif order.type is OrderType.LIMIT:
+            currency, needed = market.quote, market.ticks_to_price(order.price) * market.lots_to_qty(remaining)
+        else:
+            currency, needed = market.quote, sweep_cost  # Market buys lock exactly what they take
+        extra = needed - self._order_locks.get(order.id, ZERO)
+        if extra > 0:
+            self.lock_for_order(book, order, currency, extra)
+        elif extra < 0:
+            self.release(book, order, currency, -extra)
+
+    def publish(self, book: OrderBook, command: Command, result: CommandResult) -> None:
+        """Sequencer listener: hand the durable group's net changes to the writer"""
+        staged = self._staged.pop(book.market.market_id, None)
+        if staged and self.writer is not None:
+            self.writer.stage_balance_changes(staged)
+
+    def discard(self, book: OrderBook) -> None:
+        """Drop changes of a group that never became durable (halted market)"""
+        self._staged.pop(book.market.market_id, None)
+
+    def _change(self, market_id: int, user_id: int, currency: str, balance: Decimal, locked: Decimal) -> None:
+        key = (user_id, currency)
+        if user_id in self._loaded:
+            entry = self._balances.get(key)
+            if entry is None:
+                entry = self._balances[key] = [ZERO, ZERO]
+            entry[0] += balance
+            entry[1] += locked
+        staged = self._staged.get(market_id)
+        if staged is None:
+            staged = self._staged[market_id] = {}
+        entry = staged.get(key)
+        if entry is None:
+            staged[key] = [balance, locked]
+        else:
+            entry[0] += balance
+            entry[1] += locked
+
+    def rebuild(self, book: OrderBook) -> set[int]:
+        """Re-derive reservations of a recovered book, returns its users"""
+        users = set()
+        for order in book.orders.values():
+            if order.status is OrderStatus.OPEN and order.level is not None:
+                self._order_locks[order.id] = self.required(book, order, order.price, order.amount)[1]
+                users.add(order.user_id)
+        return users
+
+
+balance_ledger = BalanceLedger(
+    db_helper.session_factory,
+    order_writer,
+    ttl=settings.engine.balance_ttl_ms / 1000
+)
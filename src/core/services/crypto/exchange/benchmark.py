@@ -0,0 +1,322 @@
+"""
+Order book benchmarks and replay harness.
+
+    python -m src.core.services.crypto.exchange.benchmark cancel
+    python -m src.core.services.crypto.exchange.benchmark synthetic --orders 200000 --record flow.jsonl
+    python -m src.core.services.crypto.exchange.benchmark replay flow.jsonl
+    python -m src.core.services.crypto.exchange.benchmark memory
+    python -m src.core.services.crypto.exchange.benchmark synthetic --market USDC-USDT --mid 1 --backend heap
+    python -m src.core.services.crypto.exchange.benchmark risk --orders 200000
+
+Command logs are JSON lines, ``{"op": "new", ...create_order kwargs}`` or
+``{"op": "cancel", "ref": n}`` where ``n`` is the index of the "new"
+command that created the order, so a log replays identically regardless
+of the order ids the engine generates.
+"""
+from decimal import Decimal
+from time import perf_counter_ns
+from typing import Iterable, Iterator, Optional
+import argparse
+import json
+import random
+import tracemalloc
+
+from src.core.services.crypto.exchange.market import DEFAULT_MARKET
+from src.core.services.crypto.exchange.trade import OrderBook
+from src.core.services.crypto.exchange.sequencer import Command, CommandResult
+from src.core.services.crypto.exchange.risk import RiskEngine, RiskLimits
+
+
+def bench_cancel(depth: int, cancels: int = 1000, seed: int = 42) -> float:
+    """Average ns per cancel of a random order on a single level of ``depth`` orders"""
+    rng = random.Random(seed)
+    book = OrderBook()
+    order_ids = []
+    for _ in range(depth + cancels):
+        order = book.create_order(1, 'sell', 'limit', '100', '1')
+        order_ids.append(order.id)
+
+    victims = rng.sample(order_ids, cancels)
+    started = perf_counter_ns()
+    for order_id in victims:
+        book.cancel_order(order_id)
+    return (perf_counter_ns() - started) / cancels
+
+
+def synthetic_flow(
+    orders: int,
+    cancel_ratio: float = 0.3,
+    levels: int = 50,
+    cross_rate: float = 0.05,
+    market: str = DEFAULT_MARKET,
+    seed: int = 42,
+    mid: str = '100'
+) -> Iterator[dict]:
+    """
+    Deterministic synthetic command stream around a fixed mid price.
+    ``levels`` is the number of passive price levels per side,
+    ``cross_rate`` the share of new orders priced through the touch.
+    """
+    rng = random.Random(seed)
+    config = OrderBook(market).market
+    mid = config.price_to_ticks(mid)
+    live: list[int] = []  # indexes of "new" commands that may still rest
+    new_index = 0
+
+    for _ in range(orders):
+        if live and rng.random() < cancel_ratio:
+            ref = live.pop(rng.randrange(len(live)))
+            yield {"op": "cancel", "ref": ref}
+            continue
+
+        side = 'buy' if rng.random() < 0.5 else 'sell'
+        offset = rng.randint(1, levels)
+        if rng.random() < cross_rate:
+            offset = -rng.randint(1, 3)
+        price = mid - offset if side == 'buy' else mid + offset
+        yield {
+            "op": "new",
+            "user_id": rng.randint(1, 1000),
+            "side": side,
+            "order_type": 'limit',
+            "price": str(config.ticks_to_price(price)),
+            "amount": str(config.lots_to_qty(rng.randint(1, 10))),
+        }
+        live.append(new_index)
+        new_index += 1
+
+
+def run_commands(
+    commands: Iterable[dict],
+    market: str = DEFAULT_MARKET,
+    backend: Optional[str] = None,
+    checks: Iterable = (),
+    hooks: Iterable = ()
+) -> dict:
+    """
+    Feed commands straight into one book, timing each of them. ``checks``
+    are added as pre-trade checks, ``hooks`` get called after every command
+    and finished orders are pruned the way MarketSequencer does it.
+    """
+    book = OrderBook(market, book_backend=backend)
+    for check in checks:
+        book.add_check(check)
+    hooks = list(hooks)
+    created: list[Optional[int]] = []
+    latencies: list[int] = []
+    trades = 0
+
+    started = perf_counter_ns()
+    for command in commands:
+        kwargs = dict(command)
+        op = kwargs.pop("op")
+        t0 = perf_counter_ns()
+        if op == "new":
+            try:
+                value = book.create_order(**kwargs)
+            except ValueError:
+                created.append(None)  # rejected by a check
+                latencies.append(perf_counter_ns() - t0)
+                continue
+            created.append(value.id)
+        elif op == "cancel":
+            order_id = created[kwargs["ref"]]
+            if order_id is None:
+                continue
+            kwargs = {"order_id": order_id}
+            value = book.cancel_order(order_id)
+        else:
+            raise ValueError(f"Unknown command: {op}")
+        fills = book.drain_trades()
+        if hooks:
+            result = CommandResult(value, fills)
+            applied = Command('new' if op == "new" else 'cancel', kwargs, None)
+            for hook in hooks:
+                hook(book, applied, result)
+        book.prune_finished()
+        latencies.append(perf_counter_ns() - t0)
+        trades += len(fills)
+    elapsed = perf_counter_ns() - started
+
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "commands": count,
+        "trades": trades,
+        "resting": sum(level.order_count for level in book.bids.levels())
+                   + sum(level.order_count for level in book.asks.levels()),
+        "commands_per_sec": count / (elapsed / 1e9) if elapsed else 0.0,
+        "p50_ns": _percentile(latencies, 0.5),
+        "p99_ns": _percentile(latencies, 0.99),
+    }
+
+
+def _percentile(values: list[int], share: float) -> int:
+    return values[min(len(values) - 1, int(len(values) * share))] if values else 0
+
+
+def bench_risk(
+    orders: int = 100_000,
+    market: str = DEFAULT_MARKET,
+    seed: int = 42,
+    mid: str = '100'
+) -> dict:
+    """
+    Cost of the risk layer: per call latency of RiskEngine.check (pre-trade)
+    and RiskEngine.apply (post-command hook) on a synthetic flow, plus the
+    end-to-end p50 of the same flow with and without it. Limits are high
+    enough that nothing is rejected but every comparison still runs.
+    """
+    flow = list(synthetic_flow(orders, market=market, seed=seed, mid=mid))
+    baseline = run_commands(flow, market)
+
+    risk = RiskEngine({market: RiskLimits(
+        max_open_orders=1_000_000,
+        max_position=Decimal('1e9'),
+        max_open_notional=Decimal('1e15'),
+        orders_per_second=1e9,
+        burst=1_000_000_000
+        )})
+    check_ns: list[int] = []
+    apply_ns: list[int] = []
+
+    def timed_check(book, order, price, amount):
+        t0 = perf_counter_ns()
+        risk.check(book, order, price, amount)
+        risk.accept(book, order, price, amount)
+        check_ns.append(perf_counter_ns() - t0)
+
+    def timed_apply(book, command, result):
+        t0 = perf_counter_ns()
+        risk.apply(book, command, result)
+        apply_ns.append(perf_counter_ns() - t0)
+
+    checked = run_commands(flow, market, checks=[timed_check], hooks=[timed_apply])
+    check_ns.sort()
+    apply_ns.sort()
+    return {
+        "check_p50_ns": _percentile(check_ns, 0.5),
+        "check_p99_ns": _percentile(check_ns, 0.99),
+        "apply_p50_ns": _percentile(apply_ns, 0.5),
+        "apply_p99_ns": _percentile(apply_ns, 0.99),
+        "baseline_p50_ns": baseline["p50_ns"],
+        "checked_p50_ns": checked["p50_ns"],
+        "rejections": sum(risk.rejections.values()),
+    }
+
+
+def measure_memory(
+    resting: int = 100_000,
+    market: str = DEFAULT_MARKET,
+    backend: Optional[str] = None,
+    mid: str = '100'
+) -> float:
+    """Bytes of Python heap per resting order (including book bookkeeping)"""
+    flow = list(synthetic_flow(resting, cancel_ratio=0.0, cross_rate=0.0, market=market, mid=mid))
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    book = OrderBook(market, book_backend=backend)
+    for command in flow:
+        kwargs = dict(command)
+        kwargs.pop("op")
+        book.create_order(**kwargs)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / resting
+
+
+def write_log(path: str, commands: Iterable[dict]) -> list[dict]:
+    commands = list(commands)
+    with open(path, 'w') as file_x:
+        for command in commands:
+            file_x.write(json.dumps(command) + '\n')
+    return commands
+
+
+def read_log(path: str) -> Iterator[dict]:
+    with open(path) as file_x:
+        for line in file_x:
+            if line.strip():
+                yield json.loads(line)
+
+
+def print_report(stats: dict):
+    print(f"commands      {stats['commands']}")
+    print(f"trades        {stats['trades']}")
+    print(f"resting       {stats['resting']}")
+    print(f"commands/sec  {stats['commands_per_sec']:,.0f}")
+    print(f"p50 latency   {stats['p50_ns'] / 1000:.2f} us")
+    print(f"p99 latency   {stats['p99_ns'] / 1000:.2f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    cancel = commands.add_parser('cancel', help="cancel latency vs level depth")
+    cancel.add_argument('--depths', type=int, nargs='+', default=[10, 100, 1_000, 10_000, 100_000])
+
+    synthetic = commands.add_parser('synthetic', help="synthetic order flow throughput")
+    synthetic.add_argument('--orders', type=int, default=100_000)
+    synthetic.add_argument('--cancel-ratio', type=float, default=0.3)
+    synthetic.add_argument('--levels', type=int, default=50)
+    synthetic.add_argument('--cross-rate', type=float, default=0.05)
+    synthetic.add_argument('--seed', type=int, default=42)
+    synthetic.add_argument('--market', default=DEFAULT_MARKET)
+    synthetic.add_argument('--mid', default='100')
+    synthetic.add_argument('--backend', help="override the market's book backend")
+    synthetic.add_argument('--record', help="also write the generated command log to this file")
+
+    replay = commands.add_parser('replay', help="replay a recorded command log")
+    replay.add_argument('log')
+    replay.add_argument('--market', default=DEFAULT_MARKET)
+    replay.add_argument('--backend', help="override the market's book backend")
+
+    memory = commands.add_parser('memory', help="heap bytes per resting order")
+    memory.add_argument('--orders', type=int, default=100_000)
+    memory.add_argument('--market', default=DEFAULT_MARKET)
+    memory.add_argument('--mid', default='100')
+    memory.add_argument('--backend', help="override the market's book backend")
+
+    risk = commands.add_parser('risk', help="cost of the pre-trade risk layer")
+    risk.add_argument('--orders', type=int, default=100_000)
+    risk.add_argument('--market', default=DEFAULT_MARKET)
+    risk.add_argument('--mid', default='100')
+    risk.add_argument('--seed', type=int, default=42)
+
+    args = parser.parse_args()
+
+    if args.command == 'cancel':
+        print(f"{'level depth':>12} | {'ns/cancel':>10}")
+        for depth in args.depths:
+            print(f"{depth:>12} | {bench_cancel(depth):>10.0f}")
+
+    elif args.command == 'synthetic':
+        flow = synthetic_flow(
+            args.orders,
+            args.cancel_ratio,
+            args.levels,
+            args.cross_rate,
+            args.market,
+            args.seed,
+            args.mid
+            )
+        flow = write_log(args.record, flow) if args.record else list(flow)
+        print_report(run_commands(flow, args.market, args.backend))
+
+    elif args.command == 'replay':
+        print_report(run_commands(list(read_log(args.log)), args.market, args.backend))
+
+    elif args.command == 'memory':
+        print(f"{measure_memory(args.orders, args.market, args.backend, args.mid):.0f} bytes per resting order")
+
+    elif args.command == 'risk':
+        stats = bench_risk(args.orders, args.market, args.seed, args.mid)
+        print(f"check         p50 {stats['check_p50_ns'] / 1000:.2f} us  p99 {stats['check_p99_ns'] / 1000:.2f} us")
+        print(f"apply         p50 {stats['apply_p50_ns'] / 1000:.2f} us  p99 {stats['apply_p99_ns'] / 1000:.2f} us")
+        print(f"command p50   {stats['baseline_p50_ns'] / 1000:.2f} us without, {stats['checked_p50_ns'] / 1000:.2f} us with risk")
+        print(f"rejections    {stats['rejections']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+from abc import ABC, abstractmethod
+from sortedcontainers import SortedDict
+from itertools import islice
+from typing import Iterator, Optional
+import heapq
+
+from src.core.services.crypto.exchange.market import MarketConfig
+from src.core.services.crypto.exchange.price_level import PriceLevel
+
+
+class BookSide(ABC):
+    """
+    One side (bids or asks) of an order book: price ticks -> PriceLevel,
+    ordered best first. Backends differ only in how levels are indexed,
+    the matching code in OrderBook talks to this interface alone.
+    """
+    def __init__(self, is_bid: bool, config: MarketConfig):
+        self.is_bid = is_bid
+        self.config = config
+
+    def accepts(self, price: int) -> bool:
+        """Whether an order may rest at this price"""
+        return True
+
+    @abstractmethod
+    def get(self, price: int) -> Optional[PriceLevel]:
+        ...
+
+    @abstractmethod
+    def add_level(self, price: int) -> PriceLevel:
+        """Create and index an empty level (price must not exist yet)"""
+
+    @abstractmethod
+    def remove_level(self, price: int) -> None:
+        ...
+
+    @abstractmethod
+    def best(self) -> Optional[PriceLevel]:
+        ...
+
+    @abstractmethod
+    def pop_best(self) -> None:
+        ...
+
+    @abstractmethod
+    def levels(self) -> Iterator[PriceLevel]:
+        """Iterate levels best first"""
+
+    def top(self, depth: Optional[int]) -> list[PriceLevel]:
+        return list(islice(self.levels(), depth))
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+
+class SortedDictSide(BookSide):
+    """General purpose backend, O(log L) insert/remove, O(1) best"""
+    def __init__(self, is_bid: bool, config: MarketConfig):
+        super().__init__(is_bid, config)
+        self._levels = SortedDict()  # bids keyed by -price, so index 0 is always best
+        self._sign = -1 if is_bid else 1
+
+    def get(self, price: int) -> Optional[PriceLevel]:
+        return self._levels.get(price * self._sign)
+
+    def add_level(self, price: int) -> PriceLevel:
+        level = self._levels[price * self._sign] = PriceLevel(price)
+        return level
+
+    def remove_level(self, price: int) -> None:
+        del self._levels[price * self._sign]
+
+    def best(self) -> Optional[PriceLevel]:
+        return self._levels.peekitem(0)[1] if self._levels else None
+
+    def pop_best(self) -> None:
+        self._levels.popitem(0)
+
+    def levels(self) -> Iterator[PriceLevel]:
+        return iter(self._levels.values())
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+
+class HeapSide(BookSide):
+    """
+    Binary heap of level keys with lazy deletion. Insert is O(log L) and
+    removing a level is an O(1) dict delete, stale heap entries are skipped
+    when they surface. Suits books with heavy churn away from the touch.
+    """
+    def __init__(self, is_bid: bool, config: MarketConfig):
+        super().__init__(is_bid, config)
+        self._levels: dict[int, PriceLevel] = {}  # price -> level
+        self._heap: list[int] = []                # -price for bids, price for asks
+        self._sign = -1 if is_bid else 1
+
+    def get(self, price: int) -> Optional[PriceLevel]:
+        return self._levels.get(price)
+
+    def add_level(self, price: int) -> PriceLevel:
+        level = self._levels[price] = PriceLevel(price)
+        heapq.heappush(self._heap, price * self._sign)
+        if len(self._heap) > 2 * len(self._levels) + 64:
+            self._compact()
+        return level
+
+    def remove_level(self, price: int) -> None:
+        del self._levels[price]
+
+    def _compact(self) -> None:
+        self._heap = [price * self._sign for price in self._levels]
+        heapq.heapify(self._heap)
+
+    def best(self) -> Optional[PriceLevel]:
+        heap, levels, sign = self._heap, self._levels, self._sign
+        while heap:
+            level = levels.get(heap[0] * sign)
+            if level is not None:
+                return level
+            heapq.heappop(heap)
+        return None
+
+    def pop_best(self) -> None:
+        level = self.best()
+        if level is not None:
+            heapq.heappop(self._heap)
+            del self._levels[level.price]
+
+    def levels(self) -> Iterator[PriceLevel]:
+        # Walks the live heap best first through a frontier of (key, index):
+        # taking k levels costs O(k log k) whatever the heap size, nothing is
+        # copied or popped. The side must not change while iterating.
+        heap, levels, sign = self._heap, self._levels, self._sign
+        size = len(heap)
+        frontier = [(heap[0], 0)] if heap else []
+        seen = set()
+        while frontier:
+            key, index = heapq.heappop(frontier)
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < size:
+                    heapq.heappush(frontier, (heap[child], child))
+            price = key * sign
+            level = levels.get(price)
+            if level is not None and price not in seen:
+                seen.add(price)
+                yield level
+
+    def top(self, depth: Optional[int]) -> list[PriceLevel]:
+        if depth is None or depth >= len(self._levels):
+            # Every level: sorting the live ones beats walking the stale keys too
+            return sorted(self._levels.values(), key=lambda level: level.price, reverse=self.is_bid)
+        return super().top(depth)
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+
+class TickArraySide(BookSide):
+    """
+    Array indexed by tick offset inside the market's fixed price band.
+    Insert/remove/lookup are O(1) list indexing, finding the next best level
+    scans towards worse prices. Only for narrow-band markets (stablecoins).
+    """
+    def __init__(self, is_bid: bool, config: MarketConfig):
+        super().__init__(is_bid, config)
+        if config.price_band is None:
+            raise ValueError(f"Market {config.symbol} needs price_band for the array backend")
+        self._low = config.price_to_ticks(config.price_band[0])
+        self._high = config.price_to_ticks(config.price_band[1])
+        self._slots: list[Optional[PriceLevel]] = [None] * (self._high - self._low + 1)
+        self._count = 0
+        self._best: Optional[int] = None  # slot index of best level
+
+    def accepts(self, price: int) -> bool:
+        return self._low <= price <= self._high
+
+    def get(self, price: int) -> Optional[PriceLevel]:
+        if not self._low <= price <= self._high:
+            return None
+        return self._slots[price - self._low]
+
+    def add_level(self, price: int) -> PriceLevel:
+        if not self.accepts(price):
+            raise ValueError(f"Price outside {self.config.symbol} band")
+        index = price - self._low
+        level = self._slots[index] = PriceLevel(price)
+        self._count += 1
+        if self._best is None or (index > self._best if self.is_bid else index < self._best):
+            self._best = index
+        return level
+
+    def remove_level(self, price: int) -> None:
+        index = price - self._low
+        self._slots[index] = None
+        self._count -= 1
+        if index == self._best:
+            self._best = self._next_from(index)
+
+    def _next_from(self, index: int) -> Optional[int]:
+        """Closest non-empty slot at a worse price than ``index``"""
+        if not self._count:
+            return None
+        slots = self._slots
+        step = -1 if self.is_bid else 1
+        index += step
+        while slots[index] is None:
+            index += step
+        return index
+
+    def best(self) -> Optional[PriceLevel]:
+        return None if self._best is None else self._slots[self._best]
+
+    def pop_best(self) -> None:
+        self.remove_level(self._slots[self._best].price)
+
+    def levels(self) -> Iterator[PriceLevel]:
+        slots = self._slots
+        index = self._best
+        if index is None:
+            return
+        step = -1 if self.is_bid else 1
+        end = -1 if self.is_bid else len(slots)
+        for i in range(index, end, step):
+            if slots[i] is not None:
+                yield slots[i]
+
+    def __len__(self) -> int:
+        return self._count
+
+
+BOOK_BACKENDS: dict[str, type[BookSide]] = {
+    'sorted': SortedDictSide,
+    'heap': HeapSide,
+    'array': TickArraySide,
+}
+
+def make_book_side(config: MarketConfig, is_bid: bool, backend: Optional[str] = None) -> BookSide:
+    """Instantiate the market's configured (or overridden) backend"""
+    name = backend or config.book_backend
+    side_class = BOOK_BACKENDS.get(name)
+    if side_class is None:
+        raise ValueError(f"Unknown book backend: {name}")
+    return side_class(is_bid, config)
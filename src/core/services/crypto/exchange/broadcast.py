@@ -0,0 +1,118 @@
+from dataclasses import dataclass
+from collections import deque
+from typing import Callable, Optional
+import asyncio
+
+
+@dataclass
+class HubMetrics:
+    clients: int = 0
+    messages: int = 0       # Broadcasts, each serialized once
+    bytes: int = 0
+    deliveries: int = 0     # Messages queued to a client
+    conflations: int = 0    # Backlogs replaced by a snapshot
+
+
+class BroadcastClient:
+    """
+    Send queue of one subscriber, holding references to shared buffers.
+    Consumed by the connection's own writer, so a slow socket only ever
+    delays itself.
+    """
+    __slots__ = ('maxsize', 'queue', 'closed', '_waiter')
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.queue: deque[bytes] = deque()
+        self.closed = False
+        self._waiter: Optional[asyncio.Future] = None  # Set while the writer waits for a message
+
+    def _wake(self) -> None:
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def offer(self, message: bytes) -> bool:
+        """Queue a message, False when the backlog is full"""
+        if len(self.queue) >= self.maxsize:
+            return False
+        self.queue.append(message)
+        if self._waiter is not None:
+            self._wake()
+        return True
+
+    def replace(self, message: bytes) -> None:
+        """Drop the backlog in favour of ``message`` (conflation)"""
+        self.queue.clear()
+        self.queue.append(message)
+        self._wake()
+
+    def close(self) -> None:
+        self.closed = True
+        self._wake()
+
+    async def get(self) -> Optional[bytes]:
+        """Next message, None once closed"""
+        while not self.queue:
+            if self.closed:
+                return None
+            self._waiter = asyncio.get_running_loop().create_future()
+            await self._waiter
+        return self.queue.popleft()
+
+
+class BroadcastHub:
+    """
+    Fan-out of already serialized messages to many clients.
+
+    ``broadcast`` appends the same bytes object to every client's bounded
+    queue, O(clients) pointer appends and no serialization. A client whose
+    backlog is full is conflated instead of blocking anyone: its queue is
+    replaced by ``snapshot()``, the serialized current state, which has to
+    include the message being broadcast. The snapshot is built at most once
+    per broadcast however many clients lag.
+    """
+    def __init__(self, snapshot: Callable[[], bytes], client_buffer: int = 1_000):
+        self.snapshot = snapshot
+        self.client_buffer = client_buffer
+        self.clients: set[BroadcastClient] = set()
+        self.metrics = HubMetrics()
+
+    def join(self) -> BroadcastClient:
+        """New client, its first message is the current snapshot"""
+        client = BroadcastClient(self.client_buffer)
+        client.offer(self.snapshot())
+        self.clients.add(client)
+        self.metrics.clients = len(self.clients)
+        return client
+
+    def leave(self, client: BroadcastClient) -> None:
+        self.clients.discard(client)
+        self.metrics.clients = len(self.clients)
+
+    def broadcast(self, message: bytes) -> None:
+        metrics = self.metrics
+        metrics.messages += 1
+        metrics.bytes += len(message)
+        snapshot = None
+        for client in self.clients:
+            if client.offer(message):
+                metrics.deliveries += 1
+                continue
+            if snapshot is None:
+                snapshot = self.snapshot()
+            client.replace(snapshot)
+            metrics.conflations += 1
+
+    def reset(self, snapshot: bytes) -> None:
+        """Resync every client, e.g. after the source lost events"""
+        for client in self.clients:
+            client.replace(snapshot)
+
+    def close(self) -> None:
+        for client in self.clients:
+            client.close()
+        self.clients.clear()
+        self.metrics.clients = 0
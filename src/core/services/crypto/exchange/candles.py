@@ -0,0 +1,254 @@
+from datetime import datetime, timezone
+from typing import Optional
+import logging
+import time
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.dependencies.db_helper import db_helper
+from src.core.services.cache.redis.redis_fastapi import RedisCacheService, cache_service
+from src.core.services.crypto.exchange.market import MarketConfig, get_market_config
+from src.core.services.crypto.exchange.trade import OrderBook
+from src.core.services.crypto.exchange.sequencer import Command, CommandResult
+from src.core.services.database.orm.trade import select_candles
+
+
+logger = logging.getLogger(__name__)
+
+# Resolution -> (seconds, candles kept in memory), finest first
+RESOLUTIONS: dict[str, tuple[int, int]] = {
+    '1s': (1, 3_600),      # 1 hour
+    '1m': (60, 1_440),     # 1 day
+    '5m': (300, 2_016),    # 1 week
+    '1h': (3_600, 2_160),  # 90 days
+    '1d': (86_400, 1_000),
+}
+
+CANDLE = np.dtype([
+    ('start', 'i8'),   # Bucket start, unix seconds
+    ('open', 'i8'),    # Prices in ticks
+    ('high', 'i8'),
+    ('low', 'i8'),
+    ('close', 'i8'),
+    ('volume', 'i8'),  # Lots
+    ('trades', 'i8'),
+])
+
+# Field positions of a candle row: [start, open, high, low, close, volume, trades]
+START, OPEN, HIGH, LOW, CLOSE, VOLUME, TRADES = range(7)
+
+
+def _merge(older: list, newer: list) -> None:
+    """Fold ``newer`` (same bucket, later in time) into ``older`` in place"""
+    older[HIGH] = max(older[HIGH], newer[HIGH])
+    older[LOW] = min(older[LOW], newer[LOW])
+    older[CLOSE] = newer[CLOSE]
+    older[VOLUME] += newer[VOLUME]
+    older[TRADES] += newer[TRADES]
+
+def serialize_candle(market: MarketConfig, row: tuple) -> dict:
+    return {
+        "start": row[START],
+        "open": market.ticks_to_price(row[OPEN]),
+        "high": market.ticks_to_price(row[HIGH]),
+        "low": market.ticks_to_price(row[LOW]),
+        "close": market.ticks_to_price(row[CLOSE]),
+        "volume": market.lots_to_qty(row[VOLUME]),
+        "trades": row[TRADES],
+    }
+
+
+class MarketCandles:
+    """
+    OHLCV series of one market at every resolution.
+
+    Fills only touch the open 1s candle. When a candle closes (the first
+    fill of a later bucket arrives) it is written to its level's NumPy
+    ring buffer and folded into the open candle of the next coarser level,
+    which closes and cascades the same way. Open candles of the finer
+    levels are merged in on read, so coarse candles are always rolled up
+    from finer ones and never recomputed from trades. Buckets without
+    fills have no candle.
+    """
+    def __init__(self, market: MarketConfig):
+        self.market = market
+        self.seconds = [seconds for seconds, _ in RESOLUTIONS.values()]
+        self.rings = []
+        for _, capacity in RESOLUTIONS.values():
+            ring = np.zeros(capacity, dtype=CANDLE)
+            ring['start'] = -1
+            self.rings.append(ring)
+        self.current: list[Optional[list]] = [None] * len(self.seconds)  # Open candle per level
+        self.first_trade_at: Optional[float] = None
+
+    def add_trade(self, price: int, amount: int, timestamp: float) -> None:
+        if self.first_trade_at is None:
+            self.first_trade_at = timestamp
+        start = int(timestamp)
+        candle = self.current[0]
+        # Late fill (clock step, replay), counted in the open candle
+        if candle is not None and candle[START] >= start:
+            if price > candle[HIGH]:
+                candle[HIGH] = price
+            elif price < candle[LOW]:
+                candle[LOW] = price
+            candle[CLOSE] = price
+            candle[VOLUME] += amount
+            candle[TRADES] += 1
+            return
+        if candle is not None:
+            self._close(0, candle)
+        self.current[0] = [start, price, price, price, price, amount, 1]
+
+    def _close(self, level: int, candle: list) -> None:
+        ring = self.rings[level]
+        ring[(candle[START] // self.seconds[level]) % len(ring)] = tuple(candle)
+        if level + 1 < len(self.seconds):
+            self._fold(level + 1, candle)
+
+    def _fold(self, level: int, candle: list) -> None:
+        """Add a closed finer candle to the open candle of ``level``"""
+        start = candle[START] - candle[START] % self.seconds[level]
+        current = self.current[level]
+        if current is not None and current[START] == start:
+            _merge(current, candle)
+            return
+        if current is not None:
+            self._close(level, current)
+        self.current[level] = [start, *candle[OPEN:]]
+
+    def _pending(self, level: int) -> list[list]:
+        """Candles of ``level`` not in its ring yet, from the open candles at and below it"""
+        seconds = self.seconds[level]
+        pending: list[list] = []
+        # Coarser open candles cover older fills than finer ones
+        for finer in range(level, -1, -1):
+            candle = self.current[finer]
+            if candle is None:
+                continue
+            start = candle[START] - candle[START] % seconds
+            if pending and pending[-1][START] == start:
+                _merge(pending[-1], candle)
+            else:
+                pending.append([start, *candle[OPEN:]])
+        return pending
+
+    def covered_from(self, resolution: str) -> Optional[int]:
+        """Start of the oldest bucket held complete in memory, None before the first fill"""
+        if self.first_trade_at is None:
+            return None
+        level = list(RESOLUTIONS).index(resolution)
+        seconds = self.seconds[level]
+        # The first fill's bucket may be missing fills from before a restart
+        first_full = (int(self.first_trade_at) // seconds + 1) * seconds
+        newest = self._pending(level)[-1][START]
+        return max(first_full, newest - (len(self.rings[level]) - 1) * seconds)
+
+    def get_rows(self, resolution: str, start: int, end: int, limit: int) -> list[tuple]:
+        """Newest ``limit`` candles starting in [start, end), oldest first"""
+        level = list(RESOLUTIONS).index(resolution)
+        ring = self.rings[level]
+        starts = ring['start']
+        stored = np.sort(ring[(starts >= start) & (starts < end)], order='start')[-limit:]
+        rows = [tuple(row) for row in stored.tolist()]
+        rows.extend(tuple(candle) for candle in self._pending(level) if start <= candle[START] < end)
+        return rows[-limit:]
+
+
+class CandleAggregator:
+    """
+    Candles of the local markets, fed by a sequencer listener with every
+    durable fill. Ranges older than what memory holds (ring size, process
+    start) and markets hosted by other workers are aggregated from the
+    trades table; those buckets are closed, so the result is cached in
+    Redis.
+    """
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], cache: Optional[RedisCacheService] = None):
+        self.session_factory = session_factory
+        self.cache = cache
+        self.markets: dict[str, MarketCandles] = {}
+
+    def record(self, book: OrderBook, command: Command, result: CommandResult) -> None:
+        if not result.trades:
+            return
+        symbol = book.market.symbol
+        candles = self.markets.get(symbol)
+        if candles is None:
+            candles = self.markets[symbol] = MarketCandles(book.market)
+        for trade in result.trades:
+            candles.add_trade(trade.price, trade.amount, trade.timestamp)
+
+    async def get_candles(
+        self,
+        symbol: str,
+        resolution: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        limit: int = 500
+    ) -> list[dict]:
+        """
+        Newest ``limit`` candles starting in [start, end) unix seconds, oldest
+        first. ``end`` defaults to now, ``start`` to ``limit`` buckets before it.
+        """
+        market = get_market_config(symbol)
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        seconds = RESOLUTIONS[resolution][0]
+        if end is None:
+            end = int(time.time()) // seconds * seconds + seconds
+        if start is None:
+            start = end - limit * seconds
+
+        rows = []
+        memory_from = end
+        candles = self.markets.get(market.symbol)
+        if candles is not None and (covered := candles.covered_from(resolution)) is not None:
+            memory_from = max(start, min(covered, end))
+            rows = candles.get_rows(resolution, memory_from, end, limit)
+        if start < memory_from and len(rows) < limit:
+            rows = await self._backfill(market, resolution, start, memory_from, limit - len(rows)) + rows
+        return [serialize_candle(market, row) for row in rows]
+
+    async def _backfill(self, market: MarketConfig, resolution: str, start: int, end: int, limit: int) -> list[tuple]:
+        key = f"candles:{market.symbol}:{resolution}:{start}:{end}:{limit}"
+        # Recent buckets may still get fills (write-behind), never cache those
+        cacheable = self.cache is not None and end < time.time() - 1
+        if cacheable:
+            try:
+                rows = await self.cache.get(key)
+                if rows is not None:
+                    return rows
+            except Exception:
+                logger.warning(f"Candle cache read failed for {key}", exc_info=True)
+
+        async with self.session_factory() as session:
+            result = await select_candles(
+                session,
+                market.symbol,
+                RESOLUTIONS[resolution][0],
+                datetime.fromtimestamp(start, timezone.utc).replace(tzinfo=None),
+                datetime.fromtimestamp(end, timezone.utc).replace(tzinfo=None),
+                limit
+                )
+        rows = [
+            (
+                int(row.start),
+                market.price_to_ticks(row.open),
+                market.price_to_ticks(row.high),
+                market.price_to_ticks(row.low),
+                market.price_to_ticks(row.close),
+                market.qty_to_lots(row.volume),
+                row.trades,
+            )
+            for row in result
+        ]
+        if cacheable:
+            try:
+                await self.cache.set(key, rows)
+            except Exception:
+                logger.warning(f"Candle cache write failed for {key}", exc_info=True)
+        return rows
+
+
+candle_aggregator = CandleAggregator(db_helper.session_factory, cache_service)
@@ -0,0 +1,188 @@
+from decimal import Decimal
+from typing import Optional
+import asyncio
+import logging
+
+import orjson
+
+from src.core.config.settings import settings
+from src.core.services.crypto.exchange.broadcast import BroadcastClient, BroadcastHub
+from src.core.services.crypto.exchange.events import EventBus, Subscription, event_bus
+from src.core.services.crypto.exchange.registry import MarketRegistry, market_registry
+
+
+logger = logging.getLogger(__name__)
+
+class DepthFeed:
+    """
+    L2 depth of one market, maintained once and shared by all its clients.
+
+    The feed subscribes to the market's level events, keeps its own copy
+    of all the book's levels and, every ``interval`` seconds, sends the levels
+    that changed since the previous tick as one diff (price, new amount;
+    amount 0 removes the level). Each message is serialized once and handed
+    to every client through a BroadcastHub. New clients, and clients too
+    slow to keep up, get a snapshot of the feed's own copy, so a snapshot
+    and the diffs after it always line up. Every message carries
+    the market event ``seq`` it includes and diffs the ``prev_seq`` of
+    the message before: a client that sees ``prev_seq`` differ from its
+    last ``seq`` missed a message and has to reconnect.
+    """
+    def __init__(self, symbol: str, registry: MarketRegistry, bus: EventBus, interval: float, client_buffer: int):
+        self.symbol = symbol
+        self.registry = registry
+        self.bus = bus
+        self.interval = interval
+        self.hub = BroadcastHub(self.snapshot_message, client_buffer)
+        self.seq = 0        # Last market event applied
+        self.sent_seq = 0   # Seq of the levels clients have, levels only change with a diff
+        self._levels: dict[str, dict[Decimal, Decimal]] = {"bids": {}, "asks": {}}
+        self._subscription: Optional[Subscription] = None
+        self._snapshot: Optional[bytes] = None  # Serialized snapshot at ``sent_seq``, reset when levels change
+        self._task: Optional[asyncio.Task] = None
+        self._starting = asyncio.Lock()  # Concurrent first joins seed and start the feed once
+
+    async def _seed(self) -> None:
+        """(Re)load levels from the book or, for remote markets, the stream snapshot"""
+        if self._subscription is not None:
+            self._subscription.close()
+        # Subscribe first: events after the snapshot are queued, older ones skipped by seq
+        self._subscription = self.bus.subscribe(self.symbol)
+        # Every level: deeper ones must be there once the top clears
+        if self.registry.owns(self.symbol):
+            seq = self.bus.last_seq(self.symbol)
+            snapshot = self.registry.get_market_depth(self.symbol, None)
+            missed = []
+        else:
+            bridge = self.registry.bridge
+            bridge.follow(self.symbol)
+            snapshot = await bridge.get_snapshot(self.symbol) or {"bids": [], "asks": [], "seq": 0}
+            seq = snapshot["seq"]
+            # Snapshots are taken on an interval, the stream has what came after
+            missed = await bridge.read_after(self.symbol, snapshot["stream_id"]) if "stream_id" in snapshot else []
+        self._levels = {
+            side: {level["price"]: level["amount"] for level in snapshot[side]}
+            for side in ("bids", "asks")
+        }
+        for event in missed:
+            if event.seq <= seq:
+                continue
+            if event.seq != seq + 1:
+                break  # Trimmed from the stream, the subscription's first event shows the gap
+            seq = event.seq
+            if event.kind == 'level':
+                data = event.data
+                levels = self._levels[data["side"]]
+                if data["amount"]:
+                    levels[data["price"]] = data["amount"]
+                else:
+                    levels.pop(data["price"], None)
+        self.seq = self.sent_seq = seq
+        self._snapshot = None
+
+    def snapshot_message(self) -> bytes:
+        if self._snapshot is None:
+            bids = sorted(self._levels["bids"].items(), reverse=True)
+            asks = sorted(self._levels["asks"].items())
+            self._snapshot = orjson.dumps({
+                "type": "snapshot",
+                "market": self.symbol,
+                "seq": self.sent_seq,
+                "bids": [[str(price), str(amount)] for price, amount in bids],
+                "asks": [[str(price), str(amount)] for price, amount in asks],
+            })
+        return self._snapshot
+
+    async def join(self) -> BroadcastClient:
+        async with self._starting:
+            if self._task is None:
+                await self._seed()
+                self._task = asyncio.get_running_loop().create_task(self._run(), name=f"depth-feed-{self.symbol}")
+            return self.hub.join()
+
+    def leave(self, client: BroadcastClient) -> None:
+        self.hub.leave(client)
+
+    def _collect(self) -> Optional[dict[str, dict[Decimal, Decimal]]]:
+        """Net level changes queued since the last tick, None when events were lost"""
+        subscription = self._subscription
+        if subscription.lagged:
+            return None
+        changes: dict[str, dict[Decimal, Decimal]] = {"bids": {}, "asks": {}}
+        queue = subscription.queue
+        while not queue.empty():
+            event = queue.get_nowait()
+            if event is None:
+                return None
+            if event.seq <= self.seq:
+                continue  # Already in the snapshot
+            if event.seq != self.seq + 1 and not self.registry.owns(self.symbol):
+                return None  # Gap in the remote stream
+            self.seq = event.seq
+            if event.kind == 'level':
+                data = event.data
+                changes[data["side"]][data["price"]] = data["amount"]
+        return changes
+
+    async def _run(self) -> None:
+        try:
+            while self.hub.clients:
+                await asyncio.sleep(self.interval)
+                changes = self._collect()
+                if changes is None:
+                    logger.warning(f"Depth feed {self.symbol} lost events, resyncing")
+                    await self._seed()
+                    self.hub.reset(self.snapshot_message())
+                    continue
+                if not changes["bids"] and not changes["asks"]:
+                    continue
+                for side, levels in changes.items():
+                    book_side = self._levels[side]
+                    for price, amount in levels.items():
+                        if amount:
+                            book_side[price] = amount
+                        else:
+                            book_side.pop(price, None)
+                # Snapshots built from here on (conflated clients) include this diff
+                self._snapshot = None
+                prev_seq, self.sent_seq = self.sent_seq, self.seq
+                self.hub.broadcast(orjson.dumps({
+                    "type": "diff",
+                    "market": self.symbol,
+                    "seq": self.seq,
+                    "prev_seq": prev_seq,
+                    "bids": [[str(price), str(amount)] for price, amount in changes["bids"].items()],
+                    "asks": [[str(price), str(amount)] for price, amount in changes["asks"].items()],
+                }))
+        except Exception:
+            logger.exception(f"Depth feed {self.symbol} failed")
+        finally:
+            # Last client gone (or failure): release the subscription, the next join reseeds
+            self.hub.close()
+            if self._subscription is not None:
+                self._subscription.close()
+                self._subscription = None
+            self._task = None
+
+
+class DepthFeeds:
+    """One DepthFeed per market with at least one client"""
+    def __init__(self, registry: MarketRegistry, bus: EventBus, interval: float = 0.1, client_buffer: int = 1_000):
+        self.registry = registry
+        self.bus = bus
+        self.interval = interval
+        self.client_buffer = client_buffer
+        self.feeds: dict[str, DepthFeed] = {}
+
+    def get_feed(self, symbol: str) -> DepthFeed:
+        feed = self.feeds.get(symbol)
+        if feed is None:
+            feed = self.feeds[symbol] = DepthFeed(symbol, self.registry, self.bus, self.interval, self.client_buffer)
+        return feed
+
+
+depth_feeds = DepthFeeds(
+    market_registry,
+    event_bus,
+    interval=settings.engine.depth_tick_ms / 1000
+)
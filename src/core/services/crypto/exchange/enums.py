@@ -0,0 +1,41 @@
+from enum import IntEnum
+
+
+class _Code(IntEnum):
+    """Small-int code with its API string spelled as ``label``"""
+
+    @classmethod
+    def parse(cls, value) -> "_Code":
+        if isinstance(value, cls):
+            return value
+        try:
+            return cls[str(value).upper()]
+        except KeyError:
+            raise ValueError(f"Invalid {cls.__name__}: {value!r}")
+
+    @property
+    def label(self) -> str:
+        return self.name.lower()
+
+
+class Side(_Code):
+    BUY = 0
+    SELL = 1
+
+class OrderType(_Code):
+    LIMIT = 0
+    MARKET = 1
+
+class OrderStatus(_Code):
+    OPEN = 0
+    FILLED = 1
+    CANCELED = 2
+
+class TimeInForce(_Code):
+    GTC = 0
+    IOC = 1
+    FOK = 2
+
+    @property
+    def label(self) -> str:
+        return self.name
@@ -0,0 +1,175 @@
+from dataclasses import dataclass
+from collections import defaultdict
+from typing import Optional
+import asyncio
+import logging
+
+from src.core.services.crypto.exchange.enums import Side
+from src.core.services.crypto.exchange.trade import Order, OrderBook
+from src.core.services.crypto.exchange.sequencer import Command, CommandResult
+
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class MarketEvent:
+    market: str
+    seq: int   # Per market, gapless, assigned by the publishing engine
+    kind: str  # 'fill', 'level', 'order'
+    data: dict
+
+
+class Subscription:
+    """
+    Bounded mailbox of one consumer. A consumer that falls ``maxsize``
+    events behind is dropped (``lagged``) instead of slowing the
+    publisher down, it has to resubscribe and resync from a snapshot.
+    """
+    def __init__(self, bus: "EventBus", market: str, maxsize: int):
+        self.bus = bus
+        self.market = market
+        self.queue: asyncio.Queue[Optional[MarketEvent]] = asyncio.Queue(maxsize=maxsize)
+        self.lagged = False
+
+    def _offer(self, event: MarketEvent) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.lagged = True
+            # Wake the consumer up so it notices
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return False
+
+    async def get(self) -> Optional[MarketEvent]:
+        """Next event, None once the subscription was dropped"""
+        if self.lagged and self.queue.empty():
+            return None
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> MarketEvent:
+        event = await self.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+
+class EventBus:
+    """
+    In-process pub/sub of market events, one topic per market symbol.
+
+    ``publish`` is synchronous and O(subscribers): every subscriber gets the
+    same event object in its own bounded queue. Events of markets hosted by
+    other workers are fed in by a bridge (see cache/redis/streams.py), so a
+    consumer only ever subscribes here, once per market.
+    """
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._subscribers: dict[str, set[Subscription]] = defaultdict(set)
+        self._seq: dict[str, int] = defaultdict(int)
+        self._forwarders: list = []  # Called with every locally published event
+
+    def subscribe(self, market: str, maxsize: Optional[int] = None) -> Subscription:
+        subscription = Subscription(self, market, maxsize or self.maxsize)
+        self._subscribers[market].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.market)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.market]
+
+    def subscriber_count(self, market: str) -> int:
+        return len(self._subscribers.get(market, ()))
+
+    def add_forwarder(self, forwarder) -> None:
+        self._forwarders.append(forwarder)
+
+    def last_seq(self, market: str) -> int:
+        return self._seq.get(market, 0)
+
+    def emit(self, market: str, kind: str, data: dict) -> MarketEvent:
+        """Publish an event of a local market, numbering it"""
+        self._seq[market] += 1
+        event = MarketEvent(market, self._seq[market], kind, data)
+        self.publish(event)
+        for forwarder in self._forwarders:
+            try:
+                forwarder(event)
+            except Exception:
+                logger.exception(f"Event forwarder failed on {market}")
+        return event
+
+    def publish(self, event: MarketEvent) -> None:
+        """Fan an already numbered event out to the market's subscribers"""
+        if event.seq > self._seq[event.market]:
+            self._seq[event.market] = event.seq
+        subscribers = self._subscribers.get(event.market)
+        if not subscribers:
+            return
+        for subscription in list(subscribers):
+            if not subscription._offer(event):
+                logger.warning(f"Dropped lagging {event.market} subscriber")
+                self.unsubscribe(subscription)
+
+
+class MarketEventPublisher:
+    """
+    Sequencer listener turning durable commands into market events:
+    one 'order' event per changed order, one 'fill' per trade and one
+    'level' per changed price level (new absolute size, 0 when gone).
+    Level sizes are read when the listener runs, so a group of commands
+    reports each touched level once, at its size after the group.
+    """
+    def __init__(self, bus: EventBus):
+        self.bus = bus
+
+    def attach(self, book: OrderBook) -> None:
+        book.track_levels()
+
+    def publish(self, book: OrderBook, command: Command, result: CommandResult) -> None:
+        symbol = book.market.symbol
+        emit = self.bus.emit
+
+        orders: list[Order] = []
+        if command.kind in ('new', 'amend'):
+            orders.append(result.value)
+        elif command.kind == 'batch':
+            orders.extend(item for item in result.value if isinstance(item, Order))
+        elif command.kind == 'cancel' and result.value:
+            orders.append(book.get_order(command.kwargs['order_id']))
+        seen = {order.id for order in orders}
+        for trade in result.trades:
+            for order_id in (trade.buy_order_id, trade.sell_order_id):
+                if order_id not in seen:
+                    seen.add(order_id)
+                    order = book.get_order(order_id)
+                    if order is not None:
+                        orders.append(order)
+
+        for trade in result.trades:
+            emit(symbol, 'fill', book.serialize_trade(trade))
+        for order in orders:
+            emit(symbol, 'order', book.serialize_order(order))
+
+        market = book.market
+        for side, price, lots, count in book.drain_changed_levels():
+            emit(symbol, 'level', {
+                "side": "bids" if side is Side.BUY else "asks",
+                "price": market.ticks_to_price(price),
+                "amount": market.lots_to_qty(lots),
+                "orders": count,
+            })
+
+
+event_bus = EventBus()
+market_event_publisher = MarketEventPublisher(event_bus)
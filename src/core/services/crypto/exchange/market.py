@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Optional, Union
+
+
+Number = Union[Decimal, int, float, str]
+
+@dataclass(frozen=True)
+class MarketConfig:
+    """
+    Per-market fixed-point configuration.
+
+    Prices are kept as integer multiples of ``tick_size`` and quantities
+    as integer multiples of ``lot_size`` everywhere inside the engine,
+    conversion to Decimal only happens at the API/database boundary.
+    ``market_id`` prefixes the market's order id sequence, ``book_backend``
+    picks the level index structure (see book_side.BOOK_BACKENDS) and
+    ``price_band`` bounds resting prices for the tick-array backend.
+    """
+    symbol: str
+    market_id: int
+    tick_size: Decimal
+    lot_size: Decimal
+    book_backend: str = 'sorted'
+    price_band: Optional[tuple[Decimal, Decimal]] = None
+
+    @staticmethod
+    def _scale(value: Number, step: Decimal, name: str) -> int:
+        try:
+            number = Decimal(str(value))
+            if not number.is_finite():  # inf overflows int(), NaN compares unequal to anything
+                raise InvalidOperation
+            units = number / step
+        except ArithmeticError:  # InvalidOperation, decimal Overflow
+            raise ValueError(f"Invalid {name}: {value!r}")
+        if units != units.to_integral_value():
+            raise ValueError(f"{name.capitalize()} {value} is not a multiple of {step}")
+        return int(units)
+
+    def price_to_ticks(self, price: Number) -> int:
+        """Convert human price into integer ticks"""
+        return self._scale(price, self.tick_size, 'price')
+
+    def ticks_to_price(self, ticks: int) -> Decimal:
+        """Convert integer ticks back into a Decimal price"""
+        return ticks * self.tick_size
+
+    def qty_to_lots(self, amount: Number) -> int:
+        """Convert human quantity into integer lots"""
+        return self._scale(amount, self.lot_size, 'amount')
+
+    def lots_to_qty(self, lots: int) -> Decimal:
+        """Convert integer lots back into a Decimal quantity"""
+        return lots * self.lot_size
+
+    @property
+    def base(self) -> str:
+        """Traded currency, BTC in BTC-USDT"""
+        return self.symbol.split('-', 1)[0]
+
+    @property
+    def quote(self) -> str:
+        """Pricing currency, USDT in BTC-USDT"""
+        return self.symbol.split('-', 1)[1]
+
+    @property
+    def first_order_id(self) -> int:
+        """Start of this market's 64-bit order id range"""
+        return (self.market_id << ORDER_SEQ_BITS) + 1
+
+
+DEFAULT_MARKET = 'BTC-USDT'
+ORDER_SEQ_BITS = 48  # order id = market_id << 48 | per-market sequence
+
+MARKETS: dict[str, MarketConfig] = {
+    'BTC-USDT': MarketConfig('BTC-USDT', market_id=1, tick_size=Decimal('0.01'), lot_size=Decimal('0.000001')),
+    'ETH-USDT': MarketConfig('ETH-USDT', market_id=2, tick_size=Decimal('0.01'), lot_size=Decimal('0.0001')),
+    'SOL-USDT': MarketConfig('SOL-USDT', market_id=3, tick_size=Decimal('0.001'), lot_size=Decimal('0.01')),
+    'USDC-USDT': MarketConfig(
+        'USDC-USDT', 
+        market_id=4, 
+        tick_size=Decimal('0.0001'), 
+        lot_size=Decimal('0.01'),
+        book_backend='array',
+        price_band=(Decimal('0.9'), Decimal('1.1'))
+        ),
+}
+
+def get_market_config(symbol: str) -> MarketConfig:
+    """Lookup market configuration by symbol"""
+    try:
+        return MARKETS[symbol.upper()]
+    except KeyError:
+        raise ValueError(f"Unknown market: {symbol}")
@@ -0,0 +1,341 @@
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Callable, Optional
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.config.settings import settings
+from src.core.dependencies.db_helper import db_helper
+from src.core.services.crypto.exchange.trade import Order, OrderBook, Trade
+from src.core.services.crypto.exchange.sequencer import Command, CommandResult
+from src.core.services.database.orm.order import upsert_orders
+from src.core.services.database.orm.trade import append_trades
+from src.core.services.database.orm.balance import apply_balance_changes
+from src.core.services.database.orm.position import upsert_positions
+from src.core.services.database.orm.journal_checkpoint import select_journal_checkpoints, upsert_journal_checkpoints
+
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class WriterMetrics:
+    pending: int = 0              # Order rows waiting for the next flush
+    pending_trades: int = 0
+    pending_balances: int = 0     # Wallets with unflushed net changes
+    pending_high_water: int = 0
+    recorded: int = 0             # Order state changes received
+    coalesced: int = 0            # Changes merged into a still pending row
+    flushed_rows: int = 0
+    flushed_trades: int = 0
+    rejected_balances: int = 0    # Wallet changes the database refused (would overdraw)
+    flushes: int = 0
+    failed_flushes: int = 0
+    last_flush_ms: float = 0.0
+    backpressure_waits: int = 0   # Submissions that had to wait for a flush
+
+
+class OrderWriter:
+    """
+    Write-behind persistence of order state and fills.
+
+    Registered as a sequencer listener: every order touched by a command
+    (created, amended, canceled, or filled as maker) is serialized into a
+    pending row keyed by order id, so repeated changes between flushes
+    collapse into one row, fills are appended as trade rows and net wallet
+    changes come from the BalanceLedger. A background task flushes all of
+    them in one transaction (order upserts, trade inserts, wallet upserts) when ``max_batch`` rows are pending or every ``flush_interval``
+    seconds. Matching never waits on the database; when ``max_pending``
+    rows are backed up, new commands wait in ``wait_for_capacity`` instead.
+
+    The same transaction stores each market's journal position the rows
+    are complete up to (``journal_checkpoints``) and, when a
+    PositionService is attached, the positions changed meanwhile, so
+    recovery knows exactly which journal records still have to go
+    through the listeners again. Wallet changes the database refuses are
+    reported to the reject handlers.
+    """
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        max_batch: int = 1_000,
+        flush_interval: float = 0.05,
+        max_pending: int = 100_000
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.metrics = WriterMetrics()
+        self._pending: dict[int, dict] = {}  # OrderID -> row
+        self._trades: list[dict] = []
+        self._balances: dict[tuple[int, str], list] = {}  # (user, currency) -> [balance delta, locked delta]
+        self._journal: dict[str, tuple[int, int]] = {}      # market -> journal position of the latest recorded command
+        self.journal_checkpoints: dict[str, tuple[int, int]] = {}  # market -> position stored so far
+        self.positions = None  # PositionService whose changes are written along, set by it
+        self.reject_handlers: list[Callable[[list[dict]], None]] = []
+        self.flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._capacity = asyncio.Event()
+        self._capacity.set()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def start(self) -> None:
+        if not self._closing and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="order-writer")
+
+    async def stop(self) -> None:
+        """Let the running flush finish, then flush whatever is still pending"""
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Final order flush failed")
+        if self._pending or self._trades or self._balances or self._journal:
+            logger.error(
+                f"{len(self._pending)} order, {len(self._trades)} trade and "
+                f"{len(self._balances)} wallet rows were not persisted on shutdown"
+                )
+
+    async def load_checkpoints(self, markets: list[str]) -> dict[str, tuple[int, int]]:
+        """Journal positions stored for ``markets``, a market without one has none yet"""
+        async with self.session_factory() as session:
+            stored = await select_journal_checkpoints(session, markets)
+        self.journal_checkpoints.update(stored)
+        return stored
+
+    def mark_journal(self, symbol: str, position: tuple[int, int]) -> None:
+        """Have the next flush store ``position`` as persisted for ``symbol``"""
+        self._journal.setdefault(symbol, position)  # A recorded command is never older
+        self.start()
+
+    def record(self, book: OrderBook, command: Command, result: CommandResult) -> None:
+        """Sequencer listener, collects every order the command changed"""
+        if result.position is not None:
+            self._journal[book.market.symbol] = result.position
+        orders: list[Order] = []
+        if command.kind in ('new', 'amend'):
+            orders.append(result.value)
+        elif command.kind == 'batch':
+            orders.extend(item for item in result.value if isinstance(item, Order))
+        elif command.kind == 'cancel' and result.value:
+            orders.append(book.get_order(command.kwargs['order_id']))
+
+        # Takers are covered above, makers only show up in the fills
+        seen = {order.id for order in orders}
+        for trade in result.trades:
+            for order_id in (trade.buy_order_id, trade.sell_order_id):
+                if order_id not in seen:
+                    seen.add(order_id)
+                    order = book.get_order(order_id)
+                    if order is not None:
+                        orders.append(order)
+
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        for order in orders:
+            self._stage(book, order, now)
+        if result.trades:
+            self._stage_trades(book, result.trades)
+        self.start()
+
+    def _stage_trades(self, book: OrderBook, trades: list[Trade]) -> None:
+        market = book.market
+        self._trades.extend(
+            {
+                "timestamp": datetime.fromtimestamp(trade.timestamp, timezone.utc).replace(tzinfo=None),
+                "market": trade.market,
+                "price": market.ticks_to_price(trade.price),
+                "amount": market.lots_to_qty(trade.amount),
+                "buy_order_id": trade.buy_order_id,
+                "sell_order_id": trade.sell_order_id,
+                "buyer_id": trade.buyer_id,
+                "seller_id": trade.seller_id,
+                "taker_side": trade.taker_side.label,
+            }
+            for trade in trades
+        )
+        self.metrics.pending_trades = len(self._trades)
+        self._check_watermarks()
+
+    def _stage(self, book: OrderBook, order: Order, now: datetime) -> None:
+        market = book.market
+        previous = self._pending.get(order.id)
+        self._pending[order.id] = {
+            "id": order.id,
+            "user_id": order.user_id,
+            "market": market.symbol,
+            "side": order.side.label,
+            "type": order.type.label,
+            "time_in_force": order.time_in_force.label,
+            "price": market.ticks_to_price(order.price),
+            "amount": market.lots_to_qty(order.amount),
+            "filled": market.lots_to_qty(order.filled),
+            "status": order.status.label,
+            "created_at": previous["created_at"] if previous else now,
+            "updated_at": now,
+        }
+        metrics = self.metrics
+        metrics.recorded += 1
+        if previous is not None:
+            metrics.coalesced += 1
+        metrics.pending = len(self._pending)
+        self._check_watermarks()
+
+    def stage_balance_changes(self, changes: dict[tuple[int, str], list]) -> None:
+        """Merge net wallet deltas, (user, currency) -> [balance delta, locked delta]"""
+        self._merge_balances(changes)
+        self.metrics.pending_balances = len(self._balances)
+        self._check_watermarks()
+        self.start()
+
+    @property
+    def pending_balance_changes(self) -> dict[tuple[int, str], list]:
+        """Wallet deltas not stored yet, complete only while holding ``flush_lock``"""
+        return self._balances
+
+    def add_reject_handler(self, handler: Callable[[list[dict]], None]) -> None:
+        self.reject_handlers.append(handler)
+
+    def _merge_balances(self, changes: dict[tuple[int, str], list]) -> None:
+        pending = self._balances
+        for key, (balance, locked) in changes.items():
+            entry = pending.get(key)
+            if entry is None:
+                pending[key] = [balance, locked]
+            else:
+                entry[0] += balance
+                entry[1] += locked
+
+    def _check_watermarks(self) -> None:
+        metrics = self.metrics
+        backlog = metrics.pending + metrics.pending_trades + metrics.pending_balances
+        metrics.pending_high_water = max(metrics.pending_high_water, backlog)
+        if backlog >= self.max_batch:
+            self._wakeup.set()
+        if backlog >= self.max_pending:
+            self._capacity.clear()
+
+    async def wait_for_capacity(self) -> None:
+        """Backpressure for command producers while the database lags behind"""
+        if not self._capacity.is_set():
+            self.metrics.backpressure_waits += 1
+            await self._capacity.wait()
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._closing:
+                break
+            try:
+                await self.flush()
+            except Exception:
+                # Rows were put back, retry on the next tick
+                logger.exception("Order flush failed")
+                await asyncio.sleep(self.flush_interval)
+
+    async def flush(self) -> None:
+        # Serialized: a snapshot barrier must not return while another flush still holds rows
+        async with self.flush_lock:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if not self._pending and not self._trades and not self._balances and not self._journal:
+            return
+        rows, self._pending = self._pending, {}
+        trades, self._trades = self._trades, []
+        balances, self._balances = self._balances, {}
+        journal, self._journal = self._journal, {}
+        positions = self.positions.take_dirty() if self.positions is not None else set()
+        started = perf_counter()
+        try:
+            async with self.session_factory() as session:
+                values = list(rows.values())
+                for start in range(0, len(values), self.max_batch):
+                    await upsert_orders(session, values[start:start + self.max_batch])
+                for start in range(0, len(trades), self.max_batch):
+                    await append_trades(session, trades[start:start + self.max_batch])
+                rejected = await self._flush_balances(session, balances)
+                if positions:
+                    position_rows = self.positions.rows(positions)
+                    for start in range(0, len(position_rows), self.max_batch):
+                        await upsert_positions(session, position_rows[start:start + self.max_batch])
+                if journal:
+                    now = datetime.now(timezone.utc).replace(tzinfo=None)
+                    await upsert_journal_checkpoints(session, [
+                        {"market": symbol, "generation": generation, "offset": offset, "updated_at": now}
+                        for symbol, (generation, offset) in journal.items()
+                    ])
+                await session.commit()
+        except BaseException:  # includes cancellation, rows must not get lost
+            self.metrics.failed_flushes += 1
+            # Newer states recorded meanwhile win over the failed ones
+            rows.update(self._pending)
+            self._pending = rows
+            self._trades = trades + self._trades
+            newer, self._balances = self._balances, balances
+            self._merge_balances(newer)
+            journal.update(self._journal)
+            self._journal = journal
+            if positions:
+                self.positions.restore_dirty(positions)
+            self.metrics.pending = len(self._pending)
+            self.metrics.pending_trades = len(self._trades)
+            self.metrics.pending_balances = len(self._balances)
+            raise
+        finally:
+            self.metrics.last_flush_ms = (perf_counter() - started) * 1000
+        self.journal_checkpoints.update(journal)
+        metrics = self.metrics
+        metrics.flushes += 1
+        metrics.flushed_rows += len(rows)
+        metrics.flushed_trades += len(trades)
+        metrics.rejected_balances += len(rejected)
+        metrics.pending = len(self._pending)
+        metrics.pending_trades = len(self._trades)
+        metrics.pending_balances = len(self._balances)
+        if metrics.pending + metrics.pending_trades + metrics.pending_balances < self.max_pending:
+            self._capacity.set()
+        if rejected:
+            for handler in self.reject_handlers:
+                try:
+                    handler(rejected)
+                except Exception:
+                    logger.exception("Reject handler failed")
+
+    async def _flush_balances(self, session: AsyncSession, balances: dict[tuple[int, str], list]) -> list[dict]:
+        """Apply wallet deltas, returns the rows the database refused"""
+        rows = [
+            {"user_id": user_id, "currency": currency, "balance": balance, "locked": locked}
+            for (user_id, currency), (balance, locked) in balances.items()
+            if balance or locked
+        ]
+        applied = set()
+        for start in range(0, len(rows), self.max_batch):
+            applied |= await apply_balance_changes(session, rows[start:start + self.max_batch])
+        rejected = [row for row in rows if (row["user_id"], row["currency"]) not in applied]
+        for row in rejected:
+            # Retrying cannot help, the cache and the table disagree
+            logger.error(f"Wallet change rejected by database: {row}")
+        return rejected
+
+    def get_metrics(self) -> dict:
+        return asdict(self.metrics)
+
+
+order_writer = OrderWriter(
+    db_helper.session_factory,
+    max_batch=settings.engine.persist_batch,
+    flush_interval=settings.engine.persist_interval_ms / 1000,
+    max_pending=settings.engine.persist_max_pending
+)
@@ -0,0 +1,244 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Optional
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.config.settings import settings
+from src.core.dependencies.db_helper import db_helper
+from src.core.services.crypto.exchange.market import MarketConfig, get_market_config
+from src.core.services.crypto.exchange.trade import OrderBook
+from src.core.services.crypto.exchange.sequencer import Command, CommandResult
+from src.core.services.crypto.exchange.persistence import OrderWriter, order_writer
+from src.core.services.database.orm.position import select_positions, upsert_positions
+from src.core.services.database.orm.trade import select_trades
+
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal(0)
+
+class _Position:
+    """Net position in lots (negative is short), cost and realized PnL in ticks*lots"""
+    __slots__ = ('quantity', 'cost', 'realized')
+
+    def __init__(self, quantity: int = 0, cost: int = 0, realized: int = 0):
+        self.quantity = quantity
+        self.cost = cost          # Entry value of the open quantity, same sign
+        self.realized = realized
+
+
+class PositionService:
+    """
+    Per user and market positions kept in memory from the engine's fills.
+
+    ``record`` is a sequencer listener, so it only sees durable commands.
+    Every fill updates quantity, entry cost and realized PnL of both sides
+    in O(1) with average-cost accounting; unrealized PnL is marked to the
+    market's last trade when read. Changed positions are checkpointed to
+    the positions table in one batched upsert (entry cost exactly, so a
+    restart does not change later PnL) and read back on startup: with a
+    ``writer`` inside its flush transaction, so they are stored exactly up
+    to its journal checkpoint and journal recovery replays the rest;
+    without one every ``checkpoint_interval`` seconds, fills after the
+    last checkpoint are then lost on a crash.
+    """
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        checkpoint_interval: float = 5.0,
+        max_batch: int = 1_000,
+        writer: Optional[OrderWriter] = None
+    ):
+        self.session_factory = session_factory
+        self.checkpoint_interval = checkpoint_interval
+        self.max_batch = max_batch
+        self.writer = writer
+        if writer is not None:
+            writer.positions = self
+        self._positions: dict[tuple[str, int], _Position] = {}  # (market, user) -> position
+        self._last_price: dict[str, int] = {}                   # market -> ticks of the last fill
+        self._dirty: set[tuple[str, int]] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def start(self) -> None:
+        if self.writer is not None:
+            return  # Written along by the writer's flushes
+        if not self._closing and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="position-checkpoints")
+
+    async def stop(self) -> None:
+        self._closing = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.writer is not None:
+            return
+        try:
+            await self.checkpoint()
+        except Exception:
+            logger.exception("Final position checkpoint failed")
+
+    async def load(self, markets: list[str]) -> None:
+        """Restore checkpointed positions and the last trade price of ``markets``"""
+        async with self.session_factory() as session:
+            rows = await select_positions(session, markets)
+            for symbol in markets:
+                if symbol not in self._last_price:
+                    last = await select_trades(session, symbol, limit=1)
+                    if last:
+                        self._last_price[symbol] = get_market_config(symbol).price_to_ticks(last[0].price)
+        for row in rows:
+            key = (row.market, row.user_id)
+            if key in self._positions:
+                continue  # Already trading, memory is newer
+            market = get_market_config(row.market)
+            unit = market.tick_size * market.lot_size
+            quantity = market.qty_to_lots(abs(row.quantity))
+            if row.quantity < 0:
+                quantity = -quantity
+            if row.entry_cost is not None:
+                cost = int((row.entry_cost / unit).to_integral_value())
+            else:
+                # Checkpointed before entry_cost existed, rounded average only
+                cost = int((row.avg_entry_price / market.tick_size * quantity).to_integral_value())
+            self._positions[key] = _Position(
+                quantity,
+                cost,
+                int((row.realized_pnl / unit).to_integral_value())
+                )
+
+    def record(self, book: OrderBook, command: Command, result: CommandResult) -> None:
+        """Sequencer listener: fold the command's fills into both sides' positions"""
+        if not result.trades:
+            return
+        symbol = book.market.symbol
+        for trade in result.trades:
+            self._fill((symbol, trade.buyer_id), trade.amount, trade.price)
+            self._fill((symbol, trade.seller_id), -trade.amount, trade.price)
+        self._last_price[symbol] = result.trades[-1].price
+        self.start()
+
+    def _fill(self, key: tuple[str, int], delta: int, price: int) -> None:
+        """Apply a signed fill of ``delta`` lots at ``price`` ticks"""
+        position = self._positions.get(key)
+        if position is None:
+            position = self._positions[key] = _Position()
+        self._dirty.add(key)
+        quantity = position.quantity
+        if not quantity or (quantity > 0) == (delta > 0):
+            position.quantity = quantity + delta
+            position.cost += price * delta
+            return
+
+        # Reducing: realize against the average entry of the closed part
+        held = abs(quantity)
+        closed = min(abs(delta), held)
+        # Proportional share of the entry cost, rounded to the nearest tick*lot
+        released = position.cost if closed == held else (2 * position.cost * closed + held) // (2 * held)
+        sign = 1 if quantity > 0 else -1
+        position.realized += sign * price * closed - released
+        position.cost -= released
+        position.quantity = quantity - sign * closed
+        # Flipped: the rest opens a position on the other side
+        rest = abs(delta) - closed
+        if rest:
+            position.quantity = -sign * rest
+            position.cost = -sign * rest * price
+
+    def _serialize(self, market: MarketConfig, position: _Position) -> dict:
+        quantity = position.quantity
+        unit = market.tick_size * market.lot_size
+        last_price = self._last_price.get(market.symbol)
+        return {
+            "quantity": market.lots_to_qty(quantity),
+            "avg_entry_price": Decimal(position.cost) / quantity * market.tick_size if quantity else ZERO,
+            "realized_pnl": position.realized * unit,
+            "unrealized_pnl": (last_price * quantity - position.cost) * unit if last_price is not None else None,
+            "mark_price": market.ticks_to_price(last_price) if last_price is not None else None,
+        }
+
+    def get_position(self, symbol: str, user_id: int) -> Optional[dict]:
+        position = self._positions.get((symbol, user_id))
+        if position is None:
+            return None
+        return {"market": symbol, **self._serialize(get_market_config(symbol), position)}
+
+    def quantities(self, symbol: str) -> dict[int, int]:
+        """Net lots per user in ``symbol``"""
+        return {
+            user_id: position.quantity
+            for (market, user_id), position in self._positions.items()
+            if market == symbol and position.quantity
+        }
+
+    def get_positions(self, user_id: int) -> list[dict]:
+        return [
+            {"market": symbol, **self._serialize(get_market_config(symbol), position)}
+            for (symbol, owner), position in self._positions.items()
+            if owner == user_id
+        ]
+
+    async def _run(self) -> None:
+        while not self._closing:
+            await asyncio.sleep(self.checkpoint_interval)
+            try:
+                await self.checkpoint()
+            except Exception:
+                # Keys were put back, retry on the next tick
+                logger.exception("Position checkpoint failed")
+
+    def take_dirty(self) -> set[tuple[str, int]]:
+        dirty, self._dirty = self._dirty, set()
+        return dirty
+
+    def restore_dirty(self, dirty: set[tuple[str, int]]) -> None:
+        self._dirty |= dirty
+
+    def rows(self, keys: set[tuple[str, int]]) -> list[dict]:
+        """positions table rows of ``keys``"""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        rows = []
+        for symbol, user_id in keys:
+            market = get_market_config(symbol)
+            position = self._positions[(symbol, user_id)]
+            state = self._serialize(market, position)
+            rows.append({
+                "user_id": user_id,
+                "market": symbol,
+                "quantity": state["quantity"],
+                "avg_entry_price": state["avg_entry_price"],
+                "realized_pnl": state["realized_pnl"],
+                "entry_cost": position.cost * market.tick_size * market.lot_size,  # Exact, load rebuilds from it
+                "updated_at": now,
+            })
+        return rows
+
+    async def checkpoint(self) -> None:
+        """Write every position changed since the last checkpoint"""
+        if not self._dirty:
+            return
+        dirty = self.take_dirty()
+        rows = self.rows(dirty)
+        try:
+            async with self.session_factory() as session:
+                for start in range(0, len(rows), self.max_batch):
+                    await upsert_positions(session, rows[start:start + self.max_batch])
+                await session.commit()
+        except BaseException:
+            self.restore_dirty(dirty)
+            raise
+
+
+position_service = PositionService(
+    db_helper.session_factory,
+    checkpoint_interval=settings.engine.position_checkpoint_ms / 1000,
+    writer=order_writer if settings.engine.persist_orders else None
+)
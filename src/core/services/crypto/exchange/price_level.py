@@ -0,0 +1,79 @@
+from typing import Iterator, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.core.services.crypto.exchange.trade import Order
+
+
+class PriceLevel:
+    """
+    FIFO queue of resting orders at a single price.
+
+    Intrusive doubly linked list: every order carries its own ``prev``/``next``
+    pointers and a ``level`` back-reference, so append, pop from the head and
+    cancel of an arbitrary order are all O(1) regardless of level depth.
+    ``order_count`` and ``total_remaining`` (lots) are maintained incrementally
+    so depth snapshots never walk the orders.
+    """
+    __slots__ = ('price', 'head', 'tail', 'order_count', 'total_remaining')
+
+    def __init__(self, price: int):
+        self.price = price
+        self.head: Optional["Order"] = None
+        self.tail: Optional["Order"] = None
+        self.order_count = 0
+        self.total_remaining = 0
+
+    def append(self, order: "Order") -> None:
+        """Add order to the back of the queue (time priority)"""
+        order.level = self
+        order.prev = self.tail
+        order.next = None
+        if self.tail is None:
+            self.head = order
+        else:
+            self.tail.next = order
+        self.tail = order
+        self.order_count += 1
+        self.total_remaining += order.amount - order.filled
+
+    def remove(self, order: "Order") -> None:
+        """Unlink order from the queue"""
+        if order.prev is None:
+            self.head = order.next
+        else:
+            order.prev.next = order.next
+        if order.next is None:
+            self.tail = order.prev
+        else:
+            order.next.prev = order.prev
+        order.prev = order.next = order.level = None
+        self.order_count -= 1
+        self.total_remaining -= order.amount - order.filled
+
+    def fill(self, order: "Order", amount: int) -> None:
+        """Record a partial/full execution of a resting order"""
+        order.filled += amount
+        self.total_remaining -= amount
+
+    def popleft(self) -> "Order":
+        """Remove and return the oldest order"""
+        order = self.head
+        if order is None:
+            raise IndexError("pop from empty price level")
+        self.remove(order)
+        return order
+
+    def __len__(self) -> int:
+        return self.order_count
+
+    def __bool__(self) -> bool:
+        return self.head is not None
+
+    def __iter__(self) -> Iterator["Order"]:
+        order = self.head
+        while order is not None:
+            yield order
+            order = order.next
+
+    def __repr__(self):
+        return f"<PriceLevel(price={self.price}, orders={self.order_count}, remaining={self.total_remaining})>"
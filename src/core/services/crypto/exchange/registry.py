@@ -0,0 +1,293 @@
+from typing import Optional
+import logging
+import zlib
+
+from src.core.config.settings import settings
+from src.core.services.crypto.exchange.market import MARKETS, Number, get_market_config
+from src.core.services.crypto.exchange.trade import OrderBook
+from src.core.services.crypto.exchange.sequencer import MarketSequencer, CommandResult
+from src.core.services.crypto.exchange.journal import CommandJournal, recover_book
+from src.core.services.crypto.exchange.persistence import OrderWriter, order_writer
+from src.core.services.crypto.exchange.balances import BalanceLedger, balance_ledger
+from src.core.services.crypto.exchange.risk import RiskEngine, risk_engine
+from src.core.services.crypto.exchange.positions import PositionService, position_service
+from src.core.services.crypto.exchange.candles import CandleAggregator, candle_aggregator
+from src.core.services.crypto.exchange.events import MarketEventPublisher, market_event_publisher
+from src.core.services.cache.redis.streams import RedisStreamBridge, stream_bridge
+from src.core.services.cache.redis.market_data import RedisMarketData, market_data
+from src.core.services.crypto.exchange.ticker import TickerService, ticker_service
+
+
+logger = logging.getLogger(__name__)
+
+class MarketNotOwnedError(Exception):
+    """Market is hosted by another worker process"""
+    def __init__(self, symbol: str, owner: int):
+        self.symbol = symbol
+        self.owner = owner
+        super().__init__(f"Market {symbol} is served by worker {owner}")
+
+
+class MarketRegistry:
+    """
+    Process-wide owner of one long-lived OrderBook per market.
+
+    Markets are sharded across ``worker_count`` processes by a stable hash
+    of the symbol, so every book lives on exactly one event loop and
+    unrelated symbols never contend with each other. Writes to a book
+    always go through its MarketSequencer. A market whose journal commit
+    failed is halted until the process restarts and recovers it; a wallet
+    change the database refuses halts every local market, the ledger and
+    the table disagree and need a look before trading goes on.
+    """
+    def __init__(
+        self,
+        worker_id: int = 0,
+        worker_count: int = 1,
+        journal_dir: Optional[str] = None,
+        snapshot_every: int = 100_000,
+        writer: Optional[OrderWriter] = None,
+        ledger: Optional[BalanceLedger] = None,
+        risk: Optional[RiskEngine] = None,
+        positions: Optional[PositionService] = None,
+        candles: Optional[CandleAggregator] = None,
+        events: Optional[MarketEventPublisher] = None,
+        bridge: Optional[RedisStreamBridge] = None,
+        market_data: Optional[RedisMarketData] = None,
+        tickers: Optional[TickerService] = None
+    ):
+        self.worker_id = worker_id
+        self.worker_count = worker_count
+        self.journal_dir = journal_dir
+        self.snapshot_every = snapshot_every
+        self.writer = writer
+        self.ledger = ledger
+        self.risk = risk
+        self.positions = positions
+        self.candles = candles
+        self.events = events
+        self.bridge = bridge
+        self.market_data = market_data
+        self.tickers = tickers
+        if events is not None and bridge is not None:
+            events.bus.add_forwarder(bridge.forward)
+        for balance_writer in {writer, ledger.writer if ledger is not None else None} - {None}:
+            balance_writer.add_reject_handler(self._on_rejected_balances)
+        self.books: dict[str, OrderBook] = {}
+        self.sequencers: dict[str, MarketSequencer] = {}
+        self.journals: dict[str, CommandJournal] = {}
+        self.halted: dict[str, str] = {}  # market -> reason
+        self._replay: dict[str, list] = {}  # market -> journal records not persisted yet
+
+    @staticmethod
+    def shard_of(symbol: str, worker_count: int) -> int:
+        """Stable worker index for a market symbol"""
+        return zlib.crc32(symbol.upper().encode()) % worker_count
+
+    def owns(self, symbol: str) -> bool:
+        return self.shard_of(symbol, self.worker_count) == self.worker_id
+
+    def local_markets(self) -> list[str]:
+        """Configured markets hosted by this worker"""
+        return [symbol for symbol in MARKETS if self.owns(symbol)]
+
+    async def load_local_markets(self) -> None:
+        """Restore position checkpoints, recover journaled books up front instead of on their first request"""
+        markets = self.local_markets()
+        if self.positions is not None:
+            await self.positions.load(markets)
+        if self.journal_dir is None:
+            return
+        if self.writer is not None:
+            await self.writer.load_checkpoints(markets)
+        for symbol in markets:
+            self.get_sequencer(symbol)
+        if self.writer is not None:
+            # Replayed commands are stored before wallets are read back
+            await self.writer.flush()
+        if self.ledger is not None:
+            # Resting makers must be cached before their orders can fill
+            await self.ledger.ensure_loaded(
+                user_id for symbol in markets for user_id in self.books[symbol].user_orders
+                )
+
+    def get_book(self, symbol: str) -> OrderBook:
+        """Return the market's book, creating/loading it on first use"""
+        symbol = symbol.upper()
+        book = self.books.get(symbol)
+        if book is None:
+            get_market_config(symbol)
+            if not self.owns(symbol):
+                raise MarketNotOwnedError(symbol, self.shard_of(symbol, self.worker_count))
+            book = self.books[symbol] = self._load_book(symbol)
+        return book
+
+    def _load_book(self, symbol: str) -> OrderBook:
+        """Fresh book, or snapshot + journal replay when journaling is enabled"""
+        book = OrderBook(symbol)
+        if self.journal_dir is not None:
+            persisted = self.writer.journal_checkpoints.get(symbol) if self.writer is not None else None
+            journal, self._replay[symbol] = recover_book(book, self.journal_dir, persisted)
+            self.journals[symbol] = journal
+            if self.writer is not None and persisted is None:
+                # No checkpoint yet: what is journaled so far was stored without one
+                self.writer.mark_journal(symbol, journal.position)
+        logger.info(f"Order book {symbol} started on worker {self.worker_id}")
+        return book
+
+    def get_sequencer(self, symbol: str) -> MarketSequencer:
+        symbol = symbol.upper()
+        sequencer = self.sequencers.get(symbol)
+        if sequencer is None:
+            book = self.get_book(symbol)
+            sequencer = self.sequencers[symbol] = MarketSequencer(
+                book,
+                journal=self.journals.get(symbol),
+                snapshot_every=self.snapshot_every
+                )
+            # Checks reserve (rate token, exposure, funds) only once all of them passed
+            if self.risk is not None:
+                # Positions were loaded up to the same point the book was recovered to
+                self.risk.rebuild(book, self.positions.quantities(symbol) if self.positions is not None else None)
+                book.add_check(self.risk.check, self.risk.accept)
+                sequencer.add_hook(self.risk.apply)
+            if self.ledger is not None:
+                self.ledger.rebuild(book)
+                book.add_check(self.ledger.check, self.ledger.reserve)
+                sequencer.add_hook(self.ledger.settle)
+                sequencer.add_listener(self.ledger.publish)
+            if self.writer is not None:
+                sequencer.add_listener(self.writer.record)
+            if self.positions is not None:
+                sequencer.add_listener(self.positions.record)
+            if self.candles is not None:
+                sequencer.add_listener(self.candles.record)
+            if self.market_data is not None:
+                self.market_data.attach(book)
+                sequencer.add_listener(self.market_data.record)
+            if self.tickers is not None:
+                self.tickers.attach(book)
+                sequencer.add_listener(self.tickers.record)
+            # Last: events go out once every other consumer has the command
+            if self.events is not None:
+                self.events.attach(book)
+                sequencer.add_listener(self.events.publish)
+                if self.bridge is not None:
+                    self.bridge.register(book)
+            if self.writer is not None and symbol in self.journals:
+                # Journal generations are dropped by snapshots only once stored
+                sequencer.add_snapshot_barrier(self.writer.flush)
+            sequencer.add_halt_handler(self._on_halt)
+            records = self._replay.pop(symbol, None)
+            if records:
+                replayed = sequencer.replay(records)
+                logger.info(f"Replayed {replayed} of {len(records)} unpersisted commands of {symbol}")
+        return sequencer
+
+    def _on_halt(self, book: OrderBook, reason: BaseException) -> None:
+        """Halt handler: drop the failed group's unsaved wallet changes"""
+        self.halted[book.market.symbol] = repr(reason)
+        if self.ledger is not None:
+            self.ledger.discard(book)
+            # Its hooks already moved cached funds, read them back from the database
+            for user_id in list(book.user_orders):
+                self.ledger.invalidate(user_id)
+
+    def _on_rejected_balances(self, rows: list[dict]) -> None:
+        """Writer reject handler: stop trading on balances the database does not back"""
+        reason = RuntimeError(f"{len(rows)} wallet changes rejected by the database")
+        for sequencer in self.sequencers.values():
+            sequencer.halt(reason)
+        if self.ledger is not None:
+            for user_id in {row["user_id"] for row in rows}:
+                self.ledger.invalidate(user_id)
+
+    async def stop(self) -> None:
+        for sequencer in self.sequencers.values():
+            await sequencer.stop()
+        writers = {self.writer, self.ledger.writer if self.ledger is not None else None}
+        for writer in writers - {None}:
+            await writer.stop()
+        if self.positions is not None:
+            await self.positions.stop()
+        if self.bridge is not None:
+            await self.bridge.stop()
+        if self.tickers is not None:
+            await self.tickers.stop()
+        if self.market_data is not None:
+            await self.market_data.stop()
+
+    async def _submit(self, symbol: str, kind: str, **kwargs) -> CommandResult:
+        sequencer = self.get_sequencer(symbol)
+        if self.writer is not None:
+            await self.writer.wait_for_capacity()
+        if self.ledger is not None and kwargs.get('user_id') is not None:
+            await self.ledger.ensure_loaded((kwargs['user_id'],))
+        return await sequencer.submit(kind, **kwargs)
+
+    async def create_order(
+        self,
+        symbol: str,
+        user_id: int,
+        side: str,
+        order_type: str,
+        price: Number,
+        amount: Number,
+        time_in_force: str = 'GTC'
+    ) -> CommandResult:
+        return await self._submit(
+            symbol,
+            'new',
+            user_id=user_id,
+            side=side,
+            order_type=order_type,
+            price=price,
+            amount=amount,
+            time_in_force=time_in_force
+            )
+
+    async def create_orders_batch(self, symbol: str, user_id: int, orders: list[dict]) -> CommandResult:
+        """One sequencer round trip for the whole batch"""
+        return await self._submit(symbol, 'batch', user_id=user_id, orders=orders)
+
+    async def cancel_order(self, symbol: str, order_id: int, user_id: Optional[int] = None) -> CommandResult:
+        """Cancel order, optionally only if it belongs to ``user_id``"""
+        return await self._submit(symbol, 'cancel', order_id=order_id, user_id=user_id)
+
+    async def amend_order(
+        self,
+        symbol: str,
+        order_id: int,
+        price: Optional[Number] = None,
+        amount: Optional[Number] = None,
+        user_id: Optional[int] = None
+    ) -> CommandResult:
+        return await self._submit(
+            symbol,
+            'amend',
+            order_id=order_id,
+            price=price,
+            amount=amount,
+            user_id=user_id
+            )
+
+    def get_market_depth(self, symbol: str, depth: Optional[int] = 10) -> dict:
+        # Reads need no sequencing: matching never yields mid-command
+        return self.get_book(symbol).get_market_depth(depth)
+
+
+market_registry = MarketRegistry(
+    worker_id=settings.engine.worker_id,
+    worker_count=settings.engine.worker_count,
+    journal_dir=settings.engine.journal_dir,
+    snapshot_every=settings.engine.snapshot_every,
+    writer=order_writer if settings.engine.persist_orders else None,
+    ledger=balance_ledger if settings.engine.check_balances else None,
+    risk=risk_engine if settings.engine.risk_checks else None,
+    positions=position_service if settings.engine.track_positions else None,
+    candles=candle_aggregator if settings.engine.track_candles else None,
+    events=market_event_publisher if settings.engine.market_events else None,
+    bridge=stream_bridge if settings.engine.market_events and settings.engine.redis_events else None,
+    market_data=market_data if settings.engine.push_market_data else None,
+    tickers=ticker_service if settings.engine.rolling_tickers else None
+)
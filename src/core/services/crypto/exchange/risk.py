@@ -0,0 +1,261 @@
+from dataclasses import dataclass
+from collections import Counter
+from decimal import Decimal
+from time import monotonic
+from typing import Optional
+
+from src.core.services.crypto.exchange.enums import Side, OrderType, OrderStatus
+from src.core.services.crypto.exchange.market import MarketConfig
+from src.core.services.crypto.exchange.trade import Order, OrderBook
+from src.core.services.crypto.exchange.sequencer import Command, CommandResult
+
+
+# Enum member lookups through the class cost more than the whole compare
+BUY = Side.BUY
+LIMIT = OrderType.LIMIT
+OPEN = OrderStatus.OPEN
+
+@dataclass(frozen=True)
+class RiskLimits:
+    """
+    Per user and market. ``max_position`` bounds the worst case net base
+    position (filled position plus every open order on one side filling),
+    ``max_open_notional`` the quote value of open limit orders.
+    """
+    max_open_orders: int = 500
+    max_position: Optional[Decimal] = None
+    max_open_notional: Optional[Decimal] = None
+    orders_per_second: float = 100.0
+    burst: int = 200
+
+DEFAULT_LIMITS = RiskLimits()
+
+MARKET_RISK_LIMITS: dict[str, RiskLimits] = {
+    'BTC-USDT': RiskLimits(max_position=Decimal('50'), max_open_notional=Decimal('5000000')),
+    'ETH-USDT': RiskLimits(max_position=Decimal('1000'), max_open_notional=Decimal('5000000')),
+    'SOL-USDT': RiskLimits(max_position=Decimal('50000'), max_open_notional=Decimal('2000000')),
+    'USDC-USDT': RiskLimits(max_position=Decimal('5000000'), max_open_notional=Decimal('5000000')),
+}
+
+
+class _MarketLimits:
+    """RiskLimits converted to the market's integer units"""
+    __slots__ = ('max_open_orders', 'max_position', 'max_notional', 'rate', 'burst')
+
+    def __init__(self, limits: RiskLimits, market: MarketConfig):
+        unlimited = 1 << 62
+        self.max_open_orders = limits.max_open_orders
+        self.max_position = unlimited if limits.max_position is None else int(limits.max_position / market.lot_size)
+        self.max_notional = (
+            unlimited if limits.max_open_notional is None
+            else int(limits.max_open_notional / (market.tick_size * market.lot_size))
+            )
+        self.rate = limits.orders_per_second
+        self.burst = limits.burst
+
+
+class _Account:
+    """Risk state of one user in one market, lots and ticks*lots"""
+    __slots__ = ('open_orders', 'open_buy', 'open_sell', 'open_notional', 'position', 'tokens', 'refilled_at')
+
+    def __init__(self, burst: int):
+        self.open_orders = 0
+        self.open_buy = 0
+        self.open_sell = 0
+        self.open_notional = 0
+        self.position = 0
+        self.tokens = float(burst)
+        self.refilled_at = monotonic()
+
+
+class RiskEngine:
+    """
+    In-memory pre-trade risk checks: open order count, worst case position,
+    open notional and an order rate token bucket per user and market.
+
+    ``check`` is an OrderBook pre-trade check made of dict lookups and
+    integer compares; ``accept``, run once every check passed, spends the
+    rate token and counts the order's exposure. ``apply`` is a sequencer
+    hook that updates exposure incrementally from accepted orders, fills,
+    amends and cancels. Nothing here touches the database.
+    """
+    def __init__(self, limits: Optional[dict[str, RiskLimits]] = None):
+        self.limits = MARKET_RISK_LIMITS if limits is None else limits
+        self.rejections: Counter = Counter()
+        self._market_limits: dict[int, _MarketLimits] = {}
+        self._accounts: dict[tuple[int, int], _Account] = {}  # (market_id, user) -> account
+        self._live: dict[int, list] = {}                       # OrderID -> [price counted, lots counted]
+        # Exposure of orders checked but not yet applied, a batch is checked
+        # order by order before its command hook runs
+        self._provisional: dict[tuple[int, int], list] = {}
+        self._provisional_token = -1
+        self._checked: Optional[tuple] = None  # What the last passed check will spend and count
+
+    def _limits_for(self, market: MarketConfig) -> _MarketLimits:
+        limits = self._market_limits.get(market.market_id)
+        if limits is None:
+            limits = self._market_limits[market.market_id] = _MarketLimits(
+                self.limits.get(market.symbol, DEFAULT_LIMITS), market
+                )
+        return limits
+
+    def _account(self, market_id: int, user_id: int, limits: _MarketLimits) -> _Account:
+        key = (market_id, user_id)
+        account = self._accounts.get(key)
+        if account is None:
+            account = self._accounts[key] = _Account(limits.burst)
+        return account
+
+    def _reject(self, reason: str):
+        self.rejections[reason] += 1
+        raise ValueError(f"Risk limit exceeded: {reason}")
+
+    def check(self, book: OrderBook, order: Order, price: int, amount: int) -> None:
+        """Pre-trade check for a new order or an amendment to ``price``/``amount``"""
+        market = book.market
+        limits = self._market_limits.get(market.market_id) or self._limits_for(market)
+        key = (market.market_id, order.user_id)
+        account = self._accounts.get(key) or self._account(market.market_id, order.user_id, limits)
+
+        now = monotonic()
+        tokens = account.tokens + (now - account.refilled_at) * limits.rate
+        if tokens > limits.burst:
+            tokens = limits.burst
+        if tokens < 1:
+            self._reject('rate')
+
+        if book.last_order_id != self._provisional_token:
+            self._provisional.clear()
+            self._provisional_token = book.last_order_id
+
+        live = self._live.get(order.id)
+        is_new = live is None
+        remaining = amount - order.filled
+        notional = price * remaining if order.type is LIMIT else 0
+        if is_new:
+            pending = self._provisional.get(key)
+            if pending is None:
+                pending = self._provisional[key] = [0, 0, 0, 0]  # orders, buy, sell, notional
+            orders_delta, lots_delta, notional_delta = 1, remaining, notional
+        else:
+            pending = (0, 0, 0, 0)
+            orders_delta, lots_delta, notional_delta = 0, remaining - live[1], notional - live[0] * live[1]
+
+        if account.open_orders + pending[0] + orders_delta > limits.max_open_orders:
+            self._reject('open_orders')
+        if order.side is BUY:
+            if account.position + account.open_buy + pending[1] + lots_delta > limits.max_position:
+                self._reject('position')
+        elif account.open_sell + pending[2] + lots_delta - account.position > limits.max_position:
+            self._reject('position')
+        if account.open_notional + pending[3] + notional_delta > limits.max_notional:
+            self._reject('open_notional')
+
+        self._checked = (order, account, tokens - 1, now, pending if is_new else None, remaining, notional)
+
+    def accept(self, book: OrderBook, order: Order, price: int, amount: int) -> None:
+        """Accept of ``check``: spend the rate token, count a new order until its hook runs"""
+        checked, account, tokens, now, pending, remaining, notional = self._checked
+        self._checked = None
+        if checked is not order:
+            raise RuntimeError("RiskEngine.accept without a passed check")
+        account.tokens = tokens
+        account.refilled_at = now
+        if pending is not None:
+            pending[0] += 1
+            pending[1 if order.side is BUY else 2] += remaining
+            pending[3] += notional
+
+    def apply(self, book: OrderBook, command: Command, result: CommandResult) -> None:
+        """Sequencer hook: fold the command's accepted orders, fills and cancels into exposure"""
+        self._provisional.clear()
+        market = book.market
+        limits = self._limits_for(market)
+        market_id = market.market_id
+
+        touched: list[Order] = []
+        if command.kind == 'new':
+            touched.append(result.value)
+        elif command.kind == 'batch':
+            touched.extend(item for item in result.value if isinstance(item, Order))
+        elif command.kind == 'cancel' and result.value:
+            touched.append(book.get_order(command.kwargs['order_id']))
+        elif command.kind == 'amend':
+            touched.append(result.value)
+
+        filled_now: dict[int, int] = {}
+        for trade in result.trades:
+            filled_now[trade.buy_order_id] = filled_now.get(trade.buy_order_id, 0) + trade.amount
+            filled_now[trade.sell_order_id] = filled_now.get(trade.sell_order_id, 0) + trade.amount
+
+        # Register/re-size orders as they stood before this command's fills
+        for order in touched:
+            if order.status is OPEN or order.id in filled_now or order.id in self._live:
+                self._track(order, order.amount - order.filled + filled_now.get(order.id, 0), market_id, limits)
+
+        for trade in result.trades:
+            buyer = self._account(market_id, trade.buyer_id, limits)
+            seller = self._account(market_id, trade.seller_id, limits)
+            buyer.position += trade.amount
+            seller.position -= trade.amount
+            for order_id, account in ((trade.buy_order_id, buyer), (trade.sell_order_id, seller)):
+                live = self._live.get(order_id)
+                if live is not None:
+                    live[1] -= trade.amount
+                    account.open_notional -= live[0] * trade.amount
+                    if order_id == trade.buy_order_id:
+                        account.open_buy -= trade.amount
+                    else:
+                        account.open_sell -= trade.amount
+            touched.append(book.get_order(trade.buy_order_id))
+            touched.append(book.get_order(trade.sell_order_id))
+
+        for order in touched:
+            if order is not None and order.status is not OPEN and order.id in self._live:
+                self._track(order, 0, market_id, limits)
+
+    def _track(self, order: Order, lots: int, market_id: int, limits: _MarketLimits) -> None:
+        """Set the exposure counted for ``order`` to ``lots`` at its current price, 0 forgets it"""
+        account = self._account(market_id, order.user_id, limits)
+        price = order.price if order.type is LIMIT else 0
+        live = self._live.get(order.id)
+        if live is None:
+            if not lots:
+                return
+            live = self._live[order.id] = [0, 0]
+            account.open_orders += 1
+        account.open_notional += price * lots - live[0] * live[1]
+        if order.side is BUY:
+            account.open_buy += lots - live[1]
+        else:
+            account.open_sell += lots - live[1]
+        if lots:
+            live[0], live[1] = price, lots
+        else:
+            del self._live[order.id]
+            account.open_orders -= 1
+
+    def rebuild(self, book: OrderBook, positions: Optional[dict[int, int]] = None) -> None:
+        """Count resting orders of a recovered book, ``positions`` are net lots per user (else flat)"""
+        market = book.market
+        limits = self._limits_for(market)
+        for user_id, lots in (positions or {}).items():
+            self._account(market.market_id, user_id, limits).position = lots
+        for order in book.orders.values():
+            if order.status is OPEN and order.level is not None:
+                self._track(order, order.amount - order.filled, market.market_id, limits)
+
+    def get_exposure(self, market: MarketConfig, user_id: int) -> Optional[dict]:
+        account = self._accounts.get((market.market_id, user_id))
+        if account is None:
+            return None
+        return {
+            "open_orders": account.open_orders,
+            "open_buy": market.lots_to_qty(account.open_buy),
+            "open_sell": market.lots_to_qty(account.open_sell),
+            "open_notional": account.open_notional * market.tick_size * market.lot_size,
+            "position": market.lots_to_qty(account.position),
+        }
+
+
+risk_engine = RiskEngine()
@@ -0,0 +1,271 @@
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, Optional
+import asyncio
+import logging
+
+from src.core.services.crypto.exchange.trade import OrderBook, Trade
+from src.core.services.crypto.exchange.journal import CommandJournal
+
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Command:
+    kind: str  # 'new', 'batch', 'cancel', 'amend'
+    kwargs: dict
+    future: Optional[asyncio.Future]  # None for replayed commands
+    replayed: bool = False            # Re-run from the journal, pre-trade checks were skipped
+
+@dataclass
+class CommandResult:
+    value: Any                                        # Return value of the book method
+    trades: list[Trade] = field(default_factory=list) # Fills produced by this command
+    position: Optional[tuple[int, int]] = None        # Journal (generation, offset) it is durable at
+
+Listener = Callable[[OrderBook, Command, CommandResult], None]
+HaltHandler = Callable[[OrderBook, BaseException], None]
+
+
+class MarketHaltedError(Exception):
+    """Market stopped taking commands, its state must be recovered from the journal"""
+    def __init__(self, symbol: str, reason: BaseException):
+        self.symbol = symbol
+        self.reason = reason
+        super().__init__(f"Market {symbol} is halted: {reason}")
+
+
+class MarketSequencer:
+    """
+    Single writer for one OrderBook.
+
+    Every mutating command goes through one asyncio.Queue drained by one
+    consumer task, which runs the synchronous matching code to completion
+    before touching the next command. Ordering is therefore deterministic
+    (arrival order) and matching is never interleaved with other coroutines.
+
+    With a journal attached, every group of commands drained in one pass is
+    written and fsynced once (group commit) before any of them is
+    acknowledged, and a snapshot is taken every ``snapshot_every`` records,
+    once the snapshot barriers (write-behind flushes) are through. A failed
+    commit halts the market: the group already ran against the book, so
+    only recovery from the journal, which is cut back to the last
+    committed group, gives consistent state again.
+
+    Hooks run synchronously right after each successful command, before
+    the next one, for in-memory state later commands depend on (balances).
+    Listeners are called with every successful command, in sequence order,
+    once its group is durable and right before it is acknowledged. Neither
+    may do I/O inline, only hand the result off (buffer, enqueue).
+    """
+    def __init__(
+        self,
+        book: OrderBook,
+        maxsize: int = 10_000,
+        journal: Optional[CommandJournal] = None,
+        snapshot_every: int = 100_000
+    ):
+        self.book = book
+        self.journal = journal
+        self.snapshot_every = snapshot_every
+        self.hooks: list[Listener] = []
+        self.listeners: list[Listener] = []
+        self.barriers: list[Callable[[], Awaitable[None]]] = []
+        self.halt_handlers: list[HaltHandler] = []
+        self.halted: Optional[BaseException] = None
+        self.queue: asyncio.Queue[Command] = asyncio.Queue(maxsize=maxsize)
+        self._task: Optional[asyncio.Task] = None
+        self._group: Optional[list] = None  # In flight from execution until its snapshot is done
+        self._stopping = False
+        self._handlers = {
+            'new': book.create_order,
+            'batch': book.create_orders_batch,
+            'cancel': book.cancel_order,
+            'amend': book.amend_order,
+        }
+
+    def add_hook(self, hook: Listener) -> None:
+        self.hooks.append(hook)
+
+    def add_listener(self, listener: Listener) -> None:
+        self.listeners.append(listener)
+
+    def add_snapshot_barrier(self, barrier: Callable[[], Awaitable[None]]) -> None:
+        """Awaited before every snapshot, which drops the journal generations before it"""
+        self.barriers.append(barrier)
+
+    def add_halt_handler(self, handler: HaltHandler) -> None:
+        self.halt_handlers.append(handler)
+
+    def start(self) -> None:
+        if self.halted is None and not self._stopping and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(
+                self._run(),
+                name=f"sequencer-{self.book.market.symbol}"
+                )
+
+    async def stop(self) -> None:
+        """Let the group in flight finish, then stop and fail commands that were never executed"""
+        self._stopping = True
+        if self._task is not None:
+            if self._group is None:  # Idle on the queue, nothing executed yet
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._fail_queued(RuntimeError("Sequencer stopped"))
+        if self.journal is not None:
+            self.journal.close()
+
+    def halt(self, reason: BaseException) -> None:
+        """Refuse every further command, the book cannot be trusted anymore"""
+        if self.halted is not None:
+            return
+        self.halted = reason
+        logger.critical(f"Market {self.book.market.symbol} halted: {reason!r}")
+        self._fail_queued(MarketHaltedError(self.book.market.symbol, reason))
+        for handler in self.halt_handlers:
+            try:
+                handler(self.book, reason)
+            except Exception:
+                logger.exception("Halt handler failed")
+
+    def _fail_queued(self, error: Exception) -> None:
+        while not self.queue.empty():
+            command = self.queue.get_nowait()
+            if not command.future.done():
+                command.future.set_exception(error)
+
+    async def submit(self, kind: str, **kwargs) -> CommandResult:
+        """Enqueue command and wait for its result"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown command: {kind}")
+        if self.halted is not None:
+            raise MarketHaltedError(self.book.market.symbol, self.halted)
+        if self._stopping:
+            raise RuntimeError("Sequencer stopped")
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put(Command(kind, kwargs, future))
+        if self.halted is not None and not future.done():  # Halted while waiting for room
+            future.set_exception(MarketHaltedError(self.book.market.symbol, self.halted))
+        return await future
+
+    async def _run(self) -> None:
+        queue = self.queue
+        try:
+            while not self._stopping and self.halted is None:
+                # Hooks and listeners are done with the previous group's finished orders
+                self.book.prune_finished()
+                group = self._group = [self._execute(await queue.get())]
+                # Drain whatever is already queued without yielding to the loop
+                while not queue.empty():
+                    group.append(self._execute(queue.get_nowait()))
+                if self.journal is not None:
+                    try:
+                        await self.journal.commit()
+                    except Exception as err:
+                        logger.exception(f"Journal commit failed for {self.book.market.symbol}")
+                        self._fail_group(err)
+                        return
+                    position = self.journal.position
+                    for _, outcome in group:
+                        if isinstance(outcome, CommandResult):
+                            outcome.position = position
+                self._notify(group)
+                self._resolve(group)
+                if self.journal is not None and self.journal.records_since_snapshot >= self.snapshot_every:
+                    await self._snapshot()
+                self._group = None
+        finally:
+            if self._group is not None:  # Cancelled mid-group, outcome unknown to callers otherwise
+                self._resolve(self._group, RuntimeError("Sequencer stopped"))
+                self._group = None
+
+    def _fail_group(self, err: Exception) -> None:
+        """Failed commit: commands already changed the book and ran their hooks, halt"""
+        group, self._group = self._group, None
+        try:
+            self.journal.rollback()
+        except Exception:
+            logger.exception(f"Journal rollback failed for {self.book.market.symbol}")
+        self._resolve(group, MarketHaltedError(self.book.market.symbol, err))
+        self.halt(err)
+
+    async def _snapshot(self) -> None:
+        try:
+            for barrier in self.barriers:
+                await barrier()
+        except Exception:
+            # Retried after the next group, the journal just grows meanwhile
+            logger.exception(f"Snapshot of {self.book.market.symbol} postponed, barrier failed")
+            return
+        try:
+            await self.journal.snapshot(self.book)
+        except Exception:
+            # Older snapshot + journal generations are still intact
+            logger.exception(f"Snapshot failed for {self.book.market.symbol}")
+
+    def replay(self, records: Iterable[tuple[str, dict, tuple[int, int]]]) -> int:
+        """
+        Run journaled commands whose effects were never stored (see
+        recover_book) through hooks and listeners like live ones, without
+        journaling them again. Call once wired, before the first submit.
+        """
+        book = self.book
+        handlers = {'new': book.replay_new, 'cancel': book.cancel_order, 'amend': book.replay_amend}
+        replayed = 0
+        for kind, kwargs, position in records:
+            command = Command(kind, kwargs, None, replayed=True)
+            result = CommandResult(handlers[kind](**kwargs), book.drain_trades(), position)
+            if result.value:  # Not a no-op (order already gone)
+                self._run_hooks(command, result)
+                self._notify([(command, result)])
+                replayed += 1
+            book.prune_finished()
+        return replayed
+
+    def _notify(self, group: list) -> None:
+        for listener in self.listeners:
+            for command, outcome in group:
+                if isinstance(outcome, CommandResult):
+                    try:
+                        listener(self.book, command, outcome)
+                    except Exception:
+                        logger.exception(f"Sequencer listener failed on {command.kind}")
+
+    @staticmethod
+    def _resolve(group: list, failure: Optional[Exception] = None) -> None:
+        for command, outcome in group:
+            if command.future.done():
+                continue
+            if failure is None and isinstance(outcome, CommandResult):
+                command.future.set_result(outcome)
+            else:
+                command.future.set_exception(failure or outcome)
+
+    def _execute(self, command: Command) -> tuple[Command, Any]:
+        """Run command against the book, returns it with its result or error"""
+        if command.future.done():  # caller went away
+            return command, None
+        try:
+            value = self._handlers[command.kind](**command.kwargs)
+        except Exception as err:
+            # A failed command must not leak fills into the next result
+            trades = self.book.drain_trades()
+            if trades:
+                logger.error(f"{command.kind} failed after producing {len(trades)} fills: {err}")
+            return command, err
+        if self.journal is not None:
+            self.journal.log_result(command.kind, command.kwargs, value)
+        result = CommandResult(value, self.book.drain_trades())
+        self._run_hooks(command, result)
+        return command, result
+
+    def _run_hooks(self, command: Command, result: CommandResult) -> None:
+        for hook in self.hooks:
+            try:
+                hook(self.book, command, result)
+            except Exception:
+                logger.exception(f"Sequencer hook failed on {command.kind}")
@@ -0,0 +1,193 @@
+from collections import deque
+from decimal import Decimal
+from typing import Optional
+import asyncio
+import time
+
+import orjson
+
+from src.core.config.settings import settings
+from src.core.services.crypto.exchange.market import MARKETS, MarketConfig
+from src.core.services.crypto.exchange.trade import OrderBook
+from src.core.services.crypto.exchange.sequencer import Command, CommandResult
+from src.core.services.cache.redis.market_data import RedisMarketData, market_data
+
+
+class RollingWindow:
+    """
+    Trade statistics of the last ``window`` seconds in integer ticks/lots.
+
+    Fills are grouped in one second buckets, oldest first; volume, notional
+    and trade count are running sums, high and low come from monotonic
+    deques of (bucket start, price). Adding a fill and expiring a bucket
+    are O(1) amortized, so is every read.
+    """
+    __slots__ = ('window', 'buckets', 'highs', 'lows', 'volume', 'notional', 'trades', 'last')
+
+    def __init__(self, window: int = 86_400):
+        self.window = window
+        self.buckets: deque[list] = deque()  # [start, open, volume, notional, trades]
+        self.highs: deque[tuple[int, int]] = deque()  # Decreasing prices
+        self.lows: deque[tuple[int, int]] = deque()   # Increasing prices
+        self.volume = 0
+        self.notional = 0  # ticks * lots
+        self.trades = 0
+        self.last: Optional[int] = None
+
+    def add(self, price: int, amount: int, timestamp: float) -> None:
+        start = int(timestamp)
+        notional = price * amount
+        buckets = self.buckets
+        if buckets and buckets[-1][0] >= start:
+            bucket = buckets[-1]
+            start = bucket[0]  # Late fill, counted in the newest bucket
+            bucket[2] += amount
+            bucket[3] += notional
+            bucket[4] += 1
+        else:
+            buckets.append([start, price, amount, notional, 1])
+        highs = self.highs
+        if not highs or price >= highs[-1][1] or highs[-1][0] != start:
+            while highs and highs[-1][1] <= price:
+                highs.pop()
+            highs.append((start, price))
+        lows = self.lows
+        if not lows or price <= lows[-1][1] or lows[-1][0] != start:
+            while lows and lows[-1][1] >= price:
+                lows.pop()
+            lows.append((start, price))
+        self.volume += amount
+        self.notional += notional
+        self.trades += 1
+        self.last = price
+
+    def expire(self, now: float) -> bool:
+        """Drop buckets older than the window, True if any was"""
+        cutoff = int(now) - self.window
+        buckets = self.buckets
+        expired = False
+        while buckets and buckets[0][0] <= cutoff:
+            _, _, volume, notional, trades = buckets.popleft()
+            self.volume -= volume
+            self.notional -= notional
+            self.trades -= trades
+            expired = True
+        while self.highs and self.highs[0][0] <= cutoff:
+            self.highs.popleft()
+        while self.lows and self.lows[0][0] <= cutoff:
+            self.lows.popleft()
+        return expired
+
+    def stats(self, market: MarketConfig) -> dict:
+        if not self.buckets:
+            return {
+                "open_24h": None, "high_24h": None, "low_24h": None, "volume_24h": Decimal(0),
+                "quote_volume_24h": Decimal(0), "vwap_24h": None, "change_24h": None,
+                "change_pct_24h": None, "trades_24h": 0,
+            }
+        tick = market.tick_size
+        open_ = self.buckets[0][1]
+        return {
+            "open_24h": market.ticks_to_price(open_),
+            "high_24h": market.ticks_to_price(self.highs[0][1]),
+            "low_24h": market.ticks_to_price(self.lows[0][1]),
+            "volume_24h": market.lots_to_qty(self.volume),
+            "quote_volume_24h": self.notional * tick * market.lot_size,
+            "vwap_24h": (Decimal(self.notional) / self.volume * tick).quantize(tick),
+            "change_24h": market.ticks_to_price(self.last - open_),
+            "change_pct_24h": (Decimal((self.last - open_) * 100) / open_).quantize(Decimal('0.01')),
+            "trades_24h": self.trades,
+        }
+
+
+class TickerService:
+    """
+    Rolling 24h statistics of the local markets, published through the
+    market data cache next to last price and top of book.
+
+    ``record`` is a sequencer listener; a background task slides the
+    windows of markets without fills every ``expire_interval`` seconds, so
+    the cached tickers never outlive their window. ``get_tickers`` returns
+    every configured market (remote ones from the cache) as one JSON
+    document, built at most once per ``refresh_interval`` for all callers.
+    """
+    def __init__(
+        self,
+        cache: RedisMarketData,
+        window: int = 86_400,
+        refresh_interval: float = 0.25,
+        expire_interval: float = 1.0
+    ):
+        self.cache = cache
+        self.window = window
+        self.refresh_interval = refresh_interval
+        self.expire_interval = expire_interval
+        self.windows: dict[str, RollingWindow] = {}
+        self._markets: dict[str, MarketConfig] = {}
+        self._body: Optional[bytes] = None
+        self._built_at = 0.0
+        self._building: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def attach(self, book: OrderBook) -> None:
+        symbol = book.market.symbol
+        if symbol not in self.windows:
+            self.windows[symbol] = RollingWindow(self.window)
+            self._markets[symbol] = book.market
+            self.cache.update(symbol, self.windows[symbol].stats(book.market))
+        self.start()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="ticker-expiry")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.expire_interval)
+            self.refresh()
+
+    def record(self, book: OrderBook, command: Command, result: CommandResult) -> None:
+        if not result.trades:
+            return
+        symbol = book.market.symbol
+        window = self.windows[symbol]
+        for trade in result.trades:
+            window.add(trade.price, trade.amount, trade.timestamp)
+        window.expire(time.time())
+        self.cache.update(symbol, window.stats(book.market))
+
+    def refresh(self, now: Optional[float] = None) -> None:
+        """Slide the windows of markets without recent fills"""
+        now = time.time() if now is None else now
+        for symbol, window in self.windows.items():
+            if window.expire(now):
+                self.cache.update(symbol, window.stats(self._markets[symbol]))
+
+    async def get_tickers(self) -> bytes:
+        if self._body is not None and time.monotonic() - self._built_at < self.refresh_interval:
+            return self._body
+        if self._building is None or self._building.done():
+            self._building = asyncio.get_running_loop().create_task(self._build())
+        return await asyncio.shield(self._building)
+
+    async def _build(self) -> bytes:
+        tickers = []
+        for symbol in MARKETS:
+            entry = await self.cache.get(symbol)
+            if entry is not None:
+                tickers.append(entry)
+        self._body = orjson.dumps(tickers, default=str)
+        self._built_at = time.monotonic()
+        return self._body
+
+
+ticker_service = TickerService(
+    market_data,
+    refresh_interval=settings.engine.tickers_refresh_ms / 1000
+)
@@ -1,176 +1,495 @@
-from sqlalchemy.ext.asyncio import AsyncSession
 from collections import defaultdict
-from sortedcontainers import SortedDict
-from dataclasses import dataclass
-from typing import Optional
-import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Union
+import time
 
-@dataclass
+from src.core.services.crypto.exchange.market import (
+    MarketConfig,
+    DEFAULT_MARKET,
+    Number,
+    get_market_config
+)
+from src.core.services.crypto.exchange.price_level import PriceLevel
+from src.core.services.crypto.exchange.book_side import make_book_side
+from src.core.services.crypto.exchange.enums import Side, OrderType, OrderStatus, TimeInForce
+
+@dataclass(slots=True, eq=False)
 class Order:
-    id: str
+    id: int      # market_id << 48 | per-market sequence, str(id) at the API
     user_id: int
-    side: str  # 'buy' or 'sell'
-    type: str  # 'limit', 'market'
-    price: float
-    amount: float
-    filled: float = 0.0
-    status: str = 'open'  # 'open', 'filled', 'canceled'
+    side: Side
+    type: OrderType
+    price: int   # ticks
+    amount: int  # lots
+    filled: int = 0
+    status: OrderStatus = OrderStatus.OPEN
+    time_in_force: TimeInForce = TimeInForce.GTC
+    # Intrusive links into the resting PriceLevel queue
+    prev: Optional["Order"] = field(default=None, repr=False)
+    next: Optional["Order"] = field(default=None, repr=False)
+    level: Optional[PriceLevel] = field(default=None, repr=False)
+
+@dataclass(slots=True)
+class Trade:
+    market: str
+    price: int   # ticks
+    amount: int  # lots
+    buy_order_id: int
+    sell_order_id: int
+    buyer_id: int
+    seller_id: int
+    taker_side: Side = Side.BUY
+    timestamp: float = field(default_factory=time.time)
+
+# (book, order, price ticks, amount lots) -> None, raises ValueError to reject
+PreTradeCheck = Callable[["OrderBook", Order, int, int], None]
 
 class OrderBook:
-    def __init__(self):
-        self.bids = SortedDict(lambda x: -x)  # Highest bid first
-        self.asks = SortedDict()              # Lowest ask first
-        self.orders = {}                      # OrderID -> Order
-        self.user_orders = defaultdict(list)  # UserID -> List[OrderID]
+    """
+    Single-market limit order book and matching engine.
+
+    All mutating methods are synchronous: matching never awaits, so the
+    book must be driven by exactly one writer (see MarketSequencer).
+    Level indexing is delegated to a BookSide backend chosen per market.
+    Pre-trade checks run on every new order and amendment right before
+    it reaches the book, with the price/amount it is about to get; their
+    accept callbacks only once every check passed, so nothing is reserved
+    for an order a later check rejects.
+    """
+    def __init__(self, market: str = DEFAULT_MARKET, book_backend: Optional[str] = None):
+        self.market: MarketConfig = get_market_config(market)
+        self.bids = make_book_side(self.market, is_bid=True, backend=book_backend)   # highest bid first
+        self.asks = make_book_side(self.market, is_bid=False, backend=book_backend)  # lowest ask first
+        self.orders = {}                      # OrderID -> Order, open orders plus not yet pruned finished ones
+        self.user_orders = defaultdict(set)   # UserID -> Set[OrderID], same scope
+        self.trades: list[Trade] = []         # Fills produced since the last drain_trades()
+        self.finished: list[Order] = []       # Filled/canceled since the last prune_finished()
+        # (side, price) of levels changed since the last drain_changed_levels(), None while untracked
+        self.changed_levels: Optional[set[tuple[Side, int]]] = None
+        self.last_order_id = self.market.first_order_id - 1
+        self.checks: list[PreTradeCheck] = []
+        self.accepts: list[PreTradeCheck] = []
+
+    def add_check(self, check: PreTradeCheck, accept: Optional[PreTradeCheck] = None) -> None:
+        """``accept`` gets the same arguments once all checks passed, to reserve what ``check`` counted"""
+        self.checks.append(check)
+        if accept is not None:
+            self.accepts.append(accept)
+
+    def _run_checks(self, order: Order, price: int, amount: int) -> None:
+        for check in self.checks:
+            check(self, order, price, amount)
+        for accept in self.accepts:
+            accept(self, order, price, amount)
 
-    async def create_order(
+    def create_order(
         self,
         user_id: int,
-        side: str,
-        order_type: str,
-        price: float,
-        amount: float,
+        side: Union[Side, str],
+        order_type: Union[OrderType, str],
+        price: Number,
+        amount: Number,
+        time_in_force: Union[TimeInForce, str] = TimeInForce.GTC,
         **kwargs
     ) -> Order:
         """Main order creation endpoint"""
-        order_id = str(uuid.uuid4())
+        order = self._build_order(user_id, side, order_type, price, amount, time_in_force)
+        if self.checks:
+            self._run_checks(order, order.price, order.amount)
+        
+        # Match as taker, rest or cancel the remainder
+        self._process(order)
+        
+        # Record user's order
+        self.user_orders[user_id].add(order.id)
+        
+        return order
+
+    def create_orders_batch(self, user_id: int, orders: list[dict]) -> list[Union[Order, ValueError]]:
+        """
+        Validate a batch of orders up front, then run them through the book in
+        one pass. ``orders`` items carry side/order_type/price/amount(/time_in_force),
+        the result keeps the input order and holds either the Order or the
+        validation error. Non-crossing quotes cost a single top-of-book compare.
+        """
+        results: list[Union[Order, ValueError]] = []
+        for item in orders:
+            try:
+                results.append(self._build_order(user_id, **item))
+            except (ValueError, TypeError) as err:
+                results.append(ValueError(str(err)))
+        
+        user_orders = self.user_orders[user_id]
+        for index, order in enumerate(results):
+            if isinstance(order, Order):
+                if self.checks:
+                    try:
+                        self._run_checks(order, order.price, order.amount)
+                    except ValueError as err:
+                        results[index] = err
+                        continue
+                self._process(order)
+                user_orders.add(order.id)
+        return results
+
+    def _build_order(
+        self,
+        user_id: int,
+        side: Union[Side, str],
+        order_type: Union[OrderType, str],
+        price: Number,
+        amount: Number,
+        time_in_force: Union[TimeInForce, str] = TimeInForce.GTC
+    ) -> Order:
+        """Convert API values to enums/ticks/lots and validate"""
+        order_type = OrderType.parse(order_type)
+        time_in_force = TimeInForce.parse(time_in_force)
+        if order_type is OrderType.MARKET:
+            # Market orders never rest and carry no limit price
+            price = 0
+            if time_in_force is TimeInForce.GTC:
+                time_in_force = TimeInForce.IOC
+        
+        self.last_order_id += 1
         order = Order(
-            id=order_id,
+            id=self.last_order_id,
             user_id=user_id,
-            side=side,
+            side=Side.parse(side),
             type=order_type,
-            price=price,
-            amount=amount
+            price=self.market.price_to_ticks(price),
+            amount=self.market.qty_to_lots(amount),
+            time_in_force=time_in_force
         )
         
-        # Validate order
-        if not await self._validate_order(order):
+        if not self._validate_order(order):
             raise ValueError("Invalid order parameters")
-        
-        # Add to order book
-        await self._add_to_book(order)
-        
-        # Record user's order
-        self.user_orders[user_id].append(order_id)
-        
         return order
 
-    async def _validate_order(self, order: Order) -> bool:
-        """Validate order parameters"""
-        if order.side not in ('buy', 'sell'):
+    def _validate_order(self, order: Order) -> bool:
+        """Validate order parameters (enum fields are checked by parse)"""
+        if order.amount <= 0:
             return False
-        if order.type not in ('limit', 'market'):
+        if order.type is OrderType.LIMIT and order.price <= 0:
             return False
-        if order.amount <= 0:
+        if order.price < 0:
             return False
-        if order.type == 'limit' and order.price <= 0:
+        if order.time_in_force is TimeInForce.GTC and not self._side(order).accepts(order.price):
             return False
         return True
 
-    async def _add_to_book(self, order: Order):
-        """Add order to the appropriate price level"""
-        book = self.bids if order.side == 'buy' else self.asks
-        
-        if order.price not in book:
-            book[order.price] = []
-        book[order.price].append(order)
+    def _side(self, order: Order):
+        return self.bids if order.side is Side.BUY else self.asks
+
+    def _process(self, order: Order):
+        """Run an incoming order against the book according to its time in force"""
         self.orders[order.id] = order
         
-        await self.match_orders()
+        if order.time_in_force is TimeInForce.FOK and not self._can_fill(order):
+            order.status = OrderStatus.CANCELED
+            self.finished.append(order)
+            return
+        
+        self._sweep(order)
+        
+        if order.filled == order.amount:
+            order.status = OrderStatus.FILLED
+            self.finished.append(order)
+        elif order.time_in_force is TimeInForce.GTC:
+            self._add_to_book(order)
+        else:
+            order.status = OrderStatus.CANCELED  # IOC/market remainder never rests
+            self.finished.append(order)
 
-    async def match_orders(self):
-        """Match orders using price-time priority"""
-        while self._can_match():
-            best_bid_price, best_bid_orders = self.bids.peekitem(0)
-            best_ask_price, best_ask_orders = self.asks.peekitem(0)
-            
-            bid_order = best_bid_orders[0]
-            ask_order = best_ask_orders[0]
+    def _crosses(self, order: Order, level_price: int) -> bool:
+        if order.type is OrderType.MARKET:
+            return True
+        if order.side is Side.BUY:
+            return order.price >= level_price
+        return order.price <= level_price
+
+    def _can_fill(self, order: Order) -> bool:
+        """Whether crossing liquidity covers the whole order, O(levels needed)"""
+        opposite = self.asks if order.side is Side.BUY else self.bids
+        needed = order.amount - order.filled
+        for level in opposite.levels():
+            if not self._crosses(order, level.price):
+                return False
+            needed -= level.total_remaining
+            if needed <= 0:
+                return True
+        return False
+
+    def _sweep(self, order: Order):
+        """
+        Execute incoming (taker) order against opposite levels, best first.
+        Each consumed level costs one peek and one pop, so taking K levels is O(K).
+        """
+        is_buy = order.side is Side.BUY
+        opposite = self.asks if is_buy else self.bids
+        remaining = order.amount - order.filled
+        
+        while remaining and opposite:
+            level = opposite.best()
+            if not self._crosses(order, level.price):
+                break
             
-            trade_amount = min(
-                bid_order.amount - bid_order.filled,
-                ask_order.amount - ask_order.filled
-            )
+            if self.changed_levels is not None:
+                self.changed_levels.add((level.head.side, level.price))
+            maker = level.head
+            while maker is not None and remaining:
+                trade_amount = min(remaining, maker.amount - maker.filled)
+                if is_buy:
+                    self.execute_trade(order, maker, trade_amount, level.price, taker_side=Side.BUY)
+                else:
+                    self.execute_trade(maker, order, trade_amount, level.price, taker_side=Side.SELL)
+                remaining -= trade_amount
+                
+                if maker.filled == maker.amount:
+                    level.remove(maker)
+                    maker.status = OrderStatus.FILLED
+                    self.finished.append(maker)
+                    maker = level.head
             
-            await self.execute_trade(bid_order, ask_order, trade_amount, best_bid_price)
-            await self._cleanup_orders(bid_order, ask_order)
-
-    def _can_match(self) -> bool:
-        """Check if matching is possible"""
-        return (
-            bool(self.bids) and 
-            bool(self.asks) and 
-            self.bids.peekitem(0)[0] >= self.asks.peekitem(0)[0]
-        )
+            if not level:
+                opposite.pop_best()
 
-    async def _cleanup_orders(self, bid_order: Order, ask_order: Order):
-        """Remove or update filled orders"""
-        for order, book in [(bid_order, self.bids), (ask_order, self.asks)]:
-            if order.filled >= order.amount:
-                price_level = book[order.price]
-                price_level.remove(order)
-                if not price_level:
-                    book.pop(order.price)
-                order.status = 'filled'
-
-    async def execute_trade(self, bid_order: Order, ask_order: Order, amount: float, price: float):
-        """Execute trade between two orders"""
-        bid_order.filled += amount
-        ask_order.filled += amount
+    def _add_to_book(self, order: Order):
+        """Add order to the appropriate price level"""
+        book = self._side(order)
         
-        # In a real implementation, these would be database operations
-        await self._update_balances(bid_order.user_id, ask_order.user_id, amount, price)
-        await self._broadcast_trade(amount, price)
-
-    async def _update_balances(self, buyer_id: int, seller_id: int, amount: float, price: float):
-        """Update user balances after trade"""
-        # Implement actual balance updates here
-        pass
-
-    async def _broadcast_trade(self, amount: float, price: float):
-        """Notify systems about the trade"""
-        # Implement market data feed here
-        pass
-
-    async def cancel_order(self, order_id: str) -> bool:
-        """Cancel an existing order"""
-        if order_id not in self.orders:
-            return False
-            
-        order = self.orders[order_id]
-        book = self.bids if order.side == 'buy' else self.asks
+        level = book.get(order.price)
+        if level is None:
+            level = book.add_level(order.price)
+        level.append(order)
+        self.orders[order.id] = order
+        if self.changed_levels is not None:
+            self.changed_levels.add((order.side, order.price))
+
+    def _remove_from_book(self, order: Order):
+        """Unlink resting order and drop its level when it becomes empty"""
+        price_level = order.level
+        if price_level is None:
+            return
+        price_level.remove(order)
+        if not price_level:
+            self._side(order).remove_level(price_level.price)
+        if self.changed_levels is not None:
+            self.changed_levels.add((order.side, price_level.price))
+
+    def execute_trade(
+        self,
+        bid_order: Order,
+        ask_order: Order,
+        amount: int,
+        price: int,
+        taker_side: Side = Side.BUY
+    ):
+        """Execute trade between two orders (amount in lots, price in ticks)"""
+        for order in (bid_order, ask_order):
+            if order.level is None:  # incoming taker
+                order.filled += amount
+            else:
+                order.level.fill(order, amount)
         
-        if order.price in book:
-            book[order.price].remove(order)
-            if not book[order.price]:
-                book.pop(order.price)
+        # Side effects (balances, market data) run off the matching path
+        # on the fills handed out by drain_trades()
+        self.trades.append(Trade(
+            market=self.market.symbol,
+            price=price,
+            amount=amount,
+            buy_order_id=bid_order.id,
+            sell_order_id=ask_order.id,
+            buyer_id=bid_order.user_id,
+            seller_id=ask_order.user_id,
+            taker_side=taker_side
+        ))
+
+    def drain_trades(self) -> list[Trade]:
+        """Hand over fills produced since the previous call"""
+        trades, self.trades = self.trades, []
+        return trades
+
+    def cancel_order(self, order_id: int, user_id: Optional[int] = None) -> bool:
+        """Cancel an existing order, optionally only if it belongs to ``user_id``"""
+        order = self.orders.get(order_id)
+        if order is None or order.status is not OrderStatus.OPEN:
+            return False
+        if user_id is not None and order.user_id != user_id:
+            return False
         
-        order.status = 'canceled'
+        self._remove_from_book(order)
+        order.status = OrderStatus.CANCELED
+        self.finished.append(order)
         return True
 
-    def get_order(self, order_id: str) -> Optional[Order]:
+    def amend_order(
+        self,
+        order_id: int,
+        price: Optional[Number] = None,
+        amount: Optional[Number] = None,
+        user_id: Optional[int] = None
+    ) -> Order:
+        """
+        Change price and/or total amount of an open order.
+        Reducing the amount keeps time priority, any other change
+        re-queues the order at the back of its (new) level.
+        """
+        order = self.orders.get(order_id)
+        if order is None or order.status is not OrderStatus.OPEN:
+            raise ValueError("Order is not open")
+        if user_id is not None and order.user_id != user_id:
+            raise ValueError("Order is not open")
+        
+        new_price = order.price if price is None else self.market.price_to_ticks(price)
+        new_amount = order.amount if amount is None else self.market.qty_to_lots(amount)
+        if new_amount <= order.filled or (order.type is OrderType.LIMIT and new_price <= 0):
+            raise ValueError("Invalid order parameters")
+        if not self._side(order).accepts(new_price):
+            raise ValueError("Invalid order parameters")
+        if self.checks:
+            self._run_checks(order, new_price, new_amount)
+        
+        self._amend(order, new_price, new_amount)
+        return order
+
+    def _amend(self, order: Order, new_price: int, new_amount: int):
+        if new_price == order.price and new_amount <= order.amount:
+            order.level.total_remaining -= order.amount - new_amount
+            order.amount = new_amount
+            if self.changed_levels is not None:
+                self.changed_levels.add((order.side, order.price))
+        else:
+            self._remove_from_book(order)
+            order.price = new_price
+            order.amount = new_amount
+            self._sweep(order)
+            if order.filled == order.amount:
+                order.status = OrderStatus.FILLED
+                self.finished.append(order)
+            else:
+                self._add_to_book(order)
+
+    def replay_new(
+        self,
+        order_id: int,
+        user_id: int,
+        side: Side,
+        order_type: OrderType,
+        time_in_force: TimeInForce,
+        price: int,
+        amount: int
+    ) -> Order:
+        """Re-execute a journaled (already validated) order, values in ticks/lots"""
+        order = Order(
+            id=order_id,
+            user_id=user_id,
+            side=side,
+            type=order_type,
+            price=price,
+            amount=amount,
+            time_in_force=time_in_force
+        )
+        self.last_order_id = max(self.last_order_id, order_id)
+        self._process(order)
+        self.user_orders[user_id].add(order_id)
+        return order
+
+    def replay_amend(self, order_id: int, price: int, amount: int) -> Optional[Order]:
+        order = self.orders.get(order_id)
+        if order is None or order.status is not OrderStatus.OPEN:
+            return None
+        self._amend(order, price, amount)
+        return order
+
+    def restore_order(self, order: Order) -> None:
+        """Put a snapshotted resting order back at the tail of its level"""
+        self._add_to_book(order)
+        self.user_orders[order.user_id].add(order.id)
+        self.last_order_id = max(self.last_order_id, order.id)
+
+    def get_order(self, order_id: int) -> Optional[Order]:
         """Retrieve order by ID"""
         return self.orders.get(order_id)
 
     def get_user_orders(self, user_id: int) -> list[Order]:
-        """Get all orders for a user"""
-        return [self.orders[oid] for oid in self.user_orders.get(user_id, [])]
+        """Open orders of a user, oldest first (history lives in the orders table)"""
+        return [self.orders[oid] for oid in sorted(self.user_orders.get(user_id, ())) if self.orders[oid].status is OrderStatus.OPEN]
+
+    def prune_finished(self) -> int:
+        """
+        Forget filled/canceled orders, so memory follows open orders only.
+        Called by the sequencer once hooks and listeners have seen them.
+        """
+        finished, self.finished = self.finished, []
+        orders = self.orders
+        user_orders = self.user_orders
+        for order in finished:
+            orders.pop(order.id, None)
+            owned = user_orders.get(order.user_id)
+            if owned is not None:
+                owned.discard(order.id)
+                if not owned:
+                    del user_orders[order.user_id]
+        return len(finished)
     
-    async def get_market_depth(self, depth: int = 10) -> dict:
-        """Get order book depth"""
+    def serialize_order(self, order: Order) -> dict:
+        """Convert order ticks/lots back to Decimal values (API and OrderModel boundary)"""
         return {
-            "bids": [{"price": p, "amount": sum(o.amount for o in orders)} 
-                    for p, orders in list(self.bids.items())[:depth]],
-            "asks": [{"price": p, "amount": sum(o.amount for o in orders)} 
-                    for p, orders in list(self.asks.items())[:depth]]
+            "id": str(order.id),
+            "user_id": order.user_id,
+            "market": self.market.symbol,
+            "side": order.side.label,
+            "type": order.type.label,
+            "time_in_force": order.time_in_force.label,
+            "price": self.market.ticks_to_price(order.price),
+            "amount": self.market.lots_to_qty(order.amount),
+            "filled": self.market.lots_to_qty(order.filled),
+            "status": order.status.label
         }
     
-    async def validate_order_balance(self, user_id: int, order: Order) -> bool:
-        """Check user has sufficient balance"""
-        # Implement actual balance check from database
-        return True
+    def serialize_trade(self, trade: Trade) -> dict:
+        """Convert fill ticks/lots back to Decimal values"""
+        return {
+            "market": trade.market,
+            "price": self.market.ticks_to_price(trade.price),
+            "amount": self.market.lots_to_qty(trade.amount),
+            "buy_order_id": str(trade.buy_order_id),
+            "sell_order_id": str(trade.sell_order_id),
+            "taker_side": trade.taker_side.label,
+            "timestamp": trade.timestamp
+        }
     
-    async def persist_order(self, session: AsyncSession, order: Order) -> None:
-        """Save order to database"""
-        # Implement database persistence
-        pass
\ No newline at end of file
+    def track_levels(self) -> None:
+        """Start recording level changes for drain_changed_levels()"""
+        if self.changed_levels is None:
+            self.changed_levels = set()
+
+    def drain_changed_levels(self) -> list[tuple[Side, int, int, int]]:
+        """(side, price ticks, remaining lots, order count) of every level changed since the last call, 0 lots: gone"""
+        if not self.changed_levels:
+            return []
+        changed, self.changed_levels = self.changed_levels, set()
+        levels = []
+        for side, price in changed:
+            level = (self.bids if side is Side.BUY else self.asks).get(price)
+            if level is None:
+                levels.append((side, price, 0, 0))
+            else:
+                levels.append((side, price, level.total_remaining, level.order_count))
+        return levels
+
+    def get_market_depth(self, depth: Optional[int] = 10) -> dict:
+        """Get order book depth (remaining size per level), O(depth), None for every level"""
+        to_price = self.market.ticks_to_price
+        to_qty = self.market.lots_to_qty
+        return {
+            "bids": [
+                {"price": to_price(level.price), "amount": to_qty(level.total_remaining), "orders": level.order_count}
+                for level in self.bids.top(depth)
+                ],
+            "asks": [
+                {"price": to_price(level.price), "amount": to_qty(level.total_remaining), "orders": level.order_count}
+                for level in self.asks.top(depth)
+                ]
+        }
+
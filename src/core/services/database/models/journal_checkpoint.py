@@ -0,0 +1,19 @@
+from sqlalchemy.orm import mapped_column, Mapped
+from sqlalchemy import String, BigInteger, DateTime
+from datetime import datetime
+
+from src.core.services.database.models.base import Base
+
+
+class JournalCheckpointModel(Base):
+    """
+    Journal position (see exchange/journal.py) up to which a market's
+    orders, trades, wallet changes and positions are stored. Written in
+    the same transaction as those rows, recovery replays only what follows.
+    """
+    __tablename__ = "journal_checkpoints"
+
+    market:Mapped[str] = mapped_column(String(32), primary_key=True)
+    generation:Mapped[int] = mapped_column(BigInteger)
+    offset:Mapped[int] = mapped_column(BigInteger)
+    updated_at:Mapped[datetime] = mapped_column(DateTime)
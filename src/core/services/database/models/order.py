@@ -1,19 +1,34 @@
-from sqlalchemy import String, Numeric, DateTime, Enum, ForeignKey, Integer
+from sqlalchemy import String, Numeric, DateTime, Enum, ForeignKey, Integer, BigInteger, Index
 from sqlalchemy.orm import mapped_column, Mapped
+from decimal import Decimal
 
 from src.core.services.database.models.base import Base, int_pk
 
+# Columns the order list endpoints return, carried in the indexes so
+# pages are served by index-only scans
+ORDER_LIST_COLUMNS = ["market", "side", "type", "time_in_force", "price", "amount", "filled"]
+
 class OrderModel(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Open orders / history of a user, newest first, keyset on (created_at, id)
+        Index(
+            "ix_orders_user_status_created",
+            "user_id", "status", "created_at", "id",
+            postgresql_include=ORDER_LIST_COLUMNS
+            ),
+        Index("ix_orders_market_status", "market", "status", postgresql_include=["id", "user_id"]),
+    )
     
-    id: Mapped[int_pk] = mapped_column(Integer, primary_key=True)
+    id: Mapped[int_pk] = mapped_column(BigInteger, primary_key=True, autoincrement=False)  # engine-issued id
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
-    market: Mapped[str] = mapped_column(String)
+    market: Mapped[str] = mapped_column(String(32))
     side: Mapped[str] = mapped_column(Enum("buy", "sell", name="order_side"))
     type: Mapped[str] = mapped_column(Enum("limit", "market", name="order_type"))
-    price: Mapped[float] = mapped_column(Numeric(36, 18))
-    amount: Mapped[float] = mapped_column(Numeric(36, 18))
-    filled: Mapped[float] = mapped_column(Numeric(36, 18), default=0)
+    time_in_force: Mapped[str] = mapped_column(Enum("GTC", "IOC", "FOK", name="time_in_force"))
+    price: Mapped[Decimal] = mapped_column(Numeric(36, 18))
+    amount: Mapped[Decimal] = mapped_column(Numeric(36, 18))
+    filled: Mapped[Decimal] = mapped_column(Numeric(36, 18), default=0)
     status: Mapped[str] = mapped_column(Enum("open", "filled", "canceled", name="order_status"))
     created_at: Mapped[DateTime] = mapped_column(DateTime)
-    updated_at: Mapped[DateTime] = mapped_column(DateTime)
\ No newline at end of file
+    updated_at: Mapped[DateTime] = mapped_column(DateTime)
@@ -0,0 +1,25 @@
+from sqlalchemy.orm import mapped_column, Mapped
+from sqlalchemy import String, Numeric, Integer, DateTime, ForeignKey
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from src.core.services.database.models.base import Base
+
+
+class PositionModel(Base):
+    """
+    Checkpoint of the in-memory position of a user in a market (see
+    exchange/positions.py), ``quantity`` is signed: negative is short.
+    ``entry_cost`` is the exact entry value of the open quantity (same
+    sign), ``avg_entry_price`` its rounded per-unit form for display.
+    """
+    __tablename__ = "positions"
+
+    user_id:Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), primary_key=True)
+    market:Mapped[str] = mapped_column(String(32), primary_key=True)
+    quantity:Mapped[Decimal] = mapped_column(Numeric(36, 18), default=0)
+    avg_entry_price:Mapped[Decimal] = mapped_column(Numeric(36, 18), default=0)
+    realized_pnl:Mapped[Decimal] = mapped_column(Numeric(36, 18), default=0)
+    entry_cost:Mapped[Optional[Decimal]] = mapped_column(Numeric(36, 18), nullable=True)
+    updated_at:Mapped[datetime] = mapped_column(DateTime)
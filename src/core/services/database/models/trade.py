@@ -0,0 +1,33 @@
+from sqlalchemy import String, Numeric, DateTime, Enum, BigInteger, Integer, Index, Sequence
+from sqlalchemy.orm import mapped_column, Mapped
+from datetime import datetime
+from decimal import Decimal
+
+from src.core.services.database.models.base import Base
+
+
+trade_id_seq = Sequence("trades_id_seq")
+
+class TradeModel(Base):
+    """
+    Fill history. Range partitioned by day on ``timestamp`` (see the
+    migration and tasks/trade_partitions.py), so the primary key has to
+    include the partition key.
+    """
+    __tablename__ = "trades"
+    __table_args__ = (
+        Index("ix_trades_market_timestamp", "market", "timestamp", "id"),
+        Index("ix_trades_timestamp_brin", "timestamp", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, trade_id_seq, server_default=trade_id_seq.next_value(), primary_key=True)
+    timestamp: Mapped[datetime] = mapped_column(DateTime, primary_key=True)  # naive UTC
+    market: Mapped[str] = mapped_column(String(32))
+    price: Mapped[Decimal] = mapped_column(Numeric(36, 18))
+    amount: Mapped[Decimal] = mapped_column(Numeric(36, 18))
+    buy_order_id: Mapped[int] = mapped_column(BigInteger)
+    sell_order_id: Mapped[int] = mapped_column(BigInteger)
+    buyer_id: Mapped[int] = mapped_column(Integer)
+    seller_id: Mapped[int] = mapped_column(Integer)
+    taker_side: Mapped[str] = mapped_column(Enum("buy", "sell", name="order_side"))
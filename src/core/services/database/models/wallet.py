@@ -1,13 +1,18 @@
 from sqlalchemy.orm import mapped_column, Mapped
-from sqlalchemy import String, Numeric
+from sqlalchemy import String, Numeric, Integer, ForeignKey, CheckConstraint
+from decimal import Decimal
 
-from src.core.services.database.models.base import Base, int_pk
+from src.core.services.database.models.base import Base
 
 
 class WalletModel(Base):
+    """One row per (user, currency), ``locked`` is the part reserved by open orders"""
     __tablename__ = "wallets"
-    
-    user_id:Mapped[int_pk]
-    currency:Mapped[str] = mapped_column(String, index=True)
-    balance:Mapped[float] = mapped_column(Numeric(36, 18), default=0)
-    locked:Mapped[float] = mapped_column(Numeric(36, 18), default=0)
\ No newline at end of file
+    __table_args__ = (
+        CheckConstraint("locked >= 0 AND balance >= locked", name="ck_wallets_balance_covers_locked"),
+    )
+
+    user_id:Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), primary_key=True)
+    currency:Mapped[str] = mapped_column(String(16), primary_key=True)
+    balance:Mapped[Decimal] = mapped_column(Numeric(36, 18), default=0)
+    locked:Mapped[Decimal] = mapped_column(Numeric(36, 18), default=0)
@@ -0,0 +1,74 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import select, update, values, column, Integer, String, Numeric
+import logging
+
+from src.core.services.database.models.wallet import WalletModel
+
+
+logger = logging.getLogger(__name__)
+
+async def select_balances(session: AsyncSession, user_ids: list[int]) -> list[WalletModel]:
+    """All wallets of the given users"""
+    result = await session.execute(select(WalletModel).where(WalletModel.user_id.in_(user_ids)))
+    return list(result.scalars())
+
+async def apply_balance_changes(session: AsyncSession, rows: list[dict]) -> set[tuple[int, str]]:
+    """
+    Apply net (balance, locked) deltas per wallet: the database adds them
+    to the current values itself (no read-modify-write) and skips any row
+    whose result would not keep 0 <= locked <= balance.
+    Returns the (user_id, currency) keys that were applied.
+    """
+    # A delta that is no valid wallet on its own may only change an existing
+    # row, the insert branch of the upsert would break the check constraint
+    creatable, changing = [], []
+    for row in rows:
+        (creatable if row["locked"] >= 0 and row["balance"] >= row["locked"] else changing).append(row)
+    applied = set()
+    if creatable:
+        applied |= await _upsert_balances(session, creatable)
+    if changing:
+        applied |= await _update_balances(session, changing)
+    return applied
+
+async def _upsert_balances(session: AsyncSession, rows: list[dict]) -> set[tuple[int, str]]:
+    """Deltas valid as new wallets, in one conditional upsert"""
+    stmt = insert(WalletModel)
+    wallet = WalletModel.__table__.c
+    new_balance = wallet.balance + stmt.excluded.balance
+    new_locked = wallet.locked + stmt.excluded.locked
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[WalletModel.user_id, WalletModel.currency],
+        set_={"balance": new_balance, "locked": new_locked},
+        where=(new_locked >= 0) & (new_balance >= new_locked)
+    ).returning(WalletModel.user_id, WalletModel.currency)
+    result = await session.execute(stmt, rows)
+    return {(user_id, currency) for user_id, currency in result}
+
+def update_balances_statement(rows: list[dict]):
+    """UPDATE ... FROM (VALUES ...) of existing wallets only, guarded like the upsert"""
+    deltas = values(
+        column("user_id", Integer),
+        column("currency", String),
+        column("balance", Numeric),
+        column("locked", Numeric),
+        name="deltas"
+    ).data([(row["user_id"], row["currency"], row["balance"], row["locked"]) for row in rows])
+    new_balance = WalletModel.balance + deltas.c.balance
+    new_locked = WalletModel.locked + deltas.c.locked
+    return (
+        update(WalletModel)
+        .where(
+            WalletModel.user_id == deltas.c.user_id,
+            WalletModel.currency == deltas.c.currency,
+            new_locked >= 0,
+            new_balance >= new_locked
+        )
+        .values(balance=new_balance, locked=new_locked)
+        .returning(WalletModel.user_id, WalletModel.currency)
+    )
+
+async def _update_balances(session: AsyncSession, rows: list[dict]) -> set[tuple[int, str]]:
+    result = await session.execute(update_balances_statement(rows))
+    return {(user_id, currency) for user_id, currency in result}
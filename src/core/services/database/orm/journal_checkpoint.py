@@ -0,0 +1,31 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import select
+import logging
+
+from src.core.services.database.models.journal_checkpoint import JournalCheckpointModel
+
+
+logger = logging.getLogger(__name__)
+
+async def select_journal_checkpoints(session: AsyncSession, markets: list[str]) -> dict[str, tuple[int, int]]:
+    """Stored journal position per market, markets never flushed are missing"""
+    result = await session.execute(
+        select(JournalCheckpointModel).where(JournalCheckpointModel.market.in_(markets))
+        )
+    return {row.market: (row.generation, row.offset) for row in result.scalars()}
+
+async def upsert_journal_checkpoints(session: AsyncSession, rows: list[dict]) -> None:
+    """Store markets' latest persisted journal positions, flushes are serialized so the newest wins"""
+    if not rows:
+        return
+    stmt = insert(JournalCheckpointModel)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[JournalCheckpointModel.market],
+        set_={
+            "generation": stmt.excluded.generation,
+            "offset": stmt.excluded.offset,
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+    await session.execute(stmt, rows)
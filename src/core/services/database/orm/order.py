@@ -0,0 +1,82 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import load_only
+from sqlalchemy import select, tuple_
+from datetime import datetime
+from typing import Optional
+import logging
+
+from src.core.services.database.models.order import OrderModel, ORDER_LIST_COLUMNS
+
+
+logger = logging.getLogger(__name__)
+
+async def upsert_orders(session: AsyncSession, rows: list[dict]) -> None:
+    """
+    Bulk insert order rows, rows for orders already stored overwrite their
+    mutable state (price/amount after amends, filled, status).
+    """
+    if not rows:
+        return
+    stmt = insert(OrderModel)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[OrderModel.id],
+        set_={
+            "price": stmt.excluded.price,
+            "amount": stmt.excluded.amount,
+            "filled": stmt.excluded.filled,
+            "status": stmt.excluded.status,
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+    # executemany: SQLAlchemy batches this into multi-row VALUES for asyncpg
+    await session.execute(stmt, rows)
+
+def _orders_page(
+    user_id: int,
+    statuses: tuple[str, ...],
+    market: Optional[str],
+    after: Optional[tuple[datetime, int]],
+    limit: int
+):
+    """
+    Newest-first page of a user's orders in ``statuses``, served by
+    ix_orders_user_status_created. For a single status the index order is
+    the page order, so the scan stops after ``limit`` rows.
+    """
+    # Only indexed/included columns, so the planner can use an index-only scan
+    columns = [getattr(OrderModel, name) for name in ("user_id", "status", "created_at", *ORDER_LIST_COLUMNS)]
+    stmt = (
+        select(OrderModel)
+        .options(load_only(*columns))
+        .where(OrderModel.user_id == user_id, OrderModel.status.in_(statuses))
+        )
+    if market is not None:
+        stmt = stmt.where(OrderModel.market == market)
+    if after is not None:
+        stmt = stmt.where(tuple_(OrderModel.created_at, OrderModel.id) < tuple_(*after))
+    return stmt.order_by(OrderModel.created_at.desc(), OrderModel.id.desc()).limit(limit)
+
+async def select_open_orders(
+    session: AsyncSession,
+    user_id: int,
+    market: Optional[str] = None,
+    after: Optional[tuple[datetime, int]] = None,
+    limit: int = 100
+) -> list[OrderModel]:
+    """
+    Open orders of a user, keyset paginated: pass the (created_at, id) of
+    the last row of a page as ``after`` to get the next one.
+    """
+    return list((await session.execute(_orders_page(user_id, ("open",), market, after, limit))).scalars())
+
+async def select_order_history(
+    session: AsyncSession,
+    user_id: int,
+    market: Optional[str] = None,
+    statuses: tuple[str, ...] = ("open", "filled", "canceled"),
+    after: Optional[tuple[datetime, int]] = None,
+    limit: int = 100
+) -> list[OrderModel]:
+    """All orders of a user (or only ``statuses``), keyset paginated like ``select_open_orders``"""
+    return list((await session.execute(_orders_page(user_id, statuses, market, after, limit))).scalars())
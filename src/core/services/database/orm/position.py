@@ -1 +1,31 @@
-class PositionORM():pass
\ No newline at end of file
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import select
+import logging
+
+from src.core.services.database.models.position import PositionModel
+
+
+logger = logging.getLogger(__name__)
+
+async def select_positions(session: AsyncSession, markets: list[str]) -> list[PositionModel]:
+    """Checkpointed positions of the given markets"""
+    result = await session.execute(select(PositionModel).where(PositionModel.market.in_(markets)))
+    return list(result.scalars())
+
+async def upsert_positions(session: AsyncSession, rows: list[dict]) -> None:
+    """Bulk write absolute position states, newer checkpoints overwrite older ones"""
+    if not rows:
+        return
+    stmt = insert(PositionModel)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PositionModel.user_id, PositionModel.market],
+        set_={
+            "quantity": stmt.excluded.quantity,
+            "avg_entry_price": stmt.excluded.avg_entry_price,
+            "realized_pnl": stmt.excluded.realized_pnl,
+            "entry_cost": stmt.excluded.entry_cost,
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+    await session.execute(stmt, rows)
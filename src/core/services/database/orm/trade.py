@@ -0,0 +1,165 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, text, tuple_, func, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+import logging
+
+from src.core.services.database.models.trade import TradeModel
+
+
+logger = logging.getLogger(__name__)
+
+async def append_trades(session: AsyncSession, rows: list[dict]) -> None:
+    """Bulk insert fills, ids come from the table sequence"""
+    if not rows:
+        return
+    await session.execute(insert(TradeModel), rows)
+
+async def select_trades(
+    session: AsyncSession,
+    market: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    after: Optional[tuple[datetime, int]] = None,
+    limit: int = 100
+) -> list[TradeModel]:
+    """
+    Newest-first trades of one market in [start, end), keyset paginated:
+    pass the (timestamp, id) of the last row of a page as ``after`` to get
+    the next one. Bounds on timestamp let the planner prune partitions,
+    the (market, timestamp, id) index serves the ordering without a sort.
+    """
+    stmt = select(TradeModel).where(TradeModel.market == market)
+    if start is not None:
+        stmt = stmt.where(TradeModel.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(TradeModel.timestamp < end)
+    if after is not None:
+        stmt = stmt.where(tuple_(TradeModel.timestamp, TradeModel.id) < tuple_(*after))
+    stmt = stmt.order_by(TradeModel.timestamp.desc(), TradeModel.id.desc()).limit(limit)
+    return list((await session.execute(stmt)).scalars())
+
+async def select_candles(
+    session: AsyncSession,
+    market: str,
+    seconds: int,
+    start: datetime,
+    end: datetime,
+    limit: int = 500
+) -> list:
+    """
+    OHLCV of one market's fills in [start, end), bucketed by ``seconds``
+    since the epoch: the newest ``limit`` buckets, oldest first, as rows
+    of (start unix seconds, open, high, low, close, volume, trades).
+    """
+    # Inlined, GROUP BY only matches the select expression without bind params
+    width = literal_column(str(int(seconds)))
+    bucket = (func.floor(func.extract('epoch', TradeModel.timestamp) / width) * width).label("start")
+    stmt = (
+        select(
+            bucket,
+            array_agg(aggregate_order_by(TradeModel.price, TradeModel.timestamp, TradeModel.id))[1].label("open"),
+            func.max(TradeModel.price).label("high"),
+            func.min(TradeModel.price).label("low"),
+            array_agg(aggregate_order_by(TradeModel.price, TradeModel.timestamp.desc(), TradeModel.id.desc()))[1].label("close"),
+            func.sum(TradeModel.amount).label("volume"),
+            func.count().label("trades"),
+        )
+        .where(TradeModel.market == market, TradeModel.timestamp >= start, TradeModel.timestamp < end)
+        .group_by(bucket)
+        .order_by(bucket.desc())
+        .limit(limit)
+    )
+    rows = list(await session.execute(stmt))
+    rows.reverse()
+    return rows
+
+def partition_name(day: date) -> str:
+    return f"trades_p{day:%Y%m%d}"
+
+async def _partition_names(session: AsyncSession) -> list[str]:
+    result = await session.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'trades'"
+    ))
+    return list(result.scalars())
+
+async def create_trade_partitions(session: AsyncSession, first_day: date, days: int) -> list[str]:
+    """
+    Create missing daily partitions for [first_day, first_day + days).
+    Each day runs in its own savepoint: a day that fails is logged and
+    skipped, the later ones are still created.
+    """
+    existing = set(await _partition_names(session))
+    has_default = 'trades_default' in existing
+
+    created = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        name = partition_name(day)
+        if name in existing:
+            continue
+        try:
+            async with session.begin_nested():
+                moved = await _create_partition(session, name, day, has_default)
+        except Exception:
+            logger.exception(f"Creating trade partition {name} failed")
+            continue
+        if moved:
+            logger.warning(f"Moved {moved} trades from trades_default into {name}")
+        created.append(name)
+    return created
+
+async def _create_partition(session: AsyncSession, name: str, day: date, has_default: bool) -> int:
+    """
+    Create one daily partition, returns how many rows it took over from
+    trades_default. Postgres refuses a new partition while the default one
+    holds rows of its range (fills of a day the rollover missed), so the
+    default is detached, those rows are moved and it is attached again.
+    By hand, for a day stuck that way::
+
+        BEGIN;
+        ALTER TABLE trades DETACH PARTITION trades_default;
+        CREATE TABLE trades_p20260101 PARTITION OF trades FOR VALUES FROM ('2026-01-01') TO ('2026-01-02');
+        WITH moved AS (
+            DELETE FROM trades_default
+            WHERE timestamp >= '2026-01-01' AND timestamp < '2026-01-02' RETURNING *
+        )
+        INSERT INTO trades_p20260101 SELECT * FROM moved;
+        ALTER TABLE trades ATTACH PARTITION trades_default DEFAULT;
+        COMMIT;
+    """
+    bounds = {"lower": datetime.combine(day, time()), "upper": datetime.combine(day + timedelta(days=1), time())}
+    create = text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF trades "
+        f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+    )
+    stranded = has_default and (await session.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM trades_default WHERE timestamp >= :lower AND timestamp < :upper)"
+    ), bounds)).scalar()
+    if not stranded:
+        await session.execute(create)
+        return 0
+
+    await session.execute(text("ALTER TABLE trades DETACH PARTITION trades_default"))
+    await session.execute(create)
+    result = await session.execute(text(
+        f"WITH moved AS (DELETE FROM trades_default WHERE timestamp >= :lower AND timestamp < :upper RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    await session.execute(text("ALTER TABLE trades ATTACH PARTITION trades_default DEFAULT"))
+    return result.rowcount
+
+async def drop_trade_partitions_before(session: AsyncSession, day: date) -> list[str]:
+    """Drop daily partitions of days before ``day`` (retention)"""
+    dropped = []
+    cutoff = partition_name(day)
+    for name in await _partition_names(session):
+        # trades_pYYYYMMDD sorts chronologically as a string, trades_default is kept
+        if name.startswith('trades_p') and name < cutoff:
+            await session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    return dropped
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import asyncio
+import logging
+
+from src.core.config.settings import settings
+from src.core.dependencies.db_helper import db_helper
+from src.core.services.database.orm.trade import create_trade_partitions, drop_trade_partitions_before
+
+
+logger = logging.getLogger(__name__)
+
+async def roll_trade_partitions(days_ahead: int, retention_days: Optional[int] = None) -> None:
+    """Make sure today's and the next ``days_ahead`` daily partitions exist, drop expired ones"""
+    today = datetime.now(timezone.utc).date()
+    async with db_helper.async_celery_session() as session:
+        created = await create_trade_partitions(session, today, days_ahead + 1)
+        dropped = []
+        if retention_days is not None:
+            dropped = await drop_trade_partitions_before(session, today - timedelta(days=retention_days))
+    if created or dropped:
+        logger.info(f"Trade partitions created: {created}, dropped: {dropped}")
+
+async def run_trade_partition_rollover(interval: float = 3600) -> None:
+    """Background loop started from the app lifespan"""
+    while True:
+        try:
+            await roll_trade_partitions(
+                settings.engine.trade_partitions_ahead,
+                settings.engine.trade_retention_days
+                )
+        except Exception:
+            # Partitions are created days ahead, the next run can catch up
+            logger.exception("Trade partition rollover failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,71 @@
+from typing import Any, Awaitable, Callable, Optional
+import asyncio
+
+
+class MicroBatcher:
+    """
+    Coalesces single key lookups into batched upstream calls.
+
+    ``load(key)`` parks the caller on a future; the first key of a batch
+    starts a ``window`` second timer and when it fires (or the batch hits
+    ``max_batch`` keys) ``fetch_many`` is called once with the union of
+    the keys asked for meanwhile, by any number of concurrent requests.
+    Each caller gets its own key's value, None when the result lacks it;
+    a failed call fails every caller of that batch.
+    """
+    def __init__(
+        self,
+        fetch_many: Callable[[list[str]], Awaitable[dict[str, Any]]],
+        window: float = 0.02,
+        max_batch: int = 100
+    ):
+        self.fetch_many = fetch_many
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+        self.calls = 0  # Upstream calls made
+        self.loads = 0  # Lookups served
+
+    async def load(self, key: str) -> Any:
+        self.loads += 1
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[key] = loop.create_future()
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush)
+        # Shielded: one caller giving up does not fail the rest of the batch
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: dict[str, asyncio.Future]) -> None:
+        self.calls += 1
+        try:
+            results = await self.fetch_many(list(batch))
+        except Exception as err:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(err)
+                    future.exception()  # Mark retrieved, callers may all have left
+            return
+        except BaseException:
+            for future in batch.values():
+                future.cancel()
+            raise
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
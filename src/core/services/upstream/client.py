@@ -0,0 +1,129 @@
+from typing import Any, Optional
+import asyncio
+import logging
+import random
+import time
+
+import httpx
+
+from src.core.config.settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+class UpstreamError(Exception):
+    """Third party API call failed, ``status`` is None for transport errors and non-JSON answers"""
+    def __init__(self, url: str, status: Optional[int] = None, body: Any = None):
+        self.url = url
+        self.status = status
+        self.body = body
+        super().__init__(f"Upstream {url} failed" + (f" with {status}" if status is not None else ""))
+
+
+class UpstreamClient:
+    """
+    Shared async HTTP client for third party APIs.
+
+    One pooled httpx.AsyncClient per process, opened and closed by the app
+    lifespan, keeps connections alive between calls, so handlers never
+    block the event loop and never pay a new TLS handshake per request.
+    Transport errors, 429 and 5xx are retried ``retries`` times with full
+    jitter exponential backoff. ``get_json(..., cache_ttl=...)`` keeps a
+    successful response that long, keyed by url and params; concurrent
+    misses of one key share a single request.
+    """
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        connect_timeout: float = 2.0,
+        timeout: float = 5.0,
+        retries: int = 3,
+        backoff: float = 0.1
+    ):
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cache: dict[tuple, tuple[float, Any]] = {}  # key -> (expires, body)
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self.requests = 0
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+
+    async def stop(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._cache.clear()
+
+    async def get_json(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+        cache_ttl: Optional[float] = None
+    ) -> Any:
+        if not cache_ttl:
+            return await self._get(url, params, headers)
+        key = (url, tuple(sorted((params or {}).items())))
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.get_running_loop().create_task(self._fill(key, url, params, headers, cache_ttl))
+        return await asyncio.shield(task)
+
+    async def _fill(self, key: tuple, url: str, params: Optional[dict], headers: Optional[dict], cache_ttl: float) -> Any:
+        try:
+            body = await self._get(url, params, headers)
+            self._cache[key] = (time.monotonic() + cache_ttl, body)
+            return body
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _get(self, url: str, params: Optional[dict], headers: Optional[dict]) -> Any:
+        if self._client is None:
+            await self.start()
+        error: UpstreamError
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+            self.requests += 1
+            try:
+                response = await self._client.get(url, params=params, headers=headers)
+            except httpx.TransportError as err:
+                logger.warning(f"Upstream {url} attempt {attempt + 1} failed: {err!r}")
+                error = UpstreamError(url)
+                continue
+            if response.status_code == 429 or response.status_code >= 500:
+                logger.warning(f"Upstream {url} attempt {attempt + 1} returned {response.status_code}")
+                error = UpstreamError(url, response.status_code)
+                continue
+            if response.is_error:
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = response.text
+                raise UpstreamError(url, response.status_code, body)
+            try:
+                return response.json()
+            except ValueError:
+                # A success status with an error page (proxy, maintenance) is no answer either
+                logger.warning(f"Upstream {url} returned {response.status_code} without a JSON body")
+                raise UpstreamError(url, body=response.text)
+        raise error
+
+
+upstream = UpstreamClient(
+    max_connections=settings.upstream.max_connections,
+    max_keepalive=settings.upstream.max_keepalive,
+    connect_timeout=settings.upstream.connect_timeout_ms / 1000,
+    timeout=settings.upstream.timeout_ms / 1000,
+    retries=settings.upstream.retries,
+    backoff=settings.upstream.retry_backoff_ms / 1000
+)
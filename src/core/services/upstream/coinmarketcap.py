@@ -0,0 +1,93 @@
+from typing import Any, Optional
+import asyncio
+import re
+
+from pydantic import SecretStr
+
+from src.core.config.settings import settings
+from src.core.services.upstream.batcher import MicroBatcher
+from src.core.services.upstream.client import UpstreamClient, UpstreamError, upstream
+
+
+def invalid_symbols(body: Any) -> set[str]:
+    """Symbols a 400 error body names, as in 'Invalid values for "symbol": "FOO,BAR"'"""
+    status = body.get("status") if isinstance(body, dict) else None
+    message = status.get("error_message") if isinstance(status, dict) else None
+    match = re.search(r'"symbol":\s*"([^"]*)"', message or "")
+    if match is None:
+        return set()
+    return {symbol.strip().upper() for symbol in match.group(1).split(",") if symbol.strip()}
+
+
+class CoinMarketCap:
+    """
+    CoinMarketCap API over the shared upstream client. Quote lookups of
+    concurrent requests are coalesced: symbols asked for within
+    ``batch_window`` seconds go out as one comma separated quotes call.
+    """
+    base_url = "https://pro-api.coinmarketcap.com/v1"
+
+    def __init__(
+        self,
+        client: UpstreamClient,
+        api_key: SecretStr,
+        cache_ttl: float = 60.0,
+        batch_window: float = 0.02,
+        batch_max: int = 100
+    ):
+        self.client = client
+        self.api_key = api_key
+        self.cache_ttl = cache_ttl
+        self.quotes = MicroBatcher(self.get_quotes, batch_window, batch_max)
+
+    @property
+    def headers(self) -> dict:
+        return {"Accepts": "application/json", "X-CMC_PRO_API_KEY": self.api_key.get_secret_value()}
+
+    async def get_quote(self, symbol: str) -> Optional[dict]:
+        """USD quote of one symbol, None if CoinMarketCap does not know it"""
+        return await self.quotes.load(symbol)
+
+    async def get_quotes(self, symbols: list[str]) -> dict[str, dict]:
+        """USD quotes of many symbols in one call, unknown symbols are left out"""
+        try:
+            response = await self.client.get_json(
+                f"{self.base_url}/cryptocurrency/quotes/latest",
+                params={"symbol": ",".join(sorted(symbols)), "convert": "USD", "skip_invalid": "true"},
+                headers=self.headers
+                )
+        except UpstreamError as err:
+            if err.status != 400:
+                raise
+            if len(symbols) == 1:  # Invalid symbol
+                return {}
+            # Rejected as a whole: retry without the symbols the error names, else in halves
+            invalid = invalid_symbols(err.body).intersection(symbols)
+            if invalid:
+                valid = [symbol for symbol in symbols if symbol not in invalid]
+                return await self.get_quotes(valid) if valid else {}
+            middle = len(symbols) // 2
+            quotes = {}
+            for result in await asyncio.gather(self.get_quotes(symbols[:middle]), self.get_quotes(symbols[middle:])):
+                quotes.update(result)
+            return quotes
+        data = response.get("data") or {}
+        return {symbol: data[symbol] for symbol in symbols if symbol in data}
+
+    async def get_map(self) -> list[dict]:
+        """All listed tokens, cached for ``cache_ttl`` seconds"""
+        response = await self.client.get_json(
+            f"{self.base_url}/cryptocurrency/map",
+            headers=self.headers,
+            cache_ttl=self.cache_ttl
+            )
+        return response["data"]
+
+
+coinmarketcap = CoinMarketCap(
+    upstream,
+    settings.Con.api,
+    cache_ttl=settings.upstream.cache_ttl_ms / 1000,
+    batch_window=settings.upstream.quote_batch_ms / 1000,
+    batch_max=settings.upstream.quote_batch_max
+)
@@ -10,6 +10,11 @@ from src.core.services.database.models.base import Base
 from src.core.services.database.models.user import UserModel
 from src.core.services.database.models.refresh_token import RefreshTokenModel 
 from src.core.services.database.models.token import TokenModel 
+from src.core.services.database.models.trade import TradeModel
+from src.core.services.database.models.wallet import WalletModel
+from src.core.services.database.models.position import PositionModel
+from src.core.services.database.models.order import OrderModel
+from src.core.services.database.models.journal_checkpoint import JournalCheckpointModel
 # alembic revision --autogenerate -m "init"
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,53 @@
+"""orders written behind by the engine
+
+Revision ID: a3f6d2b8c150
+Revises: f2313894acfb
+Create Date: 2026-10-18 17:54:02.318476
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f6d2b8c150'
+down_revision: Union[str, None] = 'f2313894acfb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    order_side = postgresql.ENUM('buy', 'sell', name='order_side', create_type=False)
+    order_type = postgresql.ENUM('limit', 'market', name='order_type', create_type=False)
+    order_status = postgresql.ENUM('open', 'filled', 'canceled', name='order_status', create_type=False)
+    for enum in (order_side, order_type, order_status):
+        enum.create(bind, checkfirst=True)
+
+    op.create_table('orders',
+    sa.Column('id', sa.BigInteger(), autoincrement=False, nullable=False),  # engine-issued, market_id << 48 | seq
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('market', sa.String(), nullable=False),
+    sa.Column('side', order_side, nullable=False),
+    sa.Column('type', order_type, nullable=False),
+    sa.Column('price', sa.Numeric(precision=36, scale=18), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=36, scale=18), nullable=False),
+    sa.Column('filled', sa.Numeric(precision=36, scale=18), nullable=False),
+    sa.Column('status', order_status, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('orders')
+    op.execute('DROP TYPE IF EXISTS order_status')
+    op.execute('DROP TYPE IF EXISTS order_type')
+    op.execute('DROP TYPE IF EXISTS order_side')
@@ -0,0 +1,29 @@
+"""exact entry cost of positions
+
+Revision ID: b2d8e6f1a094
+Revises: f9a7c2d4e813
+Create Date: 2026-10-19 10:02:17.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d8e6f1a094'
+down_revision: Union[str, None] = 'f9a7c2d4e813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL for rows checkpointed before, loaded from avg_entry_price once
+    op.add_column('positions', sa.Column('entry_cost', sa.Numeric(precision=36, scale=18), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('positions', 'entry_cost')
@@ -0,0 +1,66 @@
+"""trades, partitioned by day
+
+Revision ID: b7e41c0d9a12
+Revises: a3f6d2b8c150
+Create Date: 2026-10-18 17:56:10.412093
+
+"""
+from typing import Sequence, Union
+from datetime import datetime, timedelta, timezone
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e41c0d9a12'
+down_revision: Union[str, None] = 'a3f6d2b8c150'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS_AHEAD = 7
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Created (and dropped on downgrade) by a3f6d2b8c150 with the orders table
+    order_side = postgresql.ENUM('buy', 'sell', name='order_side', create_type=False)
+    op.execute(sa.schema.CreateSequence(sa.Sequence('trades_id_seq')))
+
+    op.create_table('trades',
+    sa.Column('id', sa.BigInteger(), server_default=sa.text("nextval('trades_id_seq')"), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('market', sa.String(length=32), nullable=False),
+    sa.Column('price', sa.Numeric(precision=36, scale=18), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=36, scale=18), nullable=False),
+    sa.Column('buy_order_id', sa.BigInteger(), nullable=False),
+    sa.Column('sell_order_id', sa.BigInteger(), nullable=False),
+    sa.Column('buyer_id', sa.Integer(), nullable=False),
+    sa.Column('seller_id', sa.Integer(), nullable=False),
+    sa.Column('taker_side', order_side, nullable=False),
+    sa.PrimaryKeyConstraint('id', 'timestamp'),
+    postgresql_partition_by='RANGE (timestamp)'
+    )
+    # Created on the parent, Postgres propagates both to every partition
+    op.create_index('ix_trades_market_timestamp', 'trades', ['market', 'timestamp', 'id'], unique=False)
+    op.create_index('ix_trades_timestamp_brin', 'trades', ['timestamp'], unique=False, postgresql_using='brin')
+
+    # Initial window, afterwards tasks/trade_partitions.py keeps rolling it forward
+    today = datetime.now(timezone.utc).date()
+    for offset in range(PARTITIONS_AHEAD + 1):
+        day = today + timedelta(days=offset)
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS trades_p{day:%Y%m%d} PARTITION OF trades "
+            f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+        )
+    # Catches rows outside the window instead of failing the flush, the rollover
+    # moves them into their day's partition when it creates it
+    op.execute("CREATE TABLE IF NOT EXISTS trades_default PARTITION OF trades DEFAULT")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('trades')  # drops all partitions with it
+    op.execute(sa.schema.DropSequence(sa.Sequence('trades_id_seq')))
+    # order_side stays, orders.side still uses it until a3f6d2b8c150 is downgraded
@@ -0,0 +1,36 @@
+"""wallets keyed by user and currency
+
+Revision ID: c3a8f5e21d47
+Revises: b7e41c0d9a12
+Create Date: 2026-10-18 18:02:41.208315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a8f5e21d47'
+down_revision: Union[str, None] = 'b7e41c0d9a12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('wallets',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('currency', sa.String(length=16), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=36, scale=18), nullable=False),
+    sa.Column('locked', sa.Numeric(precision=36, scale=18), nullable=False),
+    sa.CheckConstraint('locked >= 0 AND balance >= locked', name='ck_wallets_balance_covers_locked'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'currency')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('wallets')
@@ -0,0 +1,37 @@
+"""positions checkpoint table
+
+Revision ID: d5b2e7a4c913
+Revises: c3a8f5e21d47
+Create Date: 2026-10-18 19:14:05.532871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b2e7a4c913'
+down_revision: Union[str, None] = 'c3a8f5e21d47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('positions',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('market', sa.String(length=32), nullable=False),
+    sa.Column('quantity', sa.Numeric(precision=36, scale=18), nullable=False),
+    sa.Column('avg_entry_price', sa.Numeric(precision=36, scale=18), nullable=False),
+    sa.Column('realized_pnl', sa.Numeric(precision=36, scale=18), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'market')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('positions')
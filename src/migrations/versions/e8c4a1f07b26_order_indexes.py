@@ -0,0 +1,50 @@
+"""order time in force, covering indexes for open orders and history
+
+Revision ID: e8c4a1f07b26
+Revises: d5b2e7a4c913
+Create Date: 2026-10-18 19:41:27.104655
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c4a1f07b26'
+down_revision: Union[str, None] = 'd5b2e7a4c913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ORDER_LIST_COLUMNS = ['market', 'side', 'type', 'time_in_force', 'price', 'amount', 'filled']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    time_in_force = postgresql.ENUM('GTC', 'IOC', 'FOK', name='time_in_force', create_type=False)
+    time_in_force.create(op.get_bind(), checkfirst=True)
+
+    # Rows written before this revision were all GTC
+    op.add_column('orders', sa.Column('time_in_force', time_in_force, server_default='GTC', nullable=False))
+    op.alter_column('orders', 'time_in_force', server_default=None)
+    op.alter_column('orders', 'market', type_=sa.String(length=32), existing_type=sa.String(), existing_nullable=False)
+
+    op.create_index(
+        'ix_orders_user_status_created', 'orders', ['user_id', 'status', 'created_at', 'id'],
+        unique=False, postgresql_include=ORDER_LIST_COLUMNS
+        )
+    op.create_index(
+        'ix_orders_market_status', 'orders', ['market', 'status'],
+        unique=False, postgresql_include=['id', 'user_id']
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_orders_market_status', table_name='orders')
+    op.drop_index('ix_orders_user_status_created', table_name='orders')
+    op.alter_column('orders', 'market', type_=sa.String(), existing_type=sa.String(length=32), existing_nullable=False)
+    op.drop_column('orders', 'time_in_force')
+    op.execute('DROP TYPE IF EXISTS time_in_force')
@@ -0,0 +1,34 @@
+"""journal checkpoints of the write-behind
+
+Revision ID: f9a7c2d4e813
+Revises: e8c4a1f07b26
+Create Date: 2026-10-18 21:12:40.537918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f9a7c2d4e813'
+down_revision: Union[str, None] = 'e8c4a1f07b26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('journal_checkpoints',
+    sa.Column('market', sa.String(length=32), nullable=False),
+    sa.Column('generation', sa.BigInteger(), nullable=False),
+    sa.Column('offset', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('market')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('journal_checkpoints')
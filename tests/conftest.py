@@ -0,0 +1,20 @@
+import os
+
+
+# Settings are read when src is first imported, required ones get test values
+TEST_ENVIRONMENT = {
+    "FAST__RUN__HOST": "127.0.0.1",
+    "FAST__MODE__MODE": "DEV",
+    "FAST__CORS__CORS_ORIGINS": "*",
+    "FAST__DB__NAME": "test",
+    "FAST__DB__USER": "test",
+    "FAST__DB__PASSWORD": "test",
+    "FAST__JWT__KEY": "test-key-test-key-test-key-test-key",
+    "FAST__BIN__BINANCE_API_KEY": "test",
+    "FAST__BIN__BINANCE_API_SECRET": "test",
+    "FAST__CON__API": "test",
+    "FAST__REDIS__HOST": "localhost",
+}
+
+for name, value in TEST_ENVIRONMENT.items():
+    os.environ.setdefault(name, value)
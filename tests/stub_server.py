@@ -0,0 +1,108 @@
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+import asyncio
+import json
+import threading
+
+
+class StubServer:
+    """
+    Minimal keep-alive HTTP/1.1 server on its own event loop in a thread,
+    so it answers whatever the loop under test does. Every request gets a
+    small JSON body after ``delay`` seconds, the first ``failures`` ones a
+    503. A ``symbol=A,B`` query is answered like CoinMarketCap quotes,
+    symbols in ``invalid`` make the whole call a 400, whose message names
+    them unless ``name_invalid`` is off. ``/maintenance`` answers 200
+    with an HTML page.
+    """
+    def __init__(self, delay: float = 0.0, failures: int = 0, invalid: frozenset = frozenset(), name_invalid: bool = True):
+        self.delay = delay
+        self.failures = failures
+        self.invalid = invalid
+        self.name_invalid = name_invalid
+        self.requests = 0
+        self.connections = 0
+        self.paths: list[str] = []
+        self.port: Optional[int] = None
+        self._loop = asyncio.new_event_loop()
+        self._server: Optional[asyncio.Server] = None
+        self._handlers: set[asyncio.Task] = set()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    async def _shutdown(self) -> None:
+        self._server.close()
+        for task in self._handlers:
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    def _serve(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, '127.0.0.1', 0, backlog=4096))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                path = head.split(b" ", 2)[1].decode()
+                self.requests += 1
+                self.paths.append(path)
+                await asyncio.sleep(self.delay)
+                symbols = [symbol for symbol in parse_qs(urlsplit(path).query).get("symbol", [""])[0].split(",") if symbol]
+                if urlsplit(path).path == "/maintenance":
+                    payload = b"<html><body>Down for maintenance</body></html>"
+                    writer.write(
+                        f"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n"
+                        f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+                        )
+                    await writer.drain()
+                    continue
+                if self.requests <= self.failures:
+                    status, body = "503 Service Unavailable", {"error": "busy"}
+                elif self.invalid.intersection(symbols):
+                    invalid = sorted(self.invalid.intersection(symbols))
+                    message = f'Invalid value{"s" if len(invalid) > 1 else ""} for "symbol"'
+                    if self.name_invalid:
+                        message += f': "{",".join(invalid)}"'
+                    status, body = "400 Bad Request", {"status": {"error_message": message}}
+                else:
+                    data = {symbol: {"symbol": symbol} for symbol in symbols}
+                    status, body = "200 OK", {"path": path, "request": self.requests, "data": data}
+                payload = json.dumps(body).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+                    )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
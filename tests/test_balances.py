@@ -0,0 +1,168 @@
+from decimal import Decimal
+from types import SimpleNamespace
+import asyncio
+
+import pytest
+
+from src.core.services.crypto.exchange.balances import BalanceLedger
+from src.core.services.crypto.exchange.persistence import OrderWriter
+from src.core.services.crypto.exchange.sequencer import MarketSequencer
+from src.core.services.crypto.exchange.trade import OrderBook
+
+
+class TableLedger(BalanceLedger):
+    """Ledger reading wallets from a dict instead of the database"""
+    def __init__(self, table: dict, writer=None, ttl: float = 5.0):
+        super().__init__(None, writer, ttl)
+        self.table = table
+        self.selects = 0
+
+    async def _select(self, user_ids: list[int]) -> list:
+        self.selects += 1
+        return [
+            SimpleNamespace(user_id=user_id, currency=currency, balance=Decimal(balance), locked=Decimal(locked))
+            for (user_id, currency), (balance, locked) in self.table.items()
+            if user_id in user_ids
+        ]
+
+
+def funded(writer=None, ttl: float = 5.0) -> TableLedger:
+    table = {}
+    for user_id in (1, 2):
+        table[(user_id, 'USDT')] = ('1000', '0')
+        table[(user_id, 'BTC')] = ('1', '0')
+        table[(user_id, 'ETH')] = ('10', '0')
+    return TableLedger(table, writer, ttl)
+
+
+def market(symbol: str, ledger: BalanceLedger, publish: bool = True) -> MarketSequencer:
+    book = OrderBook(symbol)
+    sequencer = MarketSequencer(book)
+    book.add_check(ledger.check, ledger.reserve)
+    sequencer.add_hook(ledger.settle)
+    if publish:
+        sequencer.add_listener(ledger.publish)
+    return sequencer
+
+
+def held(ledger: BalanceLedger, user_id: int) -> dict:
+    return {currency: (values["balance"], values["locked"]) for currency, values in ledger.get_balances(user_id).items()}
+
+
+def test_orders_lock_and_fills_settle():
+    async def scenario():
+        ledger = funded()
+        await ledger.ensure_loaded([1, 2])
+        sequencer = market('BTC-USDT', ledger)
+        await sequencer.submit('new', user_id=1, side='sell', order_type='limit', price=100, amount='0.5')
+        assert held(ledger, 1)["BTC"] == (Decimal('1'), Decimal('0.500000'))
+
+        # Buys at its own limit, gets the maker's price, the difference is freed
+        bid = await sequencer.submit('new', user_id=2, side='buy', order_type='limit', price=110, amount='0.8')
+        assert held(ledger, 2)["USDT"] == (Decimal('950'), Decimal('33.0000'))
+        assert held(ledger, 2)["BTC"] == (Decimal('1.5'), Decimal('0'))
+        assert held(ledger, 1)["BTC"] == (Decimal('0.5'), Decimal('0'))
+        assert held(ledger, 1)["USDT"] == (Decimal('1050'), Decimal('0'))
+
+        await sequencer.submit('amend', order_id=bid.value.id, amount='0.6')
+        assert held(ledger, 2)["USDT"][1] == Decimal('11.0000')
+        await sequencer.submit('cancel', order_id=bid.value.id)
+        assert held(ledger, 2)["USDT"] == (Decimal('950'), Decimal('0'))
+        assert ledger._order_locks == {}
+
+        with pytest.raises(ValueError):
+            await sequencer.submit('new', user_id=1, side='sell', order_type='limit', price=100, amount='0.6')
+        assert held(ledger, 1)["BTC"] == (Decimal('0.5'), Decimal('0'))
+        await sequencer.stop()
+
+    asyncio.run(scenario())
+
+
+def test_market_buy_locks_its_sweep_cost():
+    async def scenario():
+        ledger = funded()
+        ledger.table[(2, 'USDT')] = ('149.99', '0')
+        await ledger.ensure_loaded([1, 2])
+        sequencer = market('BTC-USDT', ledger)
+        await sequencer.submit('new', user_id=1, side='sell', order_type='limit', price=100, amount='0.5')
+        await sequencer.submit('new', user_id=1, side='sell', order_type='limit', price=200, amount='0.5')
+        # Only what the book can fill is paid for, however large the order
+        with pytest.raises(ValueError):
+            await sequencer.submit('new', user_id=2, side='buy', order_type='market', price=0, amount='20')
+
+        ledger.table[(2, 'USDT')] = ('150', '0')
+        ledger.invalidate(2)
+        await ledger.ensure_loaded([2])
+        await sequencer.submit('new', user_id=2, side='buy', order_type='market', price=0, amount='20')
+        assert held(ledger, 2)["USDT"] == (Decimal('0'), Decimal('0'))
+        assert held(ledger, 2)["BTC"] == (Decimal('2'), Decimal('0'))
+        assert ledger._order_locks == {}
+        await sequencer.stop()
+
+    asyncio.run(scenario())
+
+
+def test_durable_groups_publish_their_own_market_only():
+    async def scenario():
+        writer = OrderWriter(None)
+        ledger = funded(writer)
+        await ledger.ensure_loaded([1, 2])
+        btc = market('BTC-USDT', ledger)
+        eth = market('ETH-USDT', ledger, publish=False)  # Its group never becomes durable
+        await eth.submit('new', user_id=1, side='buy', order_type='limit', price=100, amount='1')
+        await btc.submit('new', user_id=1, side='sell', order_type='limit', price=100, amount='0.5')
+        await btc.submit('new', user_id=2, side='buy', order_type='limit', price=100, amount='0.5')
+        await btc.stop()
+        await eth.stop()
+        return writer, ledger, eth.book
+
+    writer, ledger, eth_book = asyncio.run(scenario())
+    assert writer.pending_balance_changes == {
+        (1, 'BTC'): [Decimal('-0.500000'), Decimal('0.000000')],
+        (1, 'USDT'): [Decimal('50.0000'), Decimal('0')],
+        (2, 'USDT'): [Decimal('-50.0000'), Decimal('0.0000')],
+        (2, 'BTC'): [Decimal('0.500000'), Decimal('0')],
+    }
+    assert ledger._staged == {2: {(1, 'USDT'): [Decimal('0'), Decimal('100.0000')]}}
+
+    ledger.discard(eth_book)
+    assert ledger._staged == {}
+
+
+def test_reload_adds_unsaved_changes_to_the_table():
+    async def scenario():
+        writer = OrderWriter(None)
+        ledger = funded(writer, ttl=60)
+        await ledger.ensure_loaded([1])
+        await ledger.ensure_loaded([1])
+        assert ledger.selects == 1
+
+        # Stored elsewhere meanwhile (a deposit), plus changes on their way to the table
+        ledger.table[(1, 'USDT')] = ('1500', '0')
+        writer.stage_balance_changes({(1, 'USDT'): [Decimal('-10'), Decimal('0')]})
+        ledger._staged[2] = {(1, 'USDT'): [Decimal('0'), Decimal('5')], (1, 'SOL'): [Decimal('3'), Decimal('0')]}
+
+        ledger._loaded[1] -= 60
+        await ledger.ensure_loaded([1])
+        assert ledger.selects == 2
+        assert held(ledger, 1)["USDT"] == (Decimal('1490'), Decimal('5'))
+        assert held(ledger, 1)["SOL"] == (Decimal('3'), Decimal('0'))
+
+        ledger.invalidate(1)
+        assert ledger.get_balances(1) == {}
+        await ledger.ensure_loaded([1])
+        assert ledger.selects == 3
+
+    asyncio.run(scenario())
+
+
+def test_without_a_writer_the_first_read_is_the_only_one():
+    async def scenario():
+        ledger = funded(ttl=0)
+        await ledger.ensure_loaded([1])
+        ledger.table[(1, 'USDT')] = ('0', '0')
+        await ledger.ensure_loaded([1])
+        assert ledger.selects == 1
+        assert held(ledger, 1)["USDT"] == (Decimal('1000'), Decimal('0'))
+
+    asyncio.run(scenario())
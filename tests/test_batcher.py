@@ -0,0 +1,135 @@
+import asyncio
+
+from pydantic import SecretStr
+import pytest
+
+from src.core.services.upstream.batcher import MicroBatcher
+from src.core.services.upstream.client import UpstreamClient
+from src.core.services.upstream.coinmarketcap import CoinMarketCap, invalid_symbols
+from stub_server import StubServer
+
+
+class Upstream:
+    """fetch_many recording every call"""
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.batches: list[list[str]] = []
+
+    async def __call__(self, keys: list[str]) -> dict:
+        self.batches.append(sorted(keys))
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {key: key.lower() for key in keys if key != 'UNKNOWN'}
+
+
+def test_concurrent_loads_share_one_call():
+    async def scenario():
+        upstream = Upstream()
+        batcher = MicroBatcher(upstream, window=0.01)
+        values = await asyncio.gather(*(batcher.load(key) for key in ['BTC', 'ETH', 'BTC', 'SOL', 'UNKNOWN']))
+        return upstream, batcher, values
+
+    upstream, batcher, values = asyncio.run(scenario())
+    assert values == ['btc', 'eth', 'btc', 'sol', None]
+    assert upstream.batches == [['BTC', 'ETH', 'SOL', 'UNKNOWN']]
+    assert (batcher.calls, batcher.loads) == (1, 5)
+
+
+def test_full_batch_goes_out_before_the_window():
+    async def scenario():
+        upstream = Upstream()
+        batcher = MicroBatcher(upstream, window=60, max_batch=3)
+        first = await asyncio.wait_for(asyncio.gather(*(batcher.load(key) for key in ['A', 'B', 'C'])), 1)
+        tail = asyncio.create_task(batcher.load('D'))
+        await asyncio.sleep(0.05)
+        assert not tail.done()  # Waits for its window
+        tail.cancel()
+        return upstream, first
+
+    upstream, first = asyncio.run(scenario())
+    assert first == ['a', 'b', 'c']
+    assert upstream.batches == [['A', 'B', 'C']]
+
+
+def test_failure_reaches_every_caller_of_the_batch():
+    async def scenario():
+        upstream = Upstream(error=RuntimeError("upstream down"))
+        batcher = MicroBatcher(upstream, window=0.01)
+        failed = await asyncio.gather(*(batcher.load(key) for key in ['A', 'B', 'A']), return_exceptions=True)
+        upstream.error = None
+        return failed, await batcher.load('A'), upstream
+
+    failed, retried, upstream = asyncio.run(scenario())
+    assert all(isinstance(error, RuntimeError) for error in failed)
+    assert retried == 'a'
+    assert len(upstream.batches) == 2
+
+
+def test_caller_giving_up_does_not_cancel_the_batch():
+    async def scenario():
+        upstream = Upstream(delay=0.05)
+        batcher = MicroBatcher(upstream, window=0.01)
+        impatient = asyncio.create_task(batcher.load('A'))
+        patient = [asyncio.create_task(batcher.load(key)) for key in ['A', 'B']]
+        await asyncio.sleep(0.03)  # Batch in flight
+        impatient.cancel()
+        values = await asyncio.gather(*patient)
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return values, upstream
+
+    values, upstream = asyncio.run(scenario())
+    assert values == ['a', 'b']
+    assert len(upstream.batches) == 1
+
+
+def test_quotes_are_batched_and_survive_an_invalid_symbol():
+    async def scenario(stub: StubServer):
+        client = UpstreamClient(retries=0)
+        cmc = CoinMarketCap(client, SecretStr("test"), batch_window=0.01)
+        cmc.base_url = stub.url
+        try:
+            valid = await asyncio.gather(*(cmc.get_quote(symbol) for symbol in ['BTC', 'ETH', 'BTC']))
+            requests = stub.requests
+            mixed = await asyncio.gather(*(cmc.get_quote(symbol) for symbol in ['SOL', 'NOPE', 'ADA']))
+        finally:
+            await client.stop()
+        return valid, requests, mixed
+
+    with StubServer(invalid=frozenset({"NOPE"})) as stub:
+        valid, requests, mixed = asyncio.run(scenario(stub))
+        assert valid == [{"symbol": "BTC"}, {"symbol": "ETH"}, {"symbol": "BTC"}]
+        assert requests == 1
+        assert "symbol=BTC%2CETH" in stub.paths[0]
+        # Whole call refused, retried once without the symbol the error names
+        assert mixed == [{"symbol": "SOL"}, None, {"symbol": "ADA"}]
+        assert stub.requests == 3
+        assert "symbol=ADA%2CSOL" in stub.paths[-1]
+
+
+def test_unnamed_invalid_symbols_are_found_by_halving():
+    symbols = ['A', 'B', 'C', 'D', 'E', 'F', 'NOPE', 'H']
+
+    async def scenario(stub: StubServer):
+        client = UpstreamClient(retries=0)
+        cmc = CoinMarketCap(client, SecretStr("test"))
+        cmc.base_url = stub.url
+        try:
+            return await cmc.get_quotes(symbols)
+        finally:
+            await client.stop()
+
+    with StubServer(invalid=frozenset({"NOPE"}), name_invalid=False) as stub:
+        quotes = asyncio.run(scenario(stub))
+        assert sorted(quotes) == ['A', 'B', 'C', 'D', 'E', 'F', 'H']
+        # 8 -> 4 + 4 -> 2 + 2 -> 1 + 1, instead of one call per symbol
+        assert stub.requests == 7
+
+
+def test_invalid_symbols_are_read_from_the_error_message():
+    assert invalid_symbols({"status": {"error_message": 'Invalid value for "symbol": "NOPE"'}}) == {"NOPE"}
+    assert invalid_symbols({"status": {"error_message": 'Invalid values for "symbol": "foo, BAR"'}}) == {"FOO", "BAR"}
+    assert invalid_symbols({"status": {"error_message": 'Invalid value for "symbol"'}}) == set()
+    assert invalid_symbols("Bad Request") == set()
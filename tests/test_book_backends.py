@@ -0,0 +1,106 @@
+import random
+
+import pytest
+
+from src.core.services.crypto.exchange.benchmark import synthetic_flow
+from src.core.services.crypto.exchange.book_side import BOOK_BACKENDS, HeapSide
+from src.core.services.crypto.exchange.market import get_market_config
+from src.core.services.crypto.exchange.trade import OrderBook
+
+
+# The array backend needs a price band, USDC-USDT has one
+MARKET = 'USDC-USDT'
+
+
+def replay(backend: str, commands: list[dict], seed: int = 7) -> tuple[OrderBook, list[tuple]]:
+    """Run the same command stream, with amends mixed in, through one backend"""
+    book = OrderBook(MARKET, book_backend=backend)
+    rng = random.Random(seed)
+    ids: list[int] = []
+    trades: list[tuple] = []
+    for command in commands:
+        if command["op"] == "cancel":
+            book.cancel_order(ids[command["ref"]])
+        else:
+            fields = {key: value for key, value in command.items() if key != "op"}
+            ids.append(book.create_order(**fields).id)
+            if rng.random() < 0.1:
+                order = book.get_order(rng.choice(ids))
+                try:
+                    book.amend_order(order.id, amount=book.market.lots_to_qty(order.filled + rng.randint(1, 10)))
+                except (AttributeError, ValueError):
+                    pass  # Pruned or already finished
+        trades.extend(
+            (trade.price, trade.amount, trade.buy_order_id, trade.sell_order_id, trade.taker_side)
+            for trade in book.drain_trades()
+        )
+        book.prune_finished()
+    return book, trades
+
+
+@pytest.mark.parametrize("cross_rate", [0.05, 0.3])
+def test_backends_produce_identical_books(cross_rate: float):
+    commands = list(synthetic_flow(5_000, levels=40, cross_rate=cross_rate, market=MARKET, mid='1'))
+    results = {backend: replay(backend, commands) for backend in BOOK_BACKENDS}
+
+    reference_book, reference_trades = results['sorted']
+    assert reference_trades
+    for backend, (book, trades) in results.items():
+        assert trades == reference_trades, backend
+        assert book.get_market_depth(None) == reference_book.get_market_depth(None), backend
+        assert sorted(book.orders) == sorted(reference_book.orders), backend
+        assert len(book.bids) == len(reference_book.bids), backend
+        assert len(book.asks) == len(reference_book.asks), backend
+
+
+@pytest.mark.parametrize("backend", sorted(BOOK_BACKENDS))
+def test_backend_levels_come_out_best_first(backend: str):
+    book = OrderBook(MARKET, book_backend=backend)
+    for price in ('0.9990', '0.9995', '0.9980'):
+        book.create_order(1, 'buy', 'limit', price, '1')
+    for price in ('1.0020', '1.0005', '1.0010'):
+        book.create_order(2, 'sell', 'limit', price, '1')
+
+    depth = book.get_market_depth(2)
+    assert [str(level["price"]) for level in depth["bids"]] == ['0.9995', '0.9990']
+    assert [str(level["price"]) for level in depth["asks"]] == ['1.0005', '1.0010']
+
+    book.cancel_order(book.bids.best().head.id)
+    book.cancel_order(book.asks.best().head.id)
+    assert str(book.market.ticks_to_price(book.bids.best().price)) == '0.9990'
+    assert str(book.market.ticks_to_price(book.asks.best().price)) == '1.0010'
+
+
+class CountingList(list):
+    reads = 0
+
+    def __getitem__(self, index):
+        self.reads += 1
+        return super().__getitem__(index)
+
+
+@pytest.mark.parametrize("is_bid", [True, False])
+def test_heap_levels_skip_stale_entries_and_touch_only_the_top(is_bid: bool):
+    side = HeapSide(is_bid, get_market_config(MARKET))
+    rng = random.Random(5)
+    prices = rng.sample(range(1, 100_000), 5_000)
+    for price in prices:
+        side.add_level(price)
+    # Stale keys, and a price removed and added again (two keys, one level)
+    for price in prices[:1_000]:
+        side.remove_level(price)
+    side.add_level(prices[0])
+    live = sorted(prices[1_000:] + [prices[0]], reverse=is_bid)
+    assert [level.price for level in side.levels()] == live
+
+    side._heap = heap = CountingList(side._heap)
+    before = list(heap)
+    assert [level.price for level in side.top(10)] == live[:10]
+    assert list(heap) == before  # Nothing popped
+    assert heap.reads < 200      # Out of ~6,000 keys
+
+
+def test_array_backend_rejects_prices_outside_its_band():
+    book = OrderBook(MARKET, book_backend='array')
+    with pytest.raises(ValueError):
+        book.create_order(1, 'buy', 'limit', '1.5', '1')
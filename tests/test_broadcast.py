@@ -0,0 +1,89 @@
+import asyncio
+import random
+
+import orjson
+import pytest
+
+from src.core.services.crypto.exchange.broadcast import BroadcastHub
+
+
+def diff(seq: int, rng: random.Random) -> bytes:
+    return orjson.dumps({
+        "type": "diff",
+        "seq": seq,
+        "bids": [[f"{rng.randint(9000, 10000) / 100:.2f}", "1.000000"] for _ in range(10)],
+        "asks": [[f"{rng.randint(10000, 11000) / 100:.2f}", "1.000000"] for _ in range(10)],
+    })
+
+
+@pytest.mark.parametrize("clients", [2_000, pytest.param(10_000, marks=pytest.mark.slow)])
+def test_fan_out_shares_buffers_and_conflates_slow_clients(clients: int):
+    """Simulated websocket writers, 1% of them too slow for the tick rate"""
+    messages, buffer = 100, 20
+    rng = random.Random(42)
+    snapshots = 0
+    state = {"seq": -1}
+
+    def snapshot() -> bytes:
+        nonlocal snapshots
+        snapshots += 1
+        return orjson.dumps({"type": "snapshot", "seq": state["seq"]})
+
+    async def scenario():
+        hub = BroadcastHub(snapshot, client_buffer=buffer)
+        received: dict[int, list[bytes]] = {}
+        sent: list[bytes] = []
+        finished = asyncio.Event()
+
+        async def client(index: int, slow: bool) -> None:
+            subscriber = hub.join()
+            got = received[index] = []
+            while (message := await subscriber.get()) is not None:
+                got.append(message)
+                # Slow counted in broadcasts, not seconds: a 10k-client tick is much longer than a 2k one
+                behind = len(sent) + 3
+                while slow and len(sent) < behind and not finished.is_set():
+                    await asyncio.sleep(0.001)
+                await asyncio.sleep(0)
+
+        slow = {index for index in range(clients) if rng.random() < 0.01}
+        tasks = [asyncio.create_task(client(index, index in slow)) for index in range(clients)]
+        await asyncio.sleep(0)
+        for seq in range(messages):
+            state["seq"] = seq
+            message = diff(seq, rng)
+            sent.append(message)
+            hub.broadcast(message)
+            await asyncio.sleep(0.001)
+        finished.set()
+        hub.close()
+        await asyncio.gather(*tasks)
+        return hub, received, slow, sent
+
+    hub, received, slow, sent = asyncio.run(scenario())
+    assert slow
+    for index, got in received.items():
+        if index in slow:
+            # Backlog replaced by a snapshot, never more than the buffer behind
+            assert len(got) < messages
+            assert any(orjson.loads(message)["type"] == "snapshot" for message in got[1:])
+        else:
+            # Every diff, in order, as the very same bytes object
+            assert all(a is b for a, b in zip(got[1:], sent))
+            assert len(got) == messages + 1
+    assert hub.metrics.messages == messages
+    assert hub.metrics.conflations > 0
+    # One snapshot per join plus at most one per broadcast, however many clients lag
+    assert snapshots <= clients + messages
+
+
+def test_client_that_left_gets_nothing():
+    async def scenario():
+        hub = BroadcastHub(lambda: b"snapshot", client_buffer=10)
+        client = hub.join()
+        hub.leave(client)
+        hub.broadcast(b"diff")
+        return client
+
+    client = asyncio.run(scenario())
+    assert list(client.queue) == [b"snapshot"]
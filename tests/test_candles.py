@@ -0,0 +1,105 @@
+import random
+
+from src.core.services.crypto.exchange.candles import RESOLUTIONS, MarketCandles
+from src.core.services.crypto.exchange.market import get_market_config
+
+
+T0 = 1_700_000_100  # Start of a 5m (and so 1m) bucket
+
+
+def candles(fills: list[tuple[int, int, float]]) -> MarketCandles:
+    series = MarketCandles(get_market_config('BTC-USDT'))
+    for price, amount, timestamp in fills:
+        series.add_trade(price, amount, timestamp)
+    return series
+
+
+def rows(series: MarketCandles, resolution: str) -> list[tuple]:
+    return series.get_rows(resolution, 0, 2 ** 40, 10_000)
+
+
+def aggregate(fills: list[tuple[int, int, float]], seconds: int) -> list[tuple]:
+    """Candles computed straight from the fills"""
+    buckets: dict[int, list] = {}
+    for price, amount, timestamp in fills:
+        start = int(timestamp) // seconds * seconds
+        candle = buckets.get(start)
+        if candle is None:
+            buckets[start] = [start, price, price, price, price, amount, 1]
+        else:
+            candle[2] = max(candle[2], price)
+            candle[3] = min(candle[3], price)
+            candle[4] = price
+            candle[5] += amount
+            candle[6] += 1
+    return [tuple(buckets[start]) for start in sorted(buckets)]
+
+
+def test_fine_candles_roll_up():
+    series = candles([
+        (100, 1, T0 + 1.2), (105, 2, T0 + 1.7), (95, 1, T0 + 30),
+        (110, 1, T0 + 61), (120, 1, T0 + 301),
+    ])
+    assert rows(series, '1s') == [
+        (T0 + 1, 100, 105, 100, 105, 3, 2),
+        (T0 + 30, 95, 95, 95, 95, 1, 1),
+        (T0 + 61, 110, 110, 110, 110, 1, 1),
+        (T0 + 301, 120, 120, 120, 120, 1, 1),
+    ]
+    assert rows(series, '1m') == [
+        (T0, 100, 105, 95, 95, 4, 3),
+        (T0 + 60, 110, 110, 110, 110, 1, 1),
+        (T0 + 300, 120, 120, 120, 120, 1, 1),
+    ]
+    assert rows(series, '5m') == [
+        (T0, 100, 110, 95, 110, 5, 4),
+        (T0 + 300, 120, 120, 120, 120, 1, 1),
+    ]
+
+
+def test_every_resolution_matches_the_fills():
+    rng = random.Random(3)
+    fills, now = [], float(T0)
+    for _ in range(5_000):
+        now += rng.expovariate(1 / 20)
+        fills.append((rng.randint(9_000, 11_000), rng.randint(1, 50), now))
+    series = candles(fills)
+    for resolution, (seconds, capacity) in RESOLUTIONS.items():
+        expected = aggregate(fills, seconds)
+        # Slots of empty buckets still hold older candles, reads start at the coverage
+        covered = series.covered_from(resolution)
+        held = series.get_rows(resolution, covered, 2 ** 40, capacity)
+        assert held == [row for row in expected if row[0] >= covered][-capacity:], resolution
+
+
+def test_open_candles_are_merged_on_read():
+    series = candles([(100, 1, T0 + 1), (110, 2, T0 + 61)])
+    # Nothing reached the 5m ring, the 1m and 1s open candles make up the bucket
+    assert (series.rings[2]['start'] == -1).all()
+    assert series._pending(2) == [[T0, 100, 110, 100, 110, 3, 2]]
+    assert series._pending(1) == [[T0, 100, 100, 100, 100, 1, 1], [T0 + 60, 110, 110, 110, 110, 2, 1]]
+
+
+def test_coverage_starts_after_the_first_bucket():
+    series = candles([(100, 1, T0 + 1.5)])
+    assert candles([]).covered_from('1m') is None
+    assert series.covered_from('1s') == T0 + 2
+    assert series.covered_from('1m') == T0 + 60
+
+    series.add_trade(100, 1, T0 + 3_600 * 2)
+    # Bounded by what the 1s ring holds
+    assert series.covered_from('1s') == T0 + 3_600 * 2 - 3_599
+
+
+def test_late_fill_goes_into_the_open_candle():
+    series = candles([
+        (100, 1, T0 + 1), (101, 1, T0 + 61), (102, 1, T0 + 130),
+        (50, 1, T0 + 10),  # Clock stepped back, or a replayed fill
+        (103, 1, T0 + 140),
+    ])
+    minutes = rows(series, '1m')
+    assert [row[0] for row in minutes] == [T0, T0 + 60, T0 + 120]
+    assert minutes[0] == (T0, 100, 100, 100, 100, 1, 1)
+    assert minutes[2] == (T0 + 120, 102, 103, 50, 103, 3, 3)
+    assert sum(row[5] for row in rows(series, '1s')) == 5
+    assert [row[0] for row in rows(series, '5m')] == [T0]
@@ -0,0 +1,227 @@
+from decimal import Decimal
+from types import SimpleNamespace
+import asyncio
+import random
+
+import orjson
+
+from src.core.services.crypto.exchange.depth_feed import DepthFeed
+from src.core.services.crypto.exchange.events import EventBus, MarketEvent, MarketEventPublisher
+from src.core.services.crypto.exchange.sequencer import Command, CommandResult
+from src.core.services.crypto.exchange.trade import OrderBook
+
+
+INTERVAL = 0.01
+
+
+class LocalMarket:
+    """Book driven the way the sequencer does it, level events published to ``bus``"""
+    def __init__(self, bus: EventBus):
+        self.book = OrderBook('BTC-USDT')
+        self.publisher = MarketEventPublisher(bus)
+        self.publisher.attach(self.book)
+        self.fills = 0
+
+    def owns(self, symbol: str) -> bool:
+        return True
+
+    def get_market_depth(self, symbol: str, depth) -> dict:
+        return self.book.get_market_depth(depth)
+
+    def order(self, side: str, price: str, amount: str):
+        order = self.book.create_order(1, side, 'limit', price, amount)
+        self._publish('new', order)
+        return order
+
+    def cancel(self, order_id: int) -> None:
+        self._publish('cancel', self.book.cancel_order(order_id), order_id=order_id)
+
+    def _publish(self, kind: str, value, **kwargs) -> None:
+        result = CommandResult(value, self.book.drain_trades())
+        self.fills += len(result.trades)
+        self.publisher.publish(self.book, Command(kind, kwargs, None), result)
+
+
+def levels(depth: dict) -> dict:
+    return {side: {level["price"]: level["amount"] for level in depth[side]} for side in ("bids", "asks")}
+
+
+class Client:
+    """Websocket client keeping a book from the feed's messages"""
+    def __init__(self, subscriber):
+        self.subscriber = subscriber
+        self.messages: list[dict] = []
+        self.levels = {"bids": {}, "asks": {}}
+        self.seq = None
+        self.task = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        while (message := await self.subscriber.get()) is not None:
+            message = orjson.loads(message)
+            self.messages.append(message)
+            if message["type"] == "snapshot":
+                self.levels = {
+                    side: {Decimal(price): Decimal(amount) for price, amount in message[side]}
+                    for side in ("bids", "asks")
+                }
+            else:
+                assert message["prev_seq"] == self.seq, "missed a diff"
+                for side in ("bids", "asks"):
+                    for price, amount in message[side]:
+                        if Decimal(amount):
+                            self.levels[side][Decimal(price)] = Decimal(amount)
+                        else:
+                            self.levels[side].pop(Decimal(price), None)
+            self.seq = message["seq"]
+
+
+def test_snapshot_is_seeded_from_the_book():
+    async def scenario():
+        bus = EventBus()
+        market = LocalMarket(bus)
+        market.order('buy', '99.00', '1')
+        market.order('buy', '98.00', '2')
+        market.order('sell', '101.00', '0.5')
+        feed = DepthFeed('BTC-USDT', market, bus, INTERVAL, 100)
+        client = Client(await feed.join())
+        await asyncio.sleep(0)
+        feed.leave(client.subscriber)
+        return bus, market, client
+
+    bus, market, client = asyncio.run(scenario())
+    snapshot = client.messages[0]
+    assert snapshot["type"] == "snapshot"
+    assert snapshot["seq"] == bus.last_seq('BTC-USDT')
+    assert snapshot["bids"] == [["99.00", "1.000000"], ["98.00", "2.000000"]]
+    assert snapshot["asks"] == [["101.00", "0.500000"]]
+
+
+def test_diffs_rebuild_the_book():
+    rng = random.Random(7)
+
+    async def scenario():
+        bus = EventBus()
+        market = LocalMarket(bus)
+        feed = DepthFeed('BTC-USDT', market, bus, INTERVAL, 100)
+        early = Client(await feed.join())
+        resting = []
+        for tick in range(30):
+            for _ in range(rng.randint(0, 8)):
+                side = rng.choice(['buy', 'sell'])
+                # Overlapping ranges, so some orders cross and fill
+                price = rng.randint(9_900, 10_050) if side == 'buy' else rng.randint(9_950, 10_100)
+                resting.append(market.order(side, f"{price / 100:.2f}", f"{rng.randint(1, 30) / 10:.6f}").id)
+            if resting and rng.random() < 0.5:
+                market.cancel(resting.pop(rng.randrange(len(resting))))
+            if tick == 15:
+                late = Client(await feed.join())
+            await asyncio.sleep(INTERVAL * rng.choice([0.3, 1, 2.5]))
+        await asyncio.sleep(INTERVAL * 3)
+        for client in (early, late):
+            feed.leave(client.subscriber)
+        await asyncio.sleep(INTERVAL * 2)
+        return bus, market, feed, early, late
+
+    bus, market, feed, early, late = asyncio.run(scenario())
+    expected = levels(market.get_market_depth('BTC-USDT', None))
+    assert market.fills
+    for client in (early, late):
+        assert client.messages[0]["type"] == "snapshot"
+        assert sum(message["type"] == "snapshot" for message in client.messages) == 1
+        assert client.seq == bus.last_seq('BTC-USDT')
+        assert client.levels == expected
+    # Seqs only move forward, several events per diff
+    diffs = [message["seq"] for message in early.messages]
+    assert diffs == sorted(set(diffs))
+    # Last client gone: the feed let go of the market
+    assert feed._task is None and bus.subscriber_count('BTC-USDT') == 0
+
+
+def test_collect_nets_a_tick_of_events():
+    async def scenario():
+        bus = EventBus()
+        market = LocalMarket(bus)
+        feed = DepthFeed('BTC-USDT', market, bus, INTERVAL, 100)
+        await feed._seed()
+        first = market.order('buy', '99.00', '1')
+        market.order('buy', '99.00', '2')
+        market.cancel(first.id)
+        market.order('sell', '101.00', '1')
+        market.order('buy', '101.00', '1')  # Fills it, the ask level goes away
+        changes = feed._collect()
+        feed._subscription.close()
+        return bus, feed, changes
+
+    bus, feed, changes = asyncio.run(scenario())
+    assert changes == {
+        "bids": {Decimal('99.00'): Decimal('2.000000')},
+        "asks": {Decimal('101.00'): Decimal('0E-6')},
+    }
+    assert feed.seq == bus.last_seq('BTC-USDT')
+    assert feed.sent_seq == 0  # Nothing sent yet
+
+
+def test_lagging_feed_resyncs_its_clients():
+    async def scenario():
+        bus = EventBus(maxsize=4)
+        market = LocalMarket(bus)
+        feed = DepthFeed('BTC-USDT', market, bus, INTERVAL, 100)
+        client = Client(await feed.join())
+        market.order('buy', '99.00', '1')
+        await asyncio.sleep(INTERVAL * 2)
+        # More events in one tick than the subscription holds
+        for price in range(10):
+            market.order('sell', f"{101 + price}.00", '1')
+        await asyncio.sleep(INTERVAL * 3)
+        market.order('buy', '98.00', '1')
+        await asyncio.sleep(INTERVAL * 3)
+        feed.leave(client.subscriber)
+        await asyncio.sleep(INTERVAL * 2)
+        return bus, market, client
+
+    bus, market, client = asyncio.run(scenario())
+    kinds = [message["type"] for message in client.messages]
+    assert kinds == ["snapshot", "diff", "snapshot", "diff"]
+    resync = client.messages[2]
+    assert len(resync["asks"]) == 10
+    assert client.messages[3]["prev_seq"] == resync["seq"]
+    assert client.levels == levels(market.get_market_depth('BTC-USDT', None))
+
+
+def test_gap_in_a_remote_stream_reseeds():
+    snapshots = []
+
+    async def get_snapshot(symbol: str) -> dict:
+        snapshots.append(symbol)
+        if len(snapshots) == 1:
+            return {"seq": 10, "bids": [{"price": Decimal('99.00'), "amount": Decimal('1')}], "asks": []}
+        return {"seq": 13, "bids": [{"price": Decimal('99.00'), "amount": Decimal('3')}], "asks": []}
+
+    async def read_after(symbol: str, stream_id: str) -> list:
+        return []
+
+    def level(seq: int, amount: str) -> MarketEvent:
+        return MarketEvent('BTC-USDT', seq, 'level', {"side": "bids", "price": Decimal('99.00'), "amount": Decimal(amount)})
+
+    async def scenario():
+        bus = EventBus()
+        bridge = SimpleNamespace(follow=lambda symbol: None, get_snapshot=get_snapshot, read_after=read_after)
+        registry = SimpleNamespace(owns=lambda symbol: False, bridge=bridge)
+        feed = DepthFeed('BTC-USDT', registry, bus, INTERVAL, 100)
+        client = Client(await feed.join())
+        bus.publish(level(10, '5'))  # Already in the snapshot
+        bus.publish(level(11, '2'))
+        await asyncio.sleep(INTERVAL * 2)
+        bus.publish(level(13, '3'))  # 12 never arrived
+        await asyncio.sleep(INTERVAL * 3)
+        feed.leave(client.subscriber)
+        await asyncio.sleep(INTERVAL * 2)
+        return client
+
+    client = asyncio.run(scenario())
+    assert len(snapshots) == 2
+    assert [(message["type"], message["seq"]) for message in client.messages] == [
+        ("snapshot", 10), ("diff", 11), ("snapshot", 13),
+    ]
+    assert client.messages[1]["bids"] == [["99.00", "2"]]
+    assert client.levels == {"bids": {Decimal('99.00'): Decimal('3')}, "asks": {}}
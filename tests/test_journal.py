@@ -0,0 +1,190 @@
+from decimal import Decimal
+from pathlib import Path
+import asyncio
+
+import pytest
+
+from src.core.services.crypto.exchange.balances import BalanceLedger
+from src.core.services.crypto.exchange.journal import recover_book
+from src.core.services.crypto.exchange.sequencer import MarketHaltedError, MarketSequencer
+from src.core.services.crypto.exchange.trade import OrderBook
+
+
+MARKET = 'BTC-USDT'
+
+
+def order(user_id: int, side: str, price, amount, order_type: str = 'limit') -> dict:
+    return {"user_id": user_id, "side": side, "order_type": order_type, "price": price, "amount": amount}
+
+
+def open_market(root: Path, persisted=None, snapshot_every: int = 100_000):
+    book = OrderBook(MARKET)
+    journal, pending = recover_book(book, str(root), persisted)
+    return book, MarketSequencer(book, journal=journal, snapshot_every=snapshot_every), pending
+
+
+def ledger() -> BalanceLedger:
+    """Ledger without a database, every user funded up front"""
+    ledger = BalanceLedger(None)
+    for user_id in (1, 2, 3):
+        ledger._loaded[user_id] = float('inf')
+        ledger._balances[(user_id, 'USDT')] = [Decimal(1000), Decimal(0)]
+        ledger._balances[(user_id, 'BTC')] = [Decimal(10), Decimal(0)]
+    return ledger
+
+
+def wire(book: OrderBook, sequencer: MarketSequencer, ledger: BalanceLedger) -> None:
+    ledger.rebuild(book)
+    book.add_check(ledger.check, ledger.reserve)
+    sequencer.add_hook(ledger.settle)
+    sequencer.add_listener(ledger.publish)
+
+
+def test_recovers_snapshot_and_journal(tmp_path: Path):
+    async def scenario():
+        book, sequencer, _ = open_market(tmp_path, snapshot_every=4)
+        resting = await sequencer.submit('new', **order(1, 'sell', 101, 2))
+        await sequencer.submit('new', **order(2, 'buy', 99, 1))
+        cancelled = await sequencer.submit('new', **order(3, 'sell', 102, 1))
+        await sequencer.submit('new', **order(2, 'buy', 101, '0.5'))  # Snapshot after this one
+        await sequencer.submit('amend', order_id=resting.value.id, amount=3)
+        await sequencer.submit('cancel', order_id=cancelled.value.id)
+        await sequencer.stop()
+        return book
+
+    live = asyncio.run(scenario())
+    assert (tmp_path / MARKET / 'snapshot.bin').exists()
+    assert sorted(path.name for path in (tmp_path / MARKET).glob('journal-*.bin')) == ['journal-1.bin']
+
+    recovered, sequencer, pending = open_market(tmp_path)
+    sequencer.journal.close()
+    assert pending == []
+    assert recovered.get_market_depth(None) == live.get_market_depth(None)
+    assert recovered.last_order_id == live.last_order_id
+    for order_id, original in live.orders.items():
+        restored = recovered.get_order(order_id)
+        assert (restored.price, restored.amount, restored.filled) == (original.price, original.amount, original.filled)
+
+
+def test_torn_tail_is_truncated(tmp_path: Path):
+    async def scenario():
+        _, sequencer, _ = open_market(tmp_path)
+        await sequencer.submit('new', **order(1, 'sell', 101, 1))
+        await sequencer.submit('new', **order(1, 'sell', 102, 1))
+        await sequencer.stop()
+
+    asyncio.run(scenario())
+    path = tmp_path / MARKET / 'journal-0.bin'
+    intact = path.stat().st_size
+    with open(path, 'ab') as file_x:
+        file_x.write(b'\x30\x00\x00\x00garbage')
+
+    book, sequencer, _ = open_market(tmp_path)
+    assert path.stat().st_size == intact
+    assert len(book.orders) == 2
+
+    async def append():
+        await sequencer.submit('new', **order(1, 'sell', 103, 1))
+        await sequencer.stop()
+
+    asyncio.run(append())
+    book, sequencer, _ = open_market(tmp_path)
+    sequencer.journal.close()
+    assert len(book.orders) == 3
+
+
+def test_records_past_the_checkpoint_go_through_listeners(tmp_path: Path):
+    async def scenario():
+        _, sequencer, _ = open_market(tmp_path)
+        first = await sequencer.submit('new', **order(1, 'sell', 100, 1))
+        await sequencer.submit('new', **order(2, 'buy', 100, '0.4'))
+        await sequencer.submit('new', **order(3, 'buy', 99, 1))
+        await sequencer.stop()
+        return first.position
+
+    persisted = asyncio.run(scenario())
+    book, sequencer, pending = open_market(tmp_path, persisted)
+    assert [kind for kind, _, _ in pending] == ['new', 'new']
+    assert all(position > persisted for _, _, position in pending)
+
+    seen = []
+    sequencer.add_listener(lambda book, command, result: seen.append((command.replayed, len(result.trades), result.position)))
+    assert sequencer.replay(pending) == 2
+    sequencer.journal.close()
+    assert seen == [(True, 1, pending[0][2]), (True, 0, pending[1][2])]
+    assert book.get_market_depth(None)["asks"][0]["amount"] == Decimal('0.600000')
+
+
+def test_replayed_ledger_matches_live(tmp_path: Path):
+    async def live_run():
+        book, sequencer, _ = open_market(tmp_path)
+        balances = ledger()
+        wire(book, sequencer, balances)
+        await sequencer.submit('new', **order(1, 'sell', 100, 1))
+        await sequencer.submit('new', **order(2, 'buy', 101, '0.4'))
+        resting = await sequencer.submit('new', **order(3, 'buy', 98, 1))
+        await sequencer.submit('amend', order_id=resting.value.id, price=99, amount=2)
+        await sequencer.submit('new', **order(3, 'buy', 0, '0.3', order_type='market'))
+        await sequencer.stop()
+        return balances
+
+    live = asyncio.run(live_run())
+    # Nothing was stored, every record is replayed against the table balances
+    book, sequencer, pending = open_market(tmp_path, (0, 0))
+    replayed = ledger()
+    wire(book, sequencer, replayed)
+    sequencer.replay(pending)
+    sequencer.journal.close()
+
+    assert replayed._balances == live._balances
+    assert replayed._order_locks == live._order_locks
+    assert replayed.get_balances(3)["USDT"]["locked"] == Decimal('198.0000')
+
+
+def test_failed_commit_halts_and_rolls_back(tmp_path: Path):
+    halts = []
+
+    async def scenario():
+        book, sequencer, _ = open_market(tmp_path)
+        sequencer.add_halt_handler(lambda book, reason: halts.append(reason))
+        await sequencer.submit('new', **order(1, 'sell', 101, 1))
+
+        journal = sequencer.journal
+
+        async def fsync_failed():
+            # The group reached the file, the fsync did not go through
+            journal._file.write(bytes(journal._buffer))
+            journal._file.flush()
+            raise OSError("fsync failed")
+
+        journal.commit = fsync_failed
+        with pytest.raises(MarketHaltedError):
+            await sequencer.submit('new', **order(1, 'sell', 102, 1))
+        with pytest.raises(MarketHaltedError):
+            await sequencer.submit('new', **order(1, 'sell', 103, 1))
+        await sequencer.stop()
+
+    asyncio.run(scenario())
+    assert len(halts) == 1 and isinstance(halts[0], OSError)
+
+    book, sequencer, pending = open_market(tmp_path)
+    sequencer.journal.close()
+    assert [level["price"] for level in book.get_market_depth(None)["asks"]] == [Decimal('101.00')]
+
+
+def test_stop_resolves_every_submitted_command(tmp_path: Path):
+    async def scenario():
+        _, sequencer, _ = open_market(tmp_path)
+        calls = [asyncio.create_task(sequencer.submit('new', **order(1, 'sell', 100 + n, 1))) for n in range(20)]
+        await asyncio.sleep(0)
+        await sequencer.stop()
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    outcomes = asyncio.run(scenario())
+    done = [outcome for outcome in outcomes if not isinstance(outcome, Exception)]
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes if isinstance(outcome, Exception))
+
+    # Whatever was acknowledged is durable, nothing else is
+    book, sequencer, _ = open_market(tmp_path)
+    sequencer.journal.close()
+    assert sorted(book.orders) == sorted(outcome.value.id for outcome in done)
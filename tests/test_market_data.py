@@ -0,0 +1,114 @@
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from types import SimpleNamespace
+import asyncio
+
+from src.core.services.cache.redis.market_data import RedisMarketData, encode_entry
+
+
+class FakeRedis:
+    """Hashes in a dict, every read takes ``delay`` so that misses overlap"""
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
+        self.expires: dict[str, int] = {}
+        self.reads = 0
+        self.pipelines = 0
+
+    def store(self, key: str, entry: dict) -> None:
+        self.hashes[key] = {name.encode(): value.encode() for name, value in encode_entry(entry).items()}
+
+    async def hgetall(self, key: str) -> dict[bytes, bytes]:
+        self.reads += 1
+        await asyncio.sleep(self.delay)
+        return dict(self.hashes.get(key, {}))
+
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = True):
+        self.pipelines += 1
+        commands = []
+
+        async def execute():
+            for command in commands:
+                command()
+
+        yield SimpleNamespace(
+            hset=lambda key, mapping: commands.append(lambda: self.store(key, mapping)),
+            expire=lambda key, seconds: commands.append(lambda: self.expires.__setitem__(key, seconds)),
+            execute=execute,
+        )
+
+
+def test_concurrent_misses_share_one_read():
+    async def scenario():
+        redis = FakeRedis()
+        redis.store('mdc:ETH-USDT', {"symbol": 'ETH-USDT', "last_price": Decimal('2000.5')})
+        cache = RedisMarketData(redis, ttl=60)
+        entries = await asyncio.gather(*(cache.get('ETH-USDT') for _ in range(20)))
+        again = await cache.get('ETH-USDT')
+        return redis, entries, again
+
+    redis, entries, again = asyncio.run(scenario())
+    assert redis.reads == 1
+    assert all(entry is entries[0] for entry in entries)
+    assert entries[0]["last_price"] == Decimal('2000.5')
+    assert again is entries[0]  # Served from the local tier
+
+
+def test_expired_local_entry_is_read_from_redis_again():
+    async def scenario():
+        redis = FakeRedis(delay=0)
+        redis.store('mdc:ETH-USDT', {"symbol": 'ETH-USDT', "last_price": Decimal('2000')})
+        cache = RedisMarketData(redis, ttl=0.05)
+        first = await cache.get('ETH-USDT')
+        redis.store('mdc:ETH-USDT', {"symbol": 'ETH-USDT', "last_price": Decimal('2001')})
+        fresh = await cache.get('ETH-USDT')
+        await asyncio.sleep(0.06)
+        assert cache.get_local('ETH-USDT') is None
+        expired = await cache.get('ETH-USDT')
+        return redis, first, fresh, expired
+
+    redis, first, fresh, expired = asyncio.run(scenario())
+    assert fresh is first
+    assert expired["last_price"] == Decimal('2001')
+    assert redis.reads == 2
+
+
+def test_pushed_entries_never_expire():
+    async def scenario():
+        redis = FakeRedis()
+        cache = RedisMarketData(redis, ttl=0.01)
+        cache.update('BTC-USDT', {"last_price": Decimal('100')})
+        cache.update('BTC-USDT', {"last_amount": Decimal('1')})
+        await cache.stop()
+        await asyncio.sleep(0.02)
+        return redis, await cache.get('BTC-USDT')
+
+    redis, entry = asyncio.run(scenario())
+    assert redis.reads == 0
+    assert redis.pipelines == 1  # Both updates in one push
+    assert entry["last_price"] == Decimal('100') and entry["last_amount"] == Decimal('1')
+    assert redis.hashes['mdc:BTC-USDT'][b'last_price'] == b'100'
+
+
+def test_quote_misses_share_one_upstream_call():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"price": 1.5} if len(calls) > 1 else None
+
+    async def scenario():
+        redis = FakeRedis(delay=0)
+        cache = RedisMarketData(redis, quote_ttl=30)
+        missing = await asyncio.gather(*(cache.get_quote('ADA', fetch) for _ in range(5)))
+        # None is not cached, the next caller asks upstream again
+        quotes = await asyncio.gather(*(cache.get_quote('ADA', fetch) for _ in range(5)))
+        return redis, cache, missing, quotes
+
+    redis, cache, missing, quotes = asyncio.run(scenario())
+    assert missing == [None] * 5
+    assert quotes == [{"price": 1.5}] * 5
+    assert len(calls) == cache.upstream_fetches == 2
+    assert redis.expires == {'mdc:quote:ADA': 30}
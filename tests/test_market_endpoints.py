@@ -0,0 +1,20 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.v1.endpoints import markets
+from src.core.services.crypto.exchange.trade import OrderBook
+
+
+def test_depth_is_bounded(monkeypatch):
+    book = OrderBook('BTC-USDT')
+    for price in range(1, 1_201):
+        book.create_order(1, 'buy', 'limit', f"{price}.00", '1')
+    monkeypatch.setattr(markets.market_registry, 'get_market_depth', lambda symbol, depth: book.get_market_depth(depth))
+    app = FastAPI()
+    app.include_router(markets.router)
+    client = TestClient(app)
+
+    assert len(client.get('/markets/BTC-USDT/depth').json()["bids"]) == 10
+    assert len(client.get(f'/markets/BTC-USDT/depth?depth={markets.MAX_DEPTH}').json()["bids"]) == markets.MAX_DEPTH
+    for depth in (0, -1, markets.MAX_DEPTH + 1):
+        assert client.get(f'/markets/BTC-USDT/depth?depth={depth}').status_code == 422
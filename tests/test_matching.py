@@ -0,0 +1,187 @@
+from decimal import Decimal
+
+import pytest
+
+from src.core.services.crypto.exchange.enums import OrderStatus, Side
+from src.core.services.crypto.exchange.trade import OrderBook
+
+
+def sell(book: OrderBook, price, amount, user_id: int = 1, **kwargs):
+    return book.create_order(user_id, 'sell', 'limit', price, amount, **kwargs)
+
+
+def buy(book: OrderBook, price, amount, user_id: int = 2, **kwargs):
+    return book.create_order(user_id, 'buy', 'limit', price, amount, **kwargs)
+
+
+def test_fills_at_maker_price_in_time_priority():
+    book = OrderBook('BTC-USDT')
+    first = sell(book, '100', '1')
+    second = sell(book, '100', '1')
+    cheaper = sell(book, '99', '1')
+
+    taker = buy(book, '100', '2.5')
+    trades = book.drain_trades()
+
+    assert [(trade.sell_order_id, trade.price, trade.amount) for trade in trades] == [
+        (cheaper.id, book.market.price_to_ticks('99'), book.market.qty_to_lots('1')),
+        (first.id, book.market.price_to_ticks('100'), book.market.qty_to_lots('1')),
+        (second.id, book.market.price_to_ticks('100'), book.market.qty_to_lots('0.5')),
+    ]
+    assert all(trade.buy_order_id == taker.id and trade.taker_side is Side.BUY for trade in trades)
+    assert taker.status is OrderStatus.FILLED
+    assert first.status is OrderStatus.FILLED
+    assert second.status is OrderStatus.OPEN
+    assert book.get_market_depth(5) == {
+        "bids": [],
+        "asks": [{"price": Decimal('100.00'), "amount": Decimal('0.500000'), "orders": 1}],
+    }
+
+
+def test_unfilled_remainder_rests():
+    book = OrderBook('BTC-USDT')
+    sell(book, '101', '1')
+    taker = buy(book, '101', '3')
+    assert taker.status is OrderStatus.OPEN
+    assert taker.filled == book.market.qty_to_lots('1')
+    assert book.get_market_depth(5)["bids"] == [{"price": Decimal('101.00'), "amount": Decimal('2.000000'), "orders": 1}]
+    assert book.get_market_depth(5)["asks"] == []
+
+
+def test_cancel_from_the_middle_keeps_queue_and_totals():
+    book = OrderBook('BTC-USDT')
+    orders = [sell(book, '100', '1') for _ in range(5)]
+    assert book.cancel_order(orders[2].id)
+    assert not book.cancel_order(orders[2].id)
+    assert orders[2].status is OrderStatus.CANCELED
+
+    level = book.asks.get(book.market.price_to_ticks('100'))
+    assert [order.id for order in level] == [order.id for order in orders if order is not orders[2]]
+    assert level.order_count == 4
+    assert level.total_remaining == book.market.qty_to_lots('4')
+
+    buy(book, '100', '2')
+    assert [trade.sell_order_id for trade in book.drain_trades()] == [orders[0].id, orders[1].id]
+
+
+def test_cancelling_the_last_order_removes_the_level():
+    book = OrderBook('BTC-USDT')
+    order = sell(book, '100', '1')
+    book.cancel_order(order.id)
+    assert book.asks.get(book.market.price_to_ticks('100')) is None
+    assert book.asks.best() is None
+
+
+def test_cancel_checks_the_owner():
+    book = OrderBook('BTC-USDT')
+    order = sell(book, '100', '1', user_id=1)
+    assert not book.cancel_order(order.id, user_id=2)
+    assert book.cancel_order(order.id, user_id=1)
+
+
+def test_amend_down_keeps_priority_anything_else_requeues():
+    book = OrderBook('BTC-USDT')
+    first = sell(book, '100', '2')
+    second = sell(book, '100', '1')
+
+    book.amend_order(first.id, amount='1')
+    level = book.asks.get(book.market.price_to_ticks('100'))
+    assert [order.id for order in level] == [first.id, second.id]
+    assert level.total_remaining == book.market.qty_to_lots('2')
+
+    book.amend_order(first.id, amount='3')
+    assert [order.id for order in level] == [second.id, first.id]
+
+    book.amend_order(second.id, price='101')
+    assert [order.id for order in level] == [first.id]
+    assert book.get_market_depth(5)["asks"][1] == {"price": Decimal('101.00'), "amount": Decimal('1.000000'), "orders": 1}
+
+
+def test_amend_through_the_touch_matches():
+    book = OrderBook('BTC-USDT')
+    maker = sell(book, '101', '1')
+    bid = buy(book, '100', '1')
+    book.amend_order(bid.id, price='101')
+    assert [trade.sell_order_id for trade in book.drain_trades()] == [maker.id]
+    assert bid.status is OrderStatus.FILLED
+
+
+def test_amend_rejects_invalid_changes():
+    book = OrderBook('BTC-USDT')
+    order = sell(book, '100', '2')
+    buy(book, '100', '1')
+    with pytest.raises(ValueError):
+        book.amend_order(order.id, amount='1')  # Not above what already filled
+    book.cancel_order(order.id)
+    with pytest.raises(ValueError):
+        book.amend_order(order.id, price='99')
+
+
+def test_market_order_sweeps_levels_and_never_rests():
+    book = OrderBook('BTC-USDT')
+    sell(book, '100', '1')
+    sell(book, '101', '1')
+    taker = book.create_order(2, 'buy', 'market', 0, '3')
+    trades = book.drain_trades()
+    assert [trade.price for trade in trades] == [book.market.price_to_ticks('100'), book.market.price_to_ticks('101')]
+    assert taker.filled == book.market.qty_to_lots('2')
+    assert taker.status is OrderStatus.CANCELED
+    assert book.get_market_depth(5) == {"bids": [], "asks": []}
+
+
+def test_ioc_cancels_the_remainder():
+    book = OrderBook('BTC-USDT')
+    sell(book, '100', '1')
+    taker = buy(book, '100', '2', time_in_force='IOC')
+    assert taker.filled == book.market.qty_to_lots('1')
+    assert taker.status is OrderStatus.CANCELED
+    assert book.get_market_depth(5)["bids"] == []
+
+
+def test_fok_fills_completely_or_not_at_all():
+    book = OrderBook('BTC-USDT')
+    maker = sell(book, '100', '1')
+    killed = buy(book, '100', '2', time_in_force='FOK')
+    assert killed.status is OrderStatus.CANCELED
+    assert killed.filled == 0
+    assert book.drain_trades() == []
+    assert maker.filled == 0
+
+    filled = buy(book, '100', '1', time_in_force='FOK')
+    assert filled.status is OrderStatus.FILLED
+
+
+def test_batch_keeps_input_order_and_reports_invalid_items():
+    book = OrderBook('BTC-USDT')
+    results = book.create_orders_batch(1, [
+        {"side": 'sell', "order_type": 'limit', "price": '100', "amount": '1'},
+        {"side": 'sell', "order_type": 'limit', "price": '-1', "amount": '1'},
+        {"side": 'buy', "order_type": 'limit', "price": '100', "amount": '1'},
+    ])
+    assert isinstance(results[1], ValueError)
+    assert results[0].status is OrderStatus.FILLED
+    assert results[2].status is OrderStatus.FILLED
+    assert len(book.drain_trades()) == 1
+
+
+@pytest.mark.parametrize("value", [float('inf'), '-Infinity', 'NaN', float('nan'), 'sNaN', '1e999999999', 'abc'])
+def test_non_finite_numbers_are_rejected(value):
+    book = OrderBook('BTC-USDT')
+    with pytest.raises(ValueError):
+        book.create_order(1, 'buy', 'limit', value, '1')
+    with pytest.raises(ValueError):
+        book.create_order(1, 'buy', 'limit', '100', value)
+    results = book.create_orders_batch(1, [{"side": 'buy', "order_type": 'limit', "price": value, "amount": '1'}])
+    assert isinstance(results[0], ValueError)
+    assert book.orders == {}
+
+
+def test_finished_orders_are_pruned():
+    book = OrderBook('BTC-USDT')
+    maker = sell(book, '100', '1')
+    resting = sell(book, '105', '1')
+    buy(book, '100', '1')
+    book.prune_finished()
+    assert book.get_order(maker.id) is None
+    assert book.get_order(resting.id) is resting
+    assert [order.id for order in book.get_user_orders(1)] == [resting.id]
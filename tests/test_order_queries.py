@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+import random
+import re
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import asyncpg
+from sqlalchemy.orm import Session
+
+from src.core.services.database.models.order import OrderModel
+from src.core.services.database.models.refresh_token import RefreshTokenModel  # Mapped with UserModel
+from src.core.services.database.models.user import UserModel
+from src.core.services.database.orm.order import _orders_page
+
+
+T0 = datetime(2026, 1, 1)
+
+
+def compiled(stmt) -> str:
+    """SQL as asyncpg gets it, placeholders and their casts shown as ?"""
+    sql = str(stmt.compile(dialect=asyncpg.dialect(), compile_kwargs={"render_postcompile": True}))
+    return re.sub(r"\$\d+::[\w ]+?(?=[,)]| ORDER| AND| LIMIT|$)", "?", " ".join(sql.split()))
+
+
+def test_page_query_uses_the_index_order_and_a_row_comparison():
+    select, where = compiled(_orders_page(1, ("open",), 'BTC-USDT', (T0, 42), 50)).split(" FROM orders WHERE ")
+    # Only columns the covering index carries
+    assert select == (
+        "SELECT orders.id, orders.user_id, orders.market, orders.side, orders.type, orders.time_in_force, "
+        "orders.price, orders.amount, orders.filled, orders.status, orders.created_at"
+    )
+    # One row comparison, not created_at <= x AND id < y, so ties on created_at page correctly
+    assert where == (
+        "orders.user_id = ? AND orders.status IN (?) AND orders.market = ? "
+        "AND (orders.created_at, orders.id) < (?, ?) "
+        "ORDER BY orders.created_at DESC, orders.id DESC LIMIT ?"
+    )
+
+    first = compiled(_orders_page(1, ("open", "filled", "canceled"), None, None, 50))
+    assert first.endswith(
+        "WHERE orders.user_id = ? AND orders.status IN (?, ?, ?) "
+        "ORDER BY orders.created_at DESC, orders.id DESC LIMIT ?"
+    )
+
+
+def row(order_id: int, user_id: int, status: str, created_at: datetime, market: str = 'BTC-USDT') -> dict:
+    return {
+        "id": order_id, "user_id": user_id, "market": market, "side": "buy", "type": "limit",
+        "time_in_force": "GTC", "price": Decimal(100), "amount": Decimal(1), "filled": Decimal(0),
+        "status": status, "created_at": created_at, "updated_at": created_at,
+    }
+
+
+def test_pages_follow_the_cursor_through_ties():
+    rng = random.Random(11)
+    rows = [
+        # Few distinct timestamps, so most rows share created_at with others
+        row(order_id, rng.choice([1, 1, 1, 2]), rng.choice(["open", "filled", "canceled"]),
+            T0 + timedelta(seconds=rng.randint(0, 5)), rng.choice(['BTC-USDT', 'ETH-USDT']))
+        for order_id in rng.sample(range(1, 10_000), 200)
+    ]
+    engine = create_engine("sqlite://")
+    UserModel.metadata.create_all(engine, tables=[UserModel.__table__, OrderModel.__table__])
+    with Session(engine) as session:
+        session.execute(OrderModel.__table__.insert(), rows)
+
+        def pages(statuses: tuple[str, ...], market=None, limit: int = 7) -> list[int]:
+            seen, after = [], None
+            while True:
+                page = list(session.execute(_orders_page(1, statuses, market, after, limit)).scalars())
+                seen.extend(order.id for order in page)
+                if len(page) < limit:
+                    return seen
+                after = (page[-1].created_at, page[-1].id)
+
+        for statuses, market in [(("open",), None), (("open", "filled", "canceled"), None), (("filled", "canceled"), 'ETH-USDT')]:
+            expected = sorted(
+                (r for r in rows if r["user_id"] == 1 and r["status"] in statuses and market in (None, r["market"])),
+                key=lambda r: (r["created_at"], r["id"]),
+                reverse=True,
+            )
+            assert pages(statuses, market) == [r["id"] for r in expected], statuses
@@ -0,0 +1,198 @@
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from typing import Optional
+import asyncio
+
+import pytest
+
+from src.core.services.crypto.exchange import persistence
+from src.core.services.crypto.exchange.persistence import OrderWriter
+from src.core.services.crypto.exchange.sequencer import Command, CommandResult
+from src.core.services.crypto.exchange.trade import OrderBook
+
+
+class Database:
+    """Tables the writer's statements land in, only on commit; ``fail`` commits raise"""
+    def __init__(self):
+        self.orders: dict[int, dict] = {}
+        self.order_writes = 0
+        self.trades: list[dict] = []
+        self.wallets: dict[tuple[int, str], list] = {}
+        self.checkpoints: dict[str, tuple[int, int]] = {}
+        self.fail = 0
+        self.gate: Optional[asyncio.Event] = None  # Holds flushes inside the transaction while set
+        self.entered = asyncio.Event()
+
+    @asynccontextmanager
+    async def session(self):
+        yield Session(self)
+
+
+class Session:
+    def __init__(self, db: Database):
+        self.db = db
+        self.orders: list[dict] = []
+        self.trades: list[dict] = []
+        self.wallets: list[dict] = []
+        self.checkpoints: list[dict] = []
+
+    async def commit(self) -> None:
+        db = self.db
+        if db.fail:
+            db.fail -= 1
+            raise ConnectionError("connection reset")
+        for row in self.orders:
+            db.orders[row["id"]] = row
+        db.order_writes += len(self.orders)
+        db.trades.extend(self.trades)
+        for row in self.wallets:
+            wallet = db.wallets.setdefault((row["user_id"], row["currency"]), [Decimal(0), Decimal(0)])
+            wallet[0] += row["balance"]
+            wallet[1] += row["locked"]
+        for row in self.checkpoints:
+            db.checkpoints[row["market"]] = (row["generation"], row["offset"])
+
+
+@pytest.fixture
+def db(monkeypatch) -> Database:
+    async def upsert_orders(session: Session, rows: list[dict]) -> None:
+        session.orders.extend(rows)
+        session.db.entered.set()
+        if session.db.gate is not None:
+            await session.db.gate.wait()
+
+    async def append_trades(session: Session, rows: list[dict]) -> None:
+        session.trades.extend(rows)
+
+    async def apply_balance_changes(session: Session, rows: list[dict]) -> set:
+        session.wallets.extend(rows)
+        return {(row["user_id"], row["currency"]) for row in rows}
+
+    async def upsert_journal_checkpoints(session: Session, rows: list[dict]) -> None:
+        session.checkpoints.extend(rows)
+
+    for function in (upsert_orders, append_trades, apply_balance_changes, upsert_journal_checkpoints):
+        monkeypatch.setattr(persistence, function.__name__, function)
+    return Database()
+
+
+class Market:
+    """Book commands recorded by the writer the way the sequencer reports them"""
+    def __init__(self, writer: OrderWriter):
+        self.writer = writer
+        self.book = OrderBook('BTC-USDT')
+        self.offset = 0
+
+    def _record(self, kind: str, value, **kwargs) -> None:
+        self.offset += 1
+        result = CommandResult(value, self.book.drain_trades(), (1, self.offset))
+        self.writer.record(self.book, Command(kind, kwargs, None), result)
+
+    def order(self, user_id: int, side: str, price: str, amount: str):
+        order = self.book.create_order(user_id, side, 'limit', price, amount)
+        self._record('new', order)
+        return order
+
+    def cancel(self, order_id: int) -> None:
+        self._record('cancel', self.book.cancel_order(order_id), order_id=order_id)
+
+
+def writer_for(db: Database, **kwargs) -> OrderWriter:
+    # Flushes only when a test asks for one (or on stop)
+    return OrderWriter(db.session, **{"flush_interval": 60, **kwargs})
+
+
+def test_changes_between_flushes_collapse_into_one_row(db: Database):
+    async def scenario():
+        writer = writer_for(db)
+        market = Market(writer)
+        maker = market.order(1, 'sell', '100.00', '2')
+        created_at = writer._pending[maker.id]["created_at"]
+        taker = market.order(2, 'buy', '100.00', '0.5')
+        other = market.order(3, 'buy', '99.00', '1')
+        market.cancel(other.id)
+        assert len(writer._pending) == 3
+        await writer.stop()
+        return writer, maker, taker, other, created_at
+
+    writer, maker, taker, other, created_at = asyncio.run(scenario())
+    assert writer.metrics.recorded == 5
+    assert writer.metrics.coalesced == 2  # The filled maker and the canceled order
+    assert db.order_writes == 3
+    assert db.orders[maker.id]["filled"] == Decimal('0.500000')
+    assert db.orders[maker.id]["created_at"] == created_at  # Kept from the first change
+    assert db.orders[taker.id]["status"] == 'filled'
+    assert db.orders[other.id]["status"] == 'canceled'
+    assert len(db.trades) == 1
+    assert writer.journal_checkpoints == db.checkpoints == {'BTC-USDT': (1, 4)}
+
+
+def test_failed_flush_loses_and_duplicates_nothing(db: Database):
+    async def scenario():
+        writer = writer_for(db)
+        market = Market(writer)
+        maker = market.order(1, 'sell', '100.00', '2')
+        market.order(2, 'buy', '100.00', '0.5')
+        writer.stage_balance_changes({(1, 'BTC'): [Decimal('-0.5'), Decimal('-0.5')], (2, 'BTC'): [Decimal('0.5'), 0]})
+
+        db.fail, db.gate = 1, asyncio.Event()
+        flush = asyncio.create_task(writer.flush())
+        await db.entered.wait()
+        # Recorded while the doomed transaction is open
+        market.order(3, 'buy', '100.00', '1')  # Fills the maker further
+        late = market.order(4, 'buy', '98.00', '1')
+        writer.stage_balance_changes({(1, 'BTC'): [Decimal('-1'), Decimal('-1')], (3, 'BTC'): [Decimal('1'), 0]})
+        db.gate.set()
+        with pytest.raises(ConnectionError):
+            await flush
+        assert db.orders == {} and db.checkpoints == {}
+        assert writer.journal_checkpoints == {}
+
+        await writer.flush()
+        await writer.stop()
+        return writer, maker, late
+
+    writer, maker, late = asyncio.run(scenario())
+    assert writer.metrics.failed_flushes == 1
+    assert writer.metrics.flushes == 1
+    assert len(db.orders) == 4 and db.order_writes == 4
+    # The newest state won over the one of the failed flush
+    assert db.orders[maker.id]["filled"] == Decimal('1.500000')
+    assert db.orders[late.id]["status"] == 'open'
+    # Each fill exactly once, in order
+    assert [trade["buyer_id"] for trade in db.trades] == [2, 3]
+    assert db.wallets == {
+        (1, 'BTC'): [Decimal('-1.5'), Decimal('-1.5')],
+        (2, 'BTC'): [Decimal('0.5'), 0],
+        (3, 'BTC'): [Decimal('1'), 0],
+    }
+    assert writer.journal_checkpoints == db.checkpoints == {'BTC-USDT': (1, 4)}
+    assert writer._pending == {} and writer._trades == [] and writer._balances == {}
+
+
+def test_commands_wait_while_the_backlog_is_full(db: Database):
+    async def scenario():
+        writer = writer_for(db, max_pending=3)
+        market = Market(writer)
+        await writer.wait_for_capacity()  # Room to spare, no wait
+        db.gate = asyncio.Event()
+        for price in ('97.00', '98.00'):
+            market.order(1, 'buy', price, '1')
+        await writer.wait_for_capacity()
+        market.order(1, 'buy', '99.00', '1')
+
+        waiting = asyncio.create_task(writer.wait_for_capacity())
+        flush = asyncio.create_task(writer.flush())
+        await db.entered.wait()
+        await asyncio.sleep(0.01)
+        assert not waiting.done()  # Rows taken, but not stored yet
+        db.gate.set()
+        await flush
+        await asyncio.wait_for(waiting, 1)
+        await writer.stop()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert writer.metrics.backpressure_waits == 1
+    assert writer.metrics.pending_high_water == 3
+    assert db.order_writes == 3
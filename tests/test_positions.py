@@ -0,0 +1,101 @@
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from types import SimpleNamespace
+import asyncio
+
+from src.core.services.crypto.exchange import positions as positions_module
+from src.core.services.crypto.exchange.positions import PositionService
+
+
+KEY = ('BTC-USDT', 1)
+
+
+@asynccontextmanager
+async def no_session():
+    yield None
+
+
+def state(service: PositionService, key=KEY) -> tuple[int, int, int]:
+    position = service._positions[key]
+    return position.quantity, position.cost, position.realized
+
+
+def test_average_cost_close_and_flip():
+    service = PositionService(no_session)
+    service._fill(KEY, 3, 10_000)
+    service._fill(KEY, 4, 10_001)
+    assert state(service) == (7, 70_004, 0)
+
+    # Partial close releases the closed share of the cost, rounded to the nearest unit
+    service._fill(KEY, -2, 10_010)
+    assert state(service) == (5, 50_003, 20_020 - 20_001)
+
+    # Through zero: the closing part realizes, the rest opens short at the fill price
+    service._fill(KEY, -8, 9_990)
+    assert state(service) == (-3, -29_970, 19 + 49_950 - 50_003)
+
+    service._fill(KEY, 1, 9_980)
+    assert state(service) == (-2, -19_980, -34 + 9_990 - 9_980)
+    service._fill(KEY, 2, 10_000)
+    assert state(service) == (0, 0, -24 + 19_980 - 20_000)
+
+    service._last_price['BTC-USDT'] = 10_050
+    assert service.get_position(*KEY) == {
+        "market": 'BTC-USDT',
+        "quantity": Decimal('0.000000'),
+        "avg_entry_price": Decimal(0),
+        "realized_pnl": Decimal('-0.00000044'),
+        "unrealized_pnl": Decimal('0E-8'),
+        "mark_price": Decimal('100.50'),
+    }
+
+
+def test_unrealized_pnl_is_marked_to_the_last_trade():
+    service = PositionService(no_session)
+    service._fill(KEY, 2_000_000, 10_000)  # 2 BTC at 100
+    service._last_price['BTC-USDT'] = 10_500
+    position = service.get_position(*KEY)
+    assert position["avg_entry_price"] == Decimal('100')
+    assert position["unrealized_pnl"] == Decimal('10')
+
+
+def load(rows: list[dict], monkeypatch) -> PositionService:
+    async def select_positions(session, markets):
+        return [SimpleNamespace(**row) for row in rows if row["market"] in markets]
+
+    async def select_trades(session, symbol, limit):
+        return []
+
+    monkeypatch.setattr(positions_module, 'select_positions', select_positions)
+    monkeypatch.setattr(positions_module, 'select_trades', select_trades)
+    service = PositionService(no_session)
+    asyncio.run(service.load(['BTC-USDT']))
+    return service
+
+
+def test_checkpoint_round_trip_keeps_later_pnl(monkeypatch):
+    live = PositionService(no_session)
+    for delta, price in [(3, 10_000), (4, 10_001), (-2, 10_010), (1_000_001, 9_999)]:
+        live._fill(KEY, delta, price)
+    live._fill(('BTC-USDT', 2), -7, 10_003)
+
+    restored = load(live.rows(live.take_dirty()), monkeypatch)
+    assert state(restored) == state(live)
+    assert state(restored, ('BTC-USDT', 2)) == state(live, ('BTC-USDT', 2))
+
+    for service in (live, restored):
+        service._fill(KEY, -3, 10_020)
+        service._fill(KEY, -1_000_010, 9_000)
+    assert state(restored) == state(live)
+
+
+def test_rows_from_before_entry_cost_load_from_the_average(monkeypatch):
+    row = {
+        "user_id": 1,
+        "market": 'BTC-USDT',
+        "quantity": Decimal('-0.000004'),
+        "avg_entry_price": Decimal('100.25'),
+        "realized_pnl": Decimal('0.00000150'),
+        "entry_cost": None,
+    }
+    assert state(load([row], monkeypatch)) == (-4, -40_100, 150)
@@ -0,0 +1,121 @@
+from decimal import Decimal
+import asyncio
+
+import pytest
+
+from src.core.services.crypto.exchange.risk import RiskEngine, RiskLimits
+from src.core.services.crypto.exchange.sequencer import MarketSequencer
+from src.core.services.crypto.exchange.trade import OrderBook
+
+
+def market(limits: RiskLimits, positions: dict = None) -> tuple[RiskEngine, MarketSequencer]:
+    risk = RiskEngine({'BTC-USDT': limits})
+    book = OrderBook('BTC-USDT')
+    risk.rebuild(book, positions)
+    book.add_check(risk.check, risk.accept)
+    sequencer = MarketSequencer(book)
+    sequencer.add_hook(risk.apply)
+    return risk, sequencer
+
+
+def exposure(risk: RiskEngine, sequencer: MarketSequencer, user_id: int) -> dict:
+    return risk.get_exposure(sequencer.book.market, user_id)
+
+
+def test_limits_reject_and_count():
+    async def scenario():
+        risk, sequencer = market(RiskLimits(
+            max_open_orders=2, max_position=Decimal('3'), max_open_notional=Decimal('500'), orders_per_second=0, burst=4
+            ))
+        first = await sequencer.submit('new', user_id=1, side='buy', order_type='limit', price=100, amount=2)
+        with pytest.raises(ValueError, match='position'):
+            await sequencer.submit('new', user_id=1, side='buy', order_type='limit', price=100, amount=2)
+        with pytest.raises(ValueError, match='open_notional'):
+            await sequencer.submit('new', user_id=1, side='sell', order_type='limit', price=301, amount=1)
+        second = await sequencer.submit('new', user_id=1, side='sell', order_type='limit', price=101, amount=1)
+        with pytest.raises(ValueError, match='open_orders'):
+            await sequencer.submit('new', user_id=1, side='sell', order_type='limit', price=102, amount=1)
+
+        # Only the two accepted orders spent tokens, cancels spend none
+        await sequencer.submit('cancel', order_id=first.value.id)
+        await sequencer.submit('cancel', order_id=second.value.id)
+        await sequencer.submit('new', user_id=1, side='sell', order_type='limit', price=103, amount=1)
+        await sequencer.submit('new', user_id=1, side='sell', order_type='limit', price=104, amount=1)
+        with pytest.raises(ValueError, match='rate'):
+            await sequencer.submit('new', user_id=1, side='sell', order_type='limit', price=105, amount=1)
+        await sequencer.stop()
+        return risk
+
+    risk = asyncio.run(scenario())
+    assert risk.rejections == {'position': 1, 'open_notional': 1, 'open_orders': 1, 'rate': 1}
+
+
+def test_rejected_batch_items_leave_no_trace():
+    risk, sequencer = market(RiskLimits(max_open_orders=2, burst=5))
+    book = sequencer.book
+
+    def only_two_funded(book, order, price, amount):
+        if order.id - (book.market.market_id << 48) > 2:
+            raise ValueError("Insufficient USDT balance")
+
+    book.add_check(only_two_funded)
+    results = book.create_orders_batch(1, [
+        {"side": 'buy', "order_type": 'limit', "price": 100, "amount": 1},
+        {"side": 'buy', "order_type": 'limit', "price": 99, "amount": 1},
+        {"side": 'buy', "order_type": 'limit', "price": 98, "amount": 1},
+    ])
+    assert [type(result).__name__ for result in results] == ['Order', 'Order', 'ValueError']
+    account = risk._accounts[(book.market.market_id, 1)]
+    assert round(account.tokens) == 3
+    assert risk._provisional[(book.market.market_id, 1)] == [2, book.market.qty_to_lots(2), 0, book.market.price_to_ticks(199) * book.market.qty_to_lots(1)]
+
+    # A rejected single order does not count either
+    with pytest.raises(ValueError):
+        book.create_order(1, 'buy', 'limit', 97, 1)
+    assert round(account.tokens) == 3
+
+
+def test_rebuild_seeds_positions():
+    limits = RiskLimits(max_position=Decimal('50'))
+    risk, sequencer = market(limits, positions={1: OrderBook('BTC-USDT').market.qty_to_lots('49')})
+    book = sequencer.book
+    with pytest.raises(ValueError, match='position'):
+        book.create_order(1, 'buy', 'limit', 100, 2)
+    book.create_order(1, 'sell', 'limit', 100, 99)
+    assert exposure(risk, sequencer, 1)["position"] == Decimal('49')
+
+    # Resting orders of a recovered book count as well
+    recovered = RiskEngine({'BTC-USDT': limits})
+    recovered.rebuild(book)
+    assert recovered.get_exposure(book.market, 1)["open_sell"] == Decimal('99')
+
+
+def test_fills_amends_and_cancels_update_exposure():
+    async def scenario():
+        risk, sequencer = market(RiskLimits())
+        ask = await sequencer.submit('new', user_id=1, side='sell', order_type='limit', price=100, amount=3)
+        bid = await sequencer.submit('new', user_id=2, side='buy', order_type='limit', price=101, amount=5)
+        assert exposure(risk, sequencer, 1) == {
+            "open_orders": 0, "open_buy": 0, "open_sell": 0, "open_notional": 0, "position": Decimal('-3'),
+        }
+        assert exposure(risk, sequencer, 2)["position"] == Decimal('3')
+        assert exposure(risk, sequencer, 2)["open_buy"] == Decimal('2')
+        assert exposure(risk, sequencer, 2)["open_notional"] == Decimal('202')
+        assert ask.value.id not in risk._live
+
+        await sequencer.submit('amend', order_id=bid.value.id, price=90, amount=4)
+        assert exposure(risk, sequencer, 2)["open_buy"] == Decimal('1')
+        assert exposure(risk, sequencer, 2)["open_notional"] == Decimal('90')
+
+        await sequencer.submit('new', user_id=1, side='sell', order_type='market', price=0, amount='0.5')
+        assert exposure(risk, sequencer, 2)["position"] == Decimal('3.5')
+        assert exposure(risk, sequencer, 2)["open_notional"] == Decimal('45')
+
+        await sequencer.submit('cancel', order_id=bid.value.id)
+        assert exposure(risk, sequencer, 2) == {
+            "open_orders": 0, "open_buy": 0, "open_sell": 0, "open_notional": 0, "position": Decimal('3.5'),
+        }
+        assert risk._live == {}
+        await sequencer.stop()
+
+    asyncio.run(scenario())
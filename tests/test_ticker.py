@@ -0,0 +1,91 @@
+from decimal import Decimal
+from types import SimpleNamespace
+import asyncio
+import time
+
+from src.core.services.crypto.exchange.market import get_market_config
+from src.core.services.crypto.exchange.ticker import RollingWindow, TickerService
+
+
+MARKET = get_market_config('BTC-USDT')
+T0 = 1_700_000_000
+
+
+class Cache:
+    """Market data cache keeping the last fields per symbol"""
+    def __init__(self):
+        self.entries: dict[str, dict] = {}
+        self.updates = 0
+
+    def update(self, symbol: str, fields: dict) -> None:
+        self.entries[symbol] = fields
+        self.updates += 1
+
+
+def window(fills: list[tuple[int, int, float]], seconds: int = 10) -> RollingWindow:
+    rolling = RollingWindow(seconds)
+    for price, amount, timestamp in fills:
+        rolling.add(price, amount, timestamp)
+    return rolling
+
+
+def test_high_and_low_fall_back_when_the_extreme_expires():
+    rolling = window([(10_000, 1, T0), (15_000, 1, T0 + 1), (12_000, 1, T0 + 2), (9_000, 1, T0 + 3), (11_000, 1, T0 + 4)])
+    assert (rolling.highs[0][1], rolling.lows[0][1]) == (15_000, 9_000)
+
+    rolling.expire(T0 + 11)  # The high of T0 + 1 leaves
+    stats = rolling.stats(MARKET)
+    assert stats["high_24h"] == Decimal('120.00')
+    assert stats["low_24h"] == Decimal('90.00')
+
+    rolling.expire(T0 + 13)  # Then the low
+    stats = rolling.stats(MARKET)
+    assert stats["high_24h"] == Decimal('110.00')
+    assert stats["low_24h"] == Decimal('110.00')
+    assert stats["open_24h"] == Decimal('110.00')
+
+
+def test_sums_after_a_partial_expiry():
+    rolling = window([(10_000, 2, T0), (10_100, 3, T0 + 0.5), (10_200, 5, T0 + 5), (10_300, 7, T0 + 9)])
+    assert rolling.expire(T0 + 10)
+    assert not rolling.expire(T0 + 10.9)  # Same second, nothing left to drop
+    assert (rolling.volume, rolling.notional, rolling.trades) == (12, 10_200 * 5 + 10_300 * 7, 2)
+    stats = rolling.stats(MARKET)
+    assert stats["volume_24h"] == Decimal('0.000012')
+    assert stats["trades_24h"] == 2
+    assert stats["open_24h"] == Decimal('102.00')
+    assert stats["vwap_24h"] == Decimal('102.58')
+    assert stats["change_pct_24h"] == Decimal('0.98')
+
+
+def test_empty_window():
+    empty = RollingWindow(10).stats(MARKET)
+    assert empty["trades_24h"] == 0
+    assert empty["volume_24h"] == Decimal(0)
+    assert empty["high_24h"] is None and empty["vwap_24h"] is None
+
+    rolling = window([(10_000, 1, T0), (10_500, 1, T0 + 1)])
+    assert rolling.expire(T0 + 11)
+    assert not rolling.buckets and not rolling.highs and not rolling.lows
+    assert (rolling.volume, rolling.notional, rolling.trades) == (0, 0, 0)
+    assert rolling.stats(MARKET) == empty
+
+
+def test_timer_expires_markets_without_fills():
+    async def scenario():
+        cache = Cache()
+        service = TickerService(cache, window=1, expire_interval=0.01)
+        service.attach(SimpleNamespace(market=MARKET))
+        # A fill from before the window, no further trade to slide it out
+        service.windows['BTC-USDT'].add(10_000, 1, time.time() - 5)
+        cache.update('BTC-USDT', service.windows['BTC-USDT'].stats(MARKET))
+        updates = cache.updates
+        await asyncio.sleep(0.1)
+        await service.stop()
+        return cache, updates
+
+    cache, updates = asyncio.run(scenario())
+    # Published once when the fill left, not again on every tick
+    assert cache.updates == updates + 1
+    assert cache.entries['BTC-USDT']["trades_24h"] == 0
+    assert cache.entries['BTC-USDT']["high_24h"] is None
@@ -0,0 +1,63 @@
+from contextlib import asynccontextmanager
+from datetime import date
+from types import SimpleNamespace
+import asyncio
+
+from src.core.services.database.orm.trade import create_trade_partitions
+
+
+class FakeSession:
+    """Records statements, ``stranded`` days have rows in trades_default, ``broken`` ones fail"""
+    def __init__(self, existing: list[str], stranded: set[date] = frozenset(), broken: set[str] = frozenset()):
+        self.existing = existing
+        self.stranded = stranded
+        self.broken = broken
+        self.statements: list[str] = []
+        self.rolled_back = 0
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        if 'pg_inherits' in sql:
+            return SimpleNamespace(scalars=lambda: iter(self.existing))
+        self.statements.append(sql)
+        if sql.startswith('SELECT EXISTS'):
+            return SimpleNamespace(scalar=lambda: params["lower"].date() in self.stranded)
+        if any(f"TABLE IF NOT EXISTS {name} " in sql for name in self.broken):
+            raise RuntimeError("permission denied")
+        return SimpleNamespace(rowcount=3)
+
+    @asynccontextmanager
+    async def begin_nested(self):
+        try:
+            yield
+        except Exception:
+            self.rolled_back += 1
+            raise
+
+
+def test_creates_missing_days_only():
+    session = FakeSession(['trades_default', 'trades_p20260102'])
+    created = asyncio.run(create_trade_partitions(session, date(2026, 1, 1), 3))
+    assert created == ['trades_p20260101', 'trades_p20260103']
+    assert not any('DETACH' in sql for sql in session.statements)
+
+
+def test_rows_in_the_default_partition_are_moved():
+    session = FakeSession(['trades_default'], stranded={date(2026, 1, 2)})
+    created = asyncio.run(create_trade_partitions(session, date(2026, 1, 1), 3))
+    assert created == ['trades_p20260101', 'trades_p20260102', 'trades_p20260103']
+    detach = next(index for index, sql in enumerate(session.statements) if 'DETACH' in sql)
+    moved = session.statements[detach:detach + 4]
+    assert moved[0] == 'ALTER TABLE trades DETACH PARTITION trades_default'
+    assert moved[1].startswith('CREATE TABLE IF NOT EXISTS trades_p20260102 PARTITION OF trades')
+    assert moved[2].startswith('WITH moved AS (DELETE FROM trades_default')
+    assert moved[2].endswith('INSERT INTO trades_p20260102 SELECT * FROM moved')
+    assert moved[3] == 'ALTER TABLE trades ATTACH PARTITION trades_default DEFAULT'
+    assert sum('DETACH' in sql for sql in session.statements) == 1
+
+
+def test_failed_day_does_not_stop_later_ones():
+    session = FakeSession(['trades_default'], broken={'trades_p20260101'})
+    created = asyncio.run(create_trade_partitions(session, date(2026, 1, 1), 3))
+    assert created == ['trades_p20260102', 'trades_p20260103']
+    assert session.rolled_back == 1
@@ -0,0 +1,107 @@
+from time import perf_counter
+import asyncio
+
+import pytest
+
+from src.core.services.upstream.client import UpstreamClient, UpstreamError
+from stub_server import StubServer
+
+
+def test_concurrent_calls_overlap_and_reuse_connections():
+    async def scenario(stub: StubServer):
+        client = UpstreamClient(max_connections=50, max_keepalive=50)
+        try:
+            started = perf_counter()
+            await asyncio.gather(*(client.get_json(f"{stub.url}/quote", params={"n": n}) for n in range(50)))
+            elapsed = perf_counter() - started
+            connections = stub.connections
+            await asyncio.gather(*(client.get_json(f"{stub.url}/quote", params={"n": n}) for n in range(50)))
+        finally:
+            await client.stop()
+        return elapsed, connections
+
+    with StubServer(delay=0.1) as stub:
+        elapsed, connections = asyncio.run(scenario(stub))
+        # One after another these would take 5 s
+        assert elapsed < 1.5
+        assert stub.requests == 100
+        assert stub.connections == connections
+
+
+def test_retries_busy_upstream():
+    async def scenario(stub: StubServer):
+        client = UpstreamClient(retries=3, backoff=0.01)
+        try:
+            return await client.get_json(f"{stub.url}/quote")
+        finally:
+            await client.stop()
+
+    with StubServer(failures=2) as stub:
+        body = asyncio.run(scenario(stub))
+        assert stub.requests == 3
+        assert body["request"] == 3
+
+
+def test_gives_up_after_retries():
+    async def scenario(stub: StubServer):
+        client = UpstreamClient(retries=2, backoff=0.01)
+        try:
+            await client.get_json(f"{stub.url}/quote")
+        finally:
+            await client.stop()
+
+    with StubServer(failures=10) as stub:
+        with pytest.raises(UpstreamError) as error:
+            asyncio.run(scenario(stub))
+        assert error.value.status == 503
+        assert stub.requests == 3
+
+
+def test_client_errors_are_not_retried():
+    async def scenario(stub: StubServer):
+        client = UpstreamClient(retries=3, backoff=0.01)
+        try:
+            await client.get_json(f"{stub.url}/quotes", params={"symbol": "NOPE"})
+        finally:
+            await client.stop()
+
+    with StubServer(invalid=frozenset({"NOPE"})) as stub:
+        with pytest.raises(UpstreamError) as error:
+            asyncio.run(scenario(stub))
+        assert error.value.status == 400
+        assert "error_message" in error.value.body["status"]
+        assert stub.requests == 1
+
+
+def test_success_without_json_is_an_upstream_error():
+    async def scenario(stub: StubServer):
+        client = UpstreamClient(retries=3, backoff=0.01)
+        try:
+            await client.get_json(f"{stub.url}/maintenance")
+        finally:
+            await client.stop()
+
+    with StubServer() as stub:
+        with pytest.raises(UpstreamError) as error:
+            asyncio.run(scenario(stub))
+        assert error.value.status is None
+        assert "maintenance" in error.value.body
+        assert stub.requests == 1
+
+
+def test_cached_calls_share_one_request():
+    async def scenario(stub: StubServer):
+        client = UpstreamClient()
+        try:
+            concurrent = await asyncio.gather(*(client.get_json(f"{stub.url}/map", cache_ttl=60) for _ in range(20)))
+            cached = await client.get_json(f"{stub.url}/map", cache_ttl=60)
+            other = await client.get_json(f"{stub.url}/map", params={"page": 2}, cache_ttl=60)
+        finally:
+            await client.stop()
+        return concurrent, cached, other
+
+    with StubServer(delay=0.05) as stub:
+        concurrent, cached, other = asyncio.run(scenario(stub))
+        assert stub.requests == 2
+        assert all(body == cached for body in concurrent)
+        assert other["request"] == 2
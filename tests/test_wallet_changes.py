@@ -0,0 +1,98 @@
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from types import SimpleNamespace
+import asyncio
+
+from sqlalchemy.dialects.postgresql import asyncpg
+import pytest
+
+from src.core.services.crypto.exchange.persistence import OrderWriter
+from src.core.services.database.orm import balance as balance_module
+from src.core.services.database.orm.balance import apply_balance_changes, update_balances_statement
+
+
+class WalletTable:
+    """
+    Session over a dict of wallets with the database's semantics: the
+    upsert inserts missing rows (check constraint enforced) and updates
+    existing ones under its guard, the update only touches existing rows.
+    """
+    def __init__(self, wallets: dict):
+        self.wallets = wallets
+        self.commits = 0
+
+    def _apply(self, row: dict, insert: bool) -> bool:
+        key = (row["user_id"], row["currency"])
+        current = self.wallets.get(key)
+        if current is None:
+            if not insert:
+                return False
+            if not (0 <= row["locked"] <= row["balance"]):
+                raise RuntimeError("violates check constraint ck_wallets_balance_covers_locked")
+            self.wallets[key] = (row["balance"], row["locked"])
+            return True
+        balance, locked = current[0] + row["balance"], current[1] + row["locked"]
+        if not (0 <= locked <= balance):
+            return False
+        self.wallets[key] = (balance, locked)
+        return True
+
+    async def execute(self, statement, rows=None):
+        if isinstance(statement, SimpleNamespace):  # update_balances_statement
+            rows, insert = statement.rows, False
+        else:
+            insert = True
+        return [(row["user_id"], row["currency"]) for row in rows if self._apply(row, insert)]
+
+    async def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def table(monkeypatch) -> WalletTable:
+    monkeypatch.setattr(balance_module, 'update_balances_statement', lambda rows: SimpleNamespace(rows=rows))
+    return WalletTable({(1, 'USDT'): (Decimal(100), Decimal(10))})
+
+
+def change(user_id: int, currency: str, balance, locked) -> dict:
+    return {"user_id": user_id, "currency": currency, "balance": Decimal(balance), "locked": Decimal(locked)}
+
+
+def test_debits_of_missing_wallets_are_refused_not_inserted(table: WalletTable):
+    applied = asyncio.run(apply_balance_changes(table, [
+        change(1, 'USDT', -50, -10),   # Existing wallet, fine
+        change(2, 'USDT', -5, 0),      # No wallet to take from
+        change(2, 'BTC', 0, 1),        # Locks what is not there
+        change(2, 'ETH', 3, 0),        # Credit creates the wallet
+    ]))
+    assert applied == {(1, 'USDT'), (2, 'ETH')}
+    assert table.wallets == {(1, 'USDT'): (Decimal(50), Decimal(0)), (2, 'ETH'): (Decimal(3), Decimal(0))}
+
+
+def test_refused_change_reaches_the_reject_handler(table: WalletTable):
+    @asynccontextmanager
+    async def session_factory():
+        yield table
+
+    async def scenario():
+        writer = OrderWriter(session_factory)
+        writer.add_reject_handler(rejected.extend)
+        writer.stage_balance_changes({(2, 'USDT'): [Decimal(-5), Decimal(0)], (1, 'USDT'): [Decimal(1), Decimal(0)]})
+        await writer.stop()
+        return writer
+
+    rejected = []
+    writer = asyncio.run(scenario())
+    assert table.commits == 1
+    assert rejected == [change(2, 'USDT', -5, 0)]
+    assert writer.pending_balance_changes == {}
+    assert table.wallets[(1, 'USDT')] == (Decimal(101), Decimal(10))
+
+
+def test_update_only_touches_existing_rows_under_the_guard():
+    sql = str(update_balances_statement([change(1, 'USDT', -5, 0)]).compile(dialect=asyncpg.dialect()))
+    assert sql.startswith("UPDATE wallets SET balance=(wallets.balance + deltas.balance)")
+    assert "FROM (VALUES ($1::INTEGER, $2::VARCHAR, $3::NUMERIC, $4::NUMERIC)) AS deltas" in sql
+    assert "wallets.user_id = deltas.user_id AND wallets.currency = deltas.currency" in sql
+    assert "wallets.balance + deltas.balance >= wallets.locked + deltas.locked" in sql
+    assert sql.endswith("RETURNING wallets.user_id, wallets.currency")
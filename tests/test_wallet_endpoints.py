@@ -0,0 +1,43 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from src.api.v1.endpoints import wallets
+from src.core.dependencies.auth_deps import get_current_active_user
+from src.core.dependencies.db_helper import db_helper
+
+
+@pytest.fixture
+def client(monkeypatch) -> TestClient:
+    async def select_balances(session, user_ids):
+        assert session == 'session' and user_ids == [7]
+        return [SimpleNamespace(user_id=7, currency='USDT', balance=Decimal('100'), locked=Decimal('40'))]
+
+    async def session_getter():
+        yield 'session'
+
+    monkeypatch.setattr(wallets, 'select_balances', select_balances)
+    app = FastAPI()
+    app.include_router(wallets.router)
+    app.dependency_overrides[get_current_active_user] = lambda: SimpleNamespace(id=7)
+    app.dependency_overrides[db_helper.session_getter] = session_getter
+    return TestClient(app)
+
+
+def test_balances_come_from_the_table_without_the_ledger(client: TestClient, monkeypatch):
+    monkeypatch.setattr(wallets.settings.engine, 'check_balances', False)
+    monkeypatch.setattr(wallets.balance_ledger, 'ensure_loaded', None)  # Must not be used
+    assert client.get('/wallets/me').json() == {"USDT": {"balance": 100, "locked": 40, "available": 60}}
+
+
+def test_balances_come_from_the_ledger_when_it_checks_orders(client: TestClient, monkeypatch):
+    async def ensure_loaded(user_ids):
+        pass
+
+    monkeypatch.setattr(wallets.settings.engine, 'check_balances', True)
+    monkeypatch.setattr(wallets.balance_ledger, 'ensure_loaded', ensure_loaded)
+    monkeypatch.setattr(wallets.balance_ledger, '_balances', {(7, 'USDT'): [Decimal('100'), Decimal('45')]})
+    assert client.get('/wallets/me').json()["USDT"]["available"] == 55